@@ -0,0 +1,137 @@
+"""
+Benchmark for BM25 top-k retrieval
+Compares full-corpus scoring + full sort (the old BM25Okapi path) against
+BM25Index.search, which only reads query-term postings and selects the top
+k with a heap, over synthetic Zipf-distributed corpora
+
+Usage:
+    python benchmark_bm25.py --sizes 10000 100000 1000000 --top-k 15
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from bm25_index import BM25Index, tokenize
+
+
+def make_vocabulary(size: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [f"term{i}_{rng.randint(0, 999)}" for i in range(size)]
+
+
+def make_corpus(count: int, vocabulary: list, words_per_doc: int = 60, seed: int = 0) -> list:
+    """Generate documents whose term frequencies follow a Zipf-like distribution"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    docs = []
+    for _ in range(count):
+        length = max(5, int(rng.gauss(words_per_doc, words_per_doc / 4)))
+        docs.append(" ".join(rng.choices(vocabulary, cum_weights=cumulative, k=length)))
+    return docs
+
+
+def make_queries(vocabulary: list, count: int = 50, seed: int = 1) -> list:
+    """Mix of common and rare terms, 2-5 tokens per query"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        terms = [rng.choice(vocabulary[:50])]
+        terms += [rng.choice(vocabulary) for _ in range(rng.randint(1, 4))]
+        queries.append(" ".join(terms))
+    return queries
+
+
+class FullScanBM25:
+    """Mirror of rank_bm25.BM25Okapi.get_scores: score every document, then sort"""
+
+    def __init__(self, docs: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs = [Counter(tokenize(doc)) for doc in docs]
+        self.doc_len = [sum(freqs.values()) for freqs in self.doc_freqs]
+        self.avgdl = sum(self.doc_len) / len(self.doc_len)
+        df = Counter()
+        for freqs in self.doc_freqs:
+            df.update(freqs.keys())
+        n = len(docs)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def top_k(self, query_tokens: list, k: int) -> list:
+        scores = [0.0] * len(self.doc_freqs)
+        for term in query_tokens:
+            idf = self.idf.get(term, 0.0)
+            for i, freqs in enumerate(self.doc_freqs):
+                tf = freqs.get(term, 0)
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[i] / self.avgdl)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [(i, scores[i]) for i in ranked[:k]]
+
+
+def time_queries(fn, queries: list) -> float:
+    """Mean milliseconds per query"""
+    start = time.perf_counter()
+    for query in queries:
+        fn(tokenize(query))
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 top-k retrieval")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--top-k", type=int, default=15, help="Candidates per query (top_k * 3 in /query)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--baseline-max", type=int, default=100000,
+                        help="Skip the full-scan baseline above this corpus size (it needs a dict per document)")
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    queries = make_queries(vocabulary, args.queries)
+
+    print("=" * 80)
+    print(f"{'chunks':>10} {'full scan+sort':>16} {'search (memory)':>16} {'search (mmap)':>16} {'load mmap':>12}")
+    print("=" * 80)
+
+    for size in args.sizes:
+        docs = make_corpus(size, vocabulary)
+        ids = [f"doc_{i}" for i in range(size)]
+
+        index = BM25Index()
+        index.add_many(ids, docs)
+        memory_ms = time_queries(lambda tokens: index.search(tokens, args.top_k), queries)
+
+        baseline = "skipped"
+        if size <= args.baseline_max:
+            full_scan = FullScanBM25(docs)
+            baseline = f"{time_queries(lambda tokens: full_scan.top_k(tokens, args.top_k), queries):.2f} ms"
+            del full_scan
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bm25_index.bin")
+            index.save(path, "benchmark")
+            index.clear()
+
+            mapped = BM25Index()
+            start = time.perf_counter()
+            mapped.load(path, "benchmark")
+            load_ms = (time.perf_counter() - start) * 1000
+            mmap_ms = time_queries(lambda tokens: mapped.search(tokens, args.top_k), queries)
+            mapped.clear()
+
+        print(f"{size:>10} {baseline:>16} {memory_ms:>13.2f} ms {mmap_ms:>13.2f} ms {load_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark for text chunking
+Compares the previous character-based chunk_text (sentence regex split and
+string concatenation, 800 chars with 150 overlap) against the token-aware
+generator in chunking.py on multi-MB inputs, and measures how much of each
+old chunk SigLIP never saw: the text tower truncates at its maximum length,
+so tokens past it (including the "[Saved: ...]" suffix) were dropped
+
+With --pages it also chunks synthetic article pages in both modes, the flat
+page text ("text") and the page's clean_html split by section ("structure"),
+and reports how many chunks each needs embedded. Pages are rendered the way
+the extension captures them: text joins every visible text node of the
+content root with spaces (including div-only chrome like bylines, share bars,
+captions and related links), while clean_html keeps only heading, paragraph,
+list, table, quote and pre blocks
+
+Uses the SigLIP tokenizer when it can be loaded (HuggingFace cache or
+network); otherwise falls back to chunking.approximate_token_count and says so
+
+Usage:
+    python benchmark_chunking.py --sizes-mb 1 4 16
+    python benchmark_chunking.py --sizes-mb --pages 200
+"""
+
+import argparse
+import random
+import re
+import time
+
+from chunking import approximate_token_count, iter_chunks, iter_section_chunks
+
+MODEL_NAME = "google/siglip-so400m-patch14-384"
+OLD_CHUNK_SIZE = 800
+OLD_CHUNK_OVERLAP = 150
+OLD_MIN_CHUNK_SIZE = 100
+SAVED_SUFFIX = "\n[Saved: Tuesday evening, 07:30 PM]"
+
+WORDS = (
+    "vector database embedding search index query model retrieval semantic chunk token "
+    "the of and to in is that for with as on by this be are from at or an it which"
+).split()
+
+
+def legacy_chunk_text(text: str, chunk_size: int = OLD_CHUNK_SIZE, overlap: int = OLD_CHUNK_OVERLAP) -> list:
+    """The previous main.chunk_text"""
+    if len(text) <= chunk_size:
+        return [text]
+
+    chunks = []
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    current_chunk = ""
+
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
+            chunks.append(current_chunk.strip())
+
+            if overlap > 0 and len(current_chunk) >= overlap:
+                overlap_text = current_chunk[-overlap:].strip()
+                current_chunk = overlap_text + " " + sentence
+            else:
+                current_chunk = sentence
+        else:
+            if current_chunk:
+                current_chunk += " " + sentence
+            else:
+                current_chunk = sentence
+
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    if len(chunks) > 1:
+        chunks = [c for c in chunks if len(c) >= OLD_MIN_CHUNK_SIZE]
+
+    return chunks if chunks else [text]
+
+
+def make_text(size_mb: float, rng: random.Random) -> str:
+    """Paragraphs of random sentences, plus the occasional punctuation-free run (lists, code, URLs)"""
+    parts = []
+    size = 0
+    target = int(size_mb * 1024 * 1024)
+    while size < target:
+        if rng.random() < 0.05:
+            paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(100, 400)))
+        else:
+            paragraph = " ".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            )
+        parts.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+
+def make_page(rng: random.Random) -> list:
+    """Blocks (tag, text, inner html) of an article with nested sections, lists and a table"""
+    blocks = []
+
+    def sentences(count: int) -> str:
+        return " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+            for _ in range(count)
+        )
+
+    def chrome() -> str:
+        return rng.choice([
+            f"By {rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()} | {rng.randint(2, 15)} min read",
+            "Share Tweet Email Copy link",
+            f"Photo: {sentences(1)[:-1]}",
+            "Related: " + " ".join(sentences(1)[:-1] for _ in range(rng.randint(2, 4))),
+            "Advertisement Subscribe to our newsletter Sign up",
+        ])
+
+    blocks.append(("h1", sentences(1)[:-1], None))
+    blocks.append(("div", chrome(), None))
+    blocks.append(("p", sentences(rng.randint(1, 3)), None))
+    for _ in range(rng.randint(3, 8)):
+        blocks.append(("h2", sentences(1)[:-1], None))
+        for _ in range(rng.randint(0, 3)):
+            if rng.random() < 0.4:
+                blocks.append(("h3", sentences(1)[:-1], None))
+            for _ in range(rng.randint(1, 4)):
+                blocks.append(("p", sentences(rng.randint(1, 4)), None))
+                if rng.random() < 0.15:
+                    blocks.append(("div", chrome(), None))
+            if rng.random() < 0.3:
+                items = [sentences(1) for _ in range(rng.randint(2, 6))]
+                blocks.append(("ul", "\n".join(items), "".join(f"<li>{item}</li>" for item in items)))
+            if rng.random() < 0.1:
+                rows = [[rng.choice(WORDS) for _ in range(3)] for _ in range(rng.randint(2, 5))]
+                blocks.append(("table", "\n".join(" ".join(row) for row in rows),
+                               "".join("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>" for row in rows)))
+    return blocks
+
+
+def edit_page(blocks: list, rng: random.Random) -> list:
+    """The same page with one paragraph near the top rewritten (a re-capture)"""
+    paragraphs = [i for i, (tag, _, _) in enumerate(blocks) if tag == "p"]
+    i = paragraphs[rng.randint(0, (len(paragraphs) - 1) // 3)]
+    edited = list(blocks)
+    edited[i] = ("p", "Updated: " + blocks[i][1], None)
+    return edited
+
+
+def render(blocks: list) -> tuple:
+    """(clean_html, flat text) of a page, as popup.js extracts them"""
+    html = "".join(f"<{tag}>{inner or text}</{tag}>" for tag, text, inner in blocks if tag != "div")
+    return html, " ".join(" ".join(text for _, text, _ in blocks).split())
+
+
+def compare_modes(pages: int, count_tokens, budget: int, overlap_tokens: int):
+    """
+    Chunks per page of the text and structure chunking modes, and how many
+    chunks a re-capture with one edited paragraph has to re-embed (chunks
+    whose text is unchanged keep their embeddings)
+    """
+    rng = random.Random(1)
+    totals = {"text": [0, 0, 0, 0.0], "structure": [0, 0, 0, 0.0]}  # chunks, tokens, re-embedded, seconds
+
+    def chunk(mode: str, blocks: list) -> list:
+        html, text = render(blocks)
+        if mode == "text":
+            return list(iter_chunks(text, count_tokens, budget, overlap_tokens))
+        return [c for c, _ in iter_section_chunks(html, count_tokens, budget, overlap_tokens)]
+
+    for _ in range(pages):
+        blocks = make_page(rng)
+        edited = edit_page(blocks, rng)
+        for mode in totals:
+            start = time.perf_counter()
+            chunks = chunk(mode, blocks)
+            totals[mode][3] += time.perf_counter() - start
+            previous = set(chunks)
+            totals[mode][0] += len(chunks)
+            totals[mode][1] += sum(count_tokens(chunks))
+            totals[mode][2] += sum(1 for c in chunk(mode, edited) if c not in previous)
+
+    print("=" * 80)
+    print(f"{pages} synthetic pages, chunk budget {budget} tokens")
+    print("=" * 80)
+    print(f"{'mode':<12} {'chunks':>9} {'per page':>9} {'tokens/chunk':>13} {'re-embedded/edit':>17} {'time':>10}")
+    for mode, (chunks, tokens, reembedded, elapsed) in totals.items():
+        print(f"{mode:<12} {chunks:>9} {chunks / pages:>9.1f} {tokens / chunks:>13.1f} "
+              f"{reembedded / pages:>17.1f} {elapsed:>8.2f} s")
+
+
+def load_token_counter():
+    """(count_tokens, max_text_tokens, description)"""
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+        def count_tokens(texts):
+            if not texts:
+                return []
+            return [len(ids) for ids in tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"]]
+
+        return count_tokens, 64 - tokenizer.num_special_tokens_to_add(), f"{MODEL_NAME} tokenizer"
+    except Exception as e:
+        return approximate_token_count, 63, f"approximate token counts (tokenizer unavailable: {type(e).__name__})"
+
+
+def truncation_report(chunks: list, count_tokens, max_tokens: int) -> tuple:
+    """(fraction of chunks truncated, fraction of chunk tokens past the limit) with the saved suffix appended"""
+    counts = count_tokens([chunk + SAVED_SUFFIX for chunk in chunks])
+    truncated = sum(1 for count in counts if count > max_tokens)
+    lost = sum(max(0, count - max_tokens) for count in counts)
+    total = sum(counts)
+    return truncated / len(counts), lost / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark character vs token-aware chunking")
+    parser.add_argument("--sizes-mb", type=float, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--overlap-tokens", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=0, help="Also compare text vs structure chunking on N pages")
+    args = parser.parse_args()
+
+    count_tokens, max_tokens, counter_name = load_token_counter()
+    reserved = count_tokens([SAVED_SUFFIX])[0]
+    budget = max_tokens - reserved
+    rng = random.Random(0)
+
+    print("=" * 80)
+    print(f"Token counts: {counter_name}")
+    print(f"Text tower reads {max_tokens} tokens; token-aware chunks get {budget} (+{reserved} for the saved suffix)")
+    print("=" * 80)
+    print(f"{'input':>8} {'chunker':<12} {'time':>10} {'MB/s':>8} {'chunks':>9} {'truncated':>10} {'tokens lost':>12}")
+
+    for size_mb in args.sizes_mb:
+        text = make_text(size_mb, rng)
+
+        start = time.perf_counter()
+        old_chunks = legacy_chunk_text(text)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_chunks = list(iter_chunks(text, count_tokens, budget, args.overlap_tokens))
+        new_time = time.perf_counter() - start
+
+        for name, chunks, elapsed in (("chars", old_chunks, old_time), ("tokens", new_chunks, new_time)):
+            truncated, lost = truncation_report(chunks, count_tokens, max_tokens)
+            print(f"{size_mb:>5.1f} MB {name:<12} {elapsed:>8.2f} s {size_mb / elapsed:>8.1f} {len(chunks):>9} "
+                  f"{truncated:>9.1%} {lost:>11.1%}")
+
+    if args.pages:
+        compare_modes(args.pages, count_tokens, budget, args.overlap_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark for text chunk and image embedding throughput
+Compares one SigLIP forward pass per chunk / image (the old ingest path)
+against size-bounded batches via SigLIPEmbeddings.embed_texts and
+preprocess_images + embed_pixel_values
+
+Usage:
+    python benchmark_embedding.py --chunks 40 --batch-sizes 8 16 32 64 --images 20
+"""
+
+import argparse
+import random
+import time
+
+from PIL import Image
+
+from siglip_embeddings import SigLIPEmbeddings
+
+
+WORDS = (
+    "neural network attention transformer embedding vector search index "
+    "beach travel recipe garden history science music article notes idea "
+    "project meeting summary design system cache memory latency throughput"
+).split()
+
+
+def make_chunks(count: int, words_per_chunk: int = 120, seed: int = 0) -> list:
+    """Generate synthetic chunks roughly the size of an 800-char chunk"""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        body = " ".join(rng.choice(WORDS) for _ in range(words_per_chunk))
+        chunks.append(f"{body}.\n[Saved: Monday morning, 09:{i % 60:02d} AM]")
+    return chunks
+
+
+def make_images(count: int, seed: int = 0) -> list:
+    """Generate noisy RGB images of typical web image sizes"""
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        size = (rng.choice([320, 640, 800, 1200]), rng.choice([240, 480, 600, 800]))
+        images.append(Image.effect_noise(size, rng.uniform(20, 80)).convert("RGB"))
+    return images
+
+
+def embed_images_batched(siglip: SigLIPEmbeddings, images: list, batch_size: int) -> list:
+    """The ingest path: preprocess and embed images batch_size at a time"""
+    embeddings = []
+    for start in range(0, len(images), batch_size):
+        pixel_values = siglip.preprocess_images(images[start:start + batch_size])
+        embeddings.extend(siglip.embed_pixel_values(pixel_values))
+    return embeddings
+
+
+def time_call(fn, repeats: int) -> float:
+    """Return best wall-clock time over repeats"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SigLIP chunk embedding throughput")
+    parser.add_argument("--chunks", type=int, default=40, help="Number of chunks per document")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--images", type=int, default=20, help="Number of images per document (0 to skip)")
+    parser.add_argument("--image-batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    siglip = SigLIPEmbeddings()
+    chunks = make_chunks(args.chunks)
+
+    # Warm up model and allocator
+    siglip.embed_texts(chunks[:4])
+
+    print("=" * 60)
+    print(f"Embedding {len(chunks)} chunks on {siglip.device}")
+    print("=" * 60)
+
+    baseline = time_call(lambda: [siglip.embed_text(c) for c in chunks], args.repeats)
+    print(f"{'per-chunk (before)':<24} {baseline:8.2f}s  {len(chunks) / baseline:8.1f} chunks/sec")
+
+    for batch_size in args.batch_sizes:
+        elapsed = time_call(lambda: siglip.embed_texts(chunks, batch_size=batch_size), args.repeats)
+        speedup = baseline / elapsed if elapsed else 0.0
+        label = f"batched (size={batch_size})"
+        print(f"{label:<24} {elapsed:8.2f}s  {len(chunks) / elapsed:8.1f} chunks/sec  ({speedup:.1f}x)")
+
+    if args.images:
+        images = make_images(args.images)
+        embed_images_batched(siglip, images[:2], 2)
+
+        print("=" * 60)
+        print(f"Embedding {len(images)} images on {siglip.device}")
+        print("=" * 60)
+
+        baseline = time_call(lambda: embed_images_batched(siglip, images, 1), args.repeats)
+        print(f"{'per-image (before)':<24} {baseline:8.2f}s  {len(images) / baseline:8.1f} images/sec")
+
+        for batch_size in args.image_batch_sizes:
+            elapsed = time_call(lambda: embed_images_batched(siglip, images, batch_size), args.repeats)
+            speedup = baseline / elapsed if elapsed else 0.0
+            passes = -(-len(images) // batch_size)
+            label = f"batched (size={batch_size})"
+            print(f"{label:<24} {elapsed:8.2f}s  {len(images) / elapsed:8.1f} images/sec  "
+                  f"({speedup:.1f}x, {passes} forward passes)")
+
+
+if __name__ == "__main__":
+    main()
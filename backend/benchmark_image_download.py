@@ -0,0 +1,136 @@
+"""
+Benchmark for image downloads
+Serves generated JPEGs from a local keep-alive HTTP server and compares a
+fresh httpx.AsyncClient per image (the old download path) against the
+shared pooled client in image_utils. A per-connection delay stands in for
+the TCP+TLS handshake a real CDN costs
+
+Usage:
+    python benchmark_image_download.py --images 200 --handshake-ms 50 --max-per-host 6
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from PIL import Image
+
+import image_utils
+
+
+def make_jpeg(index: int, size: int = 256) -> bytes:
+    image = Image.new("RGB", (size, size), ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class ImageServer:
+    """Keep-alive HTTP/1.1 server on localhost counting opened connections"""
+
+    def __init__(self, images: list, handshake_ms: float):
+        server = self
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                time.sleep(handshake_ms / 1000)
+
+            def do_GET(self):
+                index = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+                body = images[index % len(images)]
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+async def download_with_fresh_client(url: str, save_path: str) -> bool:
+    """The previous download_image_from_url: one AsyncClient per image"""
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+            Image.open(io.BytesIO(response.content)).save(save_path)
+            return True
+    except Exception as e:
+        print(f"Failed to download image from {url}: {e}")
+        return False
+
+
+async def run(download, urls: list, out_dir: str) -> tuple:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        download(url, os.path.join(out_dir, f"image_{i}.jpg")) for i, url in enumerate(urls)
+    ))
+    return time.perf_counter() - start, sum(1 for result in results if result)
+
+
+async def main_async(args):
+    images = [make_jpeg(i) for i in range(16)]
+    server = ImageServer(images, args.handshake_ms)
+    urls = [f"{server.base_url}/images/{i}.jpg" for i in range(args.images)]
+
+    print("=" * 80)
+    print(f"{args.images} images from one host, {args.handshake_ms:.0f} ms per new connection")
+    print("=" * 80)
+    print(f"{'client':<28} {'wall':>10} {'images/s':>10} {'connections':>12} {'ok':>6}")
+
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            server.reset()
+            wall, ok = await run(download_with_fresh_client, urls, out_dir)
+            print(f"{'fresh client per image':<28} {wall:>8.2f} s {args.images / wall:>10.1f} "
+                  f"{server.connections:>12} {ok:>6}")
+
+            image_utils.init_http_client(max_connections=args.max_connections, max_per_host=args.max_per_host)
+            server.reset()
+            wall, ok = await run(image_utils.download_image_from_url, urls, out_dir)
+            print(f"{'pooled client':<28} {wall:>8.2f} s {args.images / wall:>10.1f} "
+                  f"{server.connections:>12} {ok:>6}")
+            await image_utils.close_http_client()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-image HTTP clients")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=50.0, help="Delay per new connection")
+    parser.add_argument("--max-connections", type=int, default=image_utils.DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument("--max-per-host", type=int, default=image_utils.DEFAULT_MAX_PER_HOST)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
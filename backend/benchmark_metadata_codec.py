@@ -0,0 +1,134 @@
+"""
+Microbenchmark for metadata deserialization
+Compares the old deserialize_metadata (json.loads attempted on every string
+value) against LazyMetadata over synthetic captured pages shaped like the
+extension's /save payload, both for legacy rows (page fields inline, no
+marker) and for rows written with encode_metadata
+
+Usage:
+    python benchmark_metadata_codec.py --pages 200 --html-kb 150
+"""
+
+import argparse
+import json
+import random
+import time
+
+from document_store import split_page_fields
+from metadata_codec import LazyMetadata, encode_metadata
+
+
+# Fields /query reads for every source chunk
+SUMMARY_FIELDS = ("document_id", "url", "title", "domain", "favicon", "timestamp_readable")
+FULL_FIELDS = SUMMARY_FIELDS + ("structured_content", "youtube_videos", "clean_html")
+
+
+def deserialize_metadata(metadata: dict) -> dict:
+    """The previous main.deserialize_metadata: try json.loads on every string"""
+    deserialized = {}
+    for key, value in metadata.items():
+        if isinstance(value, str):
+            try:
+                deserialized[key] = json.loads(value)
+            except (json.JSONDecodeError, ValueError):
+                deserialized[key] = value
+        else:
+            deserialized[key] = value
+    return deserialized
+
+
+def make_page(index: int, html_kb: int, rng: random.Random) -> dict:
+    """Metadata shaped like extension/popup.js sends it"""
+    words = [f"word{rng.randint(0, 5000)}" for _ in range(400)]
+
+    def sentence(length: int) -> str:
+        return " ".join(rng.choices(words, k=length))
+
+    structured_content = {
+        "headings": [{"level": rng.randint(1, 3), "text": sentence(6)} for _ in range(rng.randint(5, 30))],
+        "paragraphs": [sentence(rng.randint(20, 80)) for _ in range(rng.randint(10, 60))],
+        "lists": [{"type": "ul", "items": [sentence(8) for _ in range(6)]} for _ in range(rng.randint(0, 8))],
+        "tables": [{"rows": [[sentence(2) for _ in range(4)] for _ in range(8)]} for _ in range(rng.randint(0, 3))],
+        "images_positions": [{"src": f"https://cdn.example.com/{index}/{i}.jpg", "alt": sentence(4)}
+                             for i in range(rng.randint(0, 12))],
+    }
+    paragraph = "<p>" + sentence(60) + "</p>"
+    clean_html = "<article>" + paragraph * max(1, html_kb * 1024 // len(paragraph)) + "</article>"
+
+    return {
+        "url": f"https://example.com/articles/{index}?ref=feed",
+        "title": f"Article {index}: {sentence(8)}",
+        "domain": "example.com",
+        "favicon": "https://example.com/favicon.ico",
+        "timestamp": "2024-05-01T10:15:00.000Z",
+        "timestamp_readable": "5/1/2024, 10:15:00 AM",
+        "date": "5/1/2024",
+        "time": "10:15:00 AM",
+        "structured_content": structured_content,
+        "youtube_videos": [{"video_id": f"vid{index}", "title": sentence(5)}],
+        "clean_html": clean_html,
+    }
+
+
+def chunk_row(metadata: dict, doc_id: str) -> dict:
+    return {**metadata, "type": "text", "document_id": doc_id, "chunk_index": 0,
+            "total_chunks": 4, "is_chunked": True, "chunk_size": 800}
+
+
+def legacy_row(page: dict, doc_id: str) -> dict:
+    """Chunk metadata before the codec: page fields inline, JSON strings, no marker"""
+    row = {}
+    for key, value in page.items():
+        row[key] = json.dumps(value) if isinstance(value, (dict, list)) else value
+    return chunk_row(row, doc_id)
+
+
+def codec_row(page: dict, doc_id: str) -> dict:
+    """Chunk metadata as /save writes it now: page fields in the document store"""
+    _, chunk_level = split_page_fields(page)
+    return chunk_row(encode_metadata(chunk_level), doc_id)
+
+
+def time_per_row(fn, rows: list, repeats: int) -> float:
+    """Mean microseconds per row"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for row in rows:
+            fn(row)
+    return (time.perf_counter() - start) * 1e6 / (len(rows) * repeats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata deserialization")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--html-kb", type=int, default=150, help="Approximate clean_html size per page")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = [make_page(i, args.html_kb, rng) for i in range(args.pages)]
+    legacy_rows = [legacy_row(page, f"doc_{i}") for i, page in enumerate(pages)]
+    codec_rows = [codec_row(page, f"doc_{i}") for i, page in enumerate(pages)]
+
+    def lazy_fields(fields):
+        return lambda row: LazyMetadata(row).to_dict(fields)
+
+    cases = [
+        ("legacy row", "deserialize_metadata (all)", deserialize_metadata, legacy_rows),
+        ("legacy row", "LazyMetadata summary", lazy_fields(SUMMARY_FIELDS), legacy_rows),
+        ("legacy row", "LazyMetadata full", lazy_fields(FULL_FIELDS), legacy_rows),
+        ("codec row", "deserialize_metadata (all)", deserialize_metadata, codec_rows),
+        ("codec row", "LazyMetadata summary", lazy_fields(SUMMARY_FIELDS), codec_rows),
+        ("codec row", "LazyMetadata all", lambda row: LazyMetadata(row).to_dict(), codec_rows),
+    ]
+
+    print("=" * 80)
+    print(f"{args.pages} pages, ~{args.html_kb} KB clean_html each")
+    print("=" * 80)
+    print(f"{'rows':<12} {'decoder':<30} {'per row':>14}")
+    for row_kind, name, fn, rows in cases:
+        print(f"{row_kind:<12} {name:<30} {time_per_row(fn, rows, args.repeats):>11.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark for /query response payloads
+Measures response size and JSON serialization time of summary vs full
+sources (QueryInput.source_fields)
+
+Modes:
+    offline - builds query responses from synthetic captured pages and
+              serializes them the way FastAPI does (jsonable_encoder + json.dumps)
+    http    - POSTs /query to a running server with each setting and reports
+              response bytes and latency
+
+Usage:
+    python benchmark_query_payload.py --mode offline --sources 5 --html-kb 150
+    python benchmark_query_payload.py --mode http --query "vector databases"
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmark_metadata_codec import make_page
+
+API_BASE = "http://localhost:8000"
+
+PAGE_CONTENT_FIELDS = ("structured_content", "youtube_videos", "clean_html")
+
+
+def build_response(pages: list, source_fields: str) -> dict:
+    """Query response with one source per page, shaped like QueryResponse"""
+    sources = []
+    for i, page in enumerate(pages):
+        source = {
+            "document_id": f"doc_{i}",
+            "url": page["url"],
+            "title": page["title"],
+            "domain": page["domain"],
+            "favicon": page["favicon"],
+            "timestamp": page["timestamp_readable"],
+            "snippet": page["structured_content"]["paragraphs"][0][:200],
+            "relevance_score": 1.0 / (i + 1),
+        }
+        for field in PAGE_CONTENT_FIELDS:
+            source[field] = page[field] if source_fields == "full" else None
+        sources.append(source)
+    return {"response": "Generated answer " * 40, "images": [], "sources": sources}
+
+
+def time_serialization(payload: dict, repeats: int) -> tuple:
+    """(bytes, mean milliseconds) for jsonable_encoder + json.dumps"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        body = json.dumps(jsonable_encoder(payload)).encode("utf-8")
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeats
+    return len(body), elapsed_ms
+
+
+def run_offline(args):
+    rng = random.Random(0)
+    pages = [make_page(i, args.html_kb, rng) for i in range(args.sources)]
+
+    print("=" * 80)
+    print(f"{args.sources} sources, ~{args.html_kb} KB clean_html each (offline)")
+    print("=" * 80)
+    print(f"{'source_fields':<15} {'payload':>14} {'serialize':>14}")
+    for source_fields in ("summary", "full"):
+        size, elapsed_ms = time_serialization(build_response(pages, source_fields), args.repeats)
+        print(f"{source_fields:<15} {size / 1024:>11.1f} KB {elapsed_ms:>11.2f} ms")
+
+
+def run_http(args):
+    import requests
+
+    print("=" * 80)
+    print(f"POST {API_BASE}/query \"{args.query}\" top_k={args.sources} (http)")
+    print("=" * 80)
+    print(f"{'source_fields':<15} {'payload':>14} {'p50 latency':>14}")
+    for source_fields in ("summary", "full"):
+        latencies = []
+        size = 0
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            response = requests.post(
+                f"{API_BASE}/query",
+                json={"query": args.query, "top_k": args.sources, "source_fields": source_fields},
+                timeout=120
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+            size = len(response.content)
+        print(f"{source_fields:<15} {size / 1024:>11.1f} KB {statistics.median(latencies):>11.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /query payload size and serialization time")
+    parser.add_argument("--mode", choices=["offline", "http"], default="offline")
+    parser.add_argument("--sources", type=int, default=5)
+    parser.add_argument("--html-kb", type=int, default=150, help="Approximate clean_html size per page (offline)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--query", default="articles about vector databases", help="Query text (http)")
+    args = parser.parse_args()
+
+    if args.mode == "offline":
+        run_offline(args)
+    else:
+        run_http(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark for peak memory of image uploads
+Sends concurrent multipart uploads to a small server that handles them the
+way /save does and reports the server's peak RSS for each strategy:
+
+    memory  - await upload.read() and keep the bytes until the background
+              task that ingests them has run (the old BackgroundTasks path)
+    read    - await upload.read(), then hand the bytes to storage and drop them
+    spool   - image_utils.spool_upload streams each upload to disk; only the
+              path is kept (the current /save path)
+
+Each strategy runs in a fresh server process, so peak RSS (VmHWM) is not
+carried over. The http mode instead posts to a running Synapse backend and
+reads the peak RSS of its process (--pid)
+
+Usage:
+    python benchmark_upload_memory.py --requests 32 --images 4 --image-mb 5
+    python benchmark_upload_memory.py --mode http --pid 12345 --requests 32
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+STRATEGIES = ("memory", "read", "spool")
+API_BASE = "http://localhost:8000"
+
+
+def peak_rss_mb(pid: str = "self") -> float:
+    """Peak resident set size of a process in MB (VmHWM on Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid != "self":
+        raise RuntimeError("peak RSS of another process needs /proc (Linux)")
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def build_app(strategy: str, hold_seconds: float, spool_dir: str):
+    """Upload endpoint mirroring /save with the given strategy"""
+    from typing import List
+
+    from fastapi import BackgroundTasks, FastAPI, File, UploadFile
+
+    import image_utils
+
+    app = FastAPI()
+    baseline = peak_rss_mb()
+
+    async def ingest(uploads: list):
+        # Stands in for the wait until an ingest worker and the embedder get to the capture
+        await asyncio.sleep(hold_seconds)
+        for upload in uploads:
+            if isinstance(upload, str):
+                os.remove(upload)
+
+    @app.post("/upload")
+    async def upload(background_tasks: BackgroundTasks, images: List[UploadFile] = File(default=[])):
+        uploads = []
+        for uploaded_file in images:
+            if strategy == "spool":
+                fd, spool_path = tempfile.mkstemp(dir=spool_dir)
+                os.close(fd)
+                await image_utils.spool_upload(uploaded_file, spool_path, 1 << 40)
+                uploads.append(spool_path)
+            else:
+                content = await uploaded_file.read()
+                if strategy == "memory":
+                    uploads.append(content)
+                else:
+                    fd, path = tempfile.mkstemp(dir=spool_dir)
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(content)
+                    uploads.append(path)
+                    del content
+        background_tasks.add_task(ingest, uploads)
+        return {"images": len(uploads)}
+
+    @app.get("/rss")
+    def rss():
+        return {"baseline_mb": baseline, "peak_mb": peak_rss_mb()}
+
+    return app
+
+
+def serve(args):
+    import uvicorn
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        app = build_app(args.serve, args.hold, spool_dir)
+        uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def make_payloads(image_mb: float, count: int = 4) -> list:
+    """Incompressible image-sized payloads (the server never decodes them)"""
+    return [os.urandom(int(image_mb * 1024 * 1024)) for _ in range(count)]
+
+
+async def send_uploads(url: str, payloads: list, requests: int, images: int, form: dict = None) -> float:
+    """POST requests concurrently, each with images files; returns wall seconds"""
+    async with httpx.AsyncClient(timeout=None) as client:
+        async def one(i: int):
+            files = [
+                ("images", (f"image_{j}.jpg", payloads[(i + j) % len(payloads)], "image/jpeg"))
+                for j in range(images)
+            ]
+            response = await client.post(url, files=files, data=form or {})
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return time.perf_counter() - start
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/rss", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("benchmark server did not start")
+
+
+def run_offline(args):
+    payloads = make_payloads(args.image_mb)
+    total_mb = args.requests * args.images * args.image_mb
+
+    print("=" * 80)
+    print(f"{args.requests} concurrent uploads x {args.images} images x {args.image_mb:.1f} MB "
+          f"({total_mb:.0f} MB total), ingest starts after {args.hold:.1f}s")
+    print("=" * 80)
+    print(f"{'strategy':<10} {'baseline':>12} {'peak':>12} {'growth':>12} {'wall':>10}")
+
+    for strategy in args.strategies:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", strategy, "--port", str(port),
+             "--hold", str(args.hold)],
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        try:
+            wait_until_up(base_url)
+            wall = asyncio.run(send_uploads(f"{base_url}/upload", payloads, args.requests, args.images))
+            rss = httpx.get(f"{base_url}/rss").json()
+        finally:
+            server.terminate()
+            server.wait()
+
+        growth = rss["peak_mb"] - rss["baseline_mb"]
+        print(f"{strategy:<10} {rss['baseline_mb']:>9.1f} MB {rss['peak_mb']:>9.1f} MB "
+              f"{growth:>9.1f} MB {wall:>8.2f} s")
+
+
+def run_http(args):
+    from PIL import Image
+
+    # Valid JPEGs of roughly the requested size, so the ingest workers can decode them
+    side = int((args.image_mb * 1024 * 1024 / 3) ** 0.5)
+    payloads = []
+    for i in range(4):
+        buffer = io.BytesIO()
+        Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(buffer, format="JPEG", quality=95)
+        payloads.append(buffer.getvalue())
+
+    before = peak_rss_mb(args.pid)
+    wall = asyncio.run(send_uploads(
+        f"{API_BASE}/save", payloads, args.requests, args.images,
+        form={"text": "", "metadata": "{}", "image_urls": "[]"}
+    ))
+    after = peak_rss_mb(args.pid)
+
+    print("=" * 80)
+    print(f"POST {API_BASE}/save: {args.requests} concurrent uploads x {args.images} images "
+          f"(~{len(payloads[0]) / 1024 / 1024:.1f} MB each)")
+    print("=" * 80)
+    print(f"peak RSS before {before:.1f} MB, after {after:.1f} MB (+{after - before:.1f} MB), wall {wall:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak server RSS under concurrent image uploads")
+    parser.add_argument("--mode", choices=["offline", "http"], default="offline")
+    parser.add_argument("--requests", type=int, default=32, help="Concurrent upload requests")
+    parser.add_argument("--images", type=int, default=4, help="Images per request")
+    parser.add_argument("--image-mb", type=float, default=5.0, help="Size of each image")
+    parser.add_argument("--hold", type=float, default=2.0, help="Seconds before a queued capture is ingested (offline)")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--pid", help="PID of the running backend (http)")
+    parser.add_argument("--serve", choices=STRATEGIES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+    elif args.mode == "offline":
+        run_offline(args)
+    else:
+        if not args.pid:
+            parser.error("--mode http needs --pid of the backend process")
+        run_http(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Content-addressed blob store for large page payloads
+Blobs are keyed by the SHA-256 of their uncompressed bytes, compressed with
+zstd when the zstandard package is installed (zlib otherwise) and written
+once, so identical clean_html / structured_content is stored a single time
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+from typing import Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, zlib is always available
+    zstandard = None
+
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+# File extension per codec; blobs written with either codec stay readable
+ZSTD_EXTENSION = ".zst"
+ZLIB_EXTENSION = ".zz"
+
+
+class BlobStore:
+    """Compressed, deduplicated blobs on local disk"""
+
+    def __init__(self, root: str):
+        """
+        Open (or create) the store.
+
+        Args:
+            root: Directory holding the blobs (sharded by the first two hex digits)
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.codec = "zstd" if zstandard is not None else "zlib"
+
+    def _path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + extension)
+
+    def _find(self, digest: str) -> Optional[str]:
+        for extension in (ZSTD_EXTENSION, ZLIB_EXTENSION):
+            path = self._path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, data: bytes) -> tuple:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), ZSTD_EXTENSION
+        return zlib.compress(data, ZLIB_LEVEL), ZLIB_EXTENSION
+
+    def put(self, data: bytes) -> str:
+        """
+        Store bytes, skipping the write if identical content already exists.
+
+        Args:
+            data: Uncompressed blob content
+
+        Returns:
+            Hex SHA-256 digest used as the blob key
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if self._find(digest):
+            return digest
+
+        compressed, extension = self._compress(data)
+        path = self._path(digest, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """
+        Read and decompress a blob.
+
+        Returns:
+            Uncompressed bytes, or None if the blob does not exist
+        """
+        path = self._find(digest)
+        if path is None:
+            return None
+
+        with open(path, "rb") as f:
+            compressed = f.read()
+
+        if path.endswith(ZSTD_EXTENSION):
+            if zstandard is None:
+                raise RuntimeError(f"Blob {digest} is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(compressed)
+        return zlib.decompress(compressed)
+
+    def __contains__(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    def delete(self, digest: str):
+        path = self._find(digest)
+        if path:
+            os.remove(path)
+
+    def digests(self) -> Iterator[str]:
+        """Digests of every stored blob"""
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                digest, extension = os.path.splitext(name)
+                if extension in (ZSTD_EXTENSION, ZLIB_EXTENSION):
+                    yield digest
+
+    def clear(self):
+        """Remove every blob"""
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def disk_usage(self) -> int:
+        """Total compressed size of all blobs in bytes"""
+        total = 0
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                total += os.path.getsize(os.path.join(dirpath, name))
+        return total
@@ -0,0 +1,616 @@
+"""
+Incremental BM25 keyword index
+Maintains an inverted index (postings, document lengths, document
+frequencies) so individual chunks can be added and removed without
+re-tokenizing the whole corpus, and persists it as a compact
+memory-mapped file so startup does not have to rebuild it
+"""
+
+import heapq
+import math
+from bisect import bisect_left
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# On-disk format version; bump whenever the layout below changes
+FORMAT_VERSION = 1
+
+_MAGIC = b"SYNBM25\x00"
+# magic, format version, byte order (0 little / 1 big), n_docs, n_terms, total_length, fingerprint length
+_HEADER = struct.Struct("<8sIB3xIIQI")
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+
+class WriteGeneration:
+    """
+    Durable counter of collection writes, for versioning the persisted index.
+
+    Bumped (and synced to disk) before every write to the collection, so an
+    index saved before a write, or before a crash in the middle of one,
+    never matches the current generation again.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Small text file holding the current generation
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.value = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self.value = 0
+
+    def bump(self) -> int:
+        """Advance the generation and persist it; returns the new value"""
+        with self._lock:
+            value = self.value + 1
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(str(value))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.value = value
+            return value
+
+
+def tokenize(text: str) -> List[str]:
+    """Simple tokenization (split by whitespace and lowercase)"""
+    return text.lower().split()
+
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+class _DiskSegment:
+    """
+    Read-only, memory-mapped BM25 segment.
+
+    Layout after the header and fingerprint (arrays are native uint32,
+    4-byte aligned; document ids are sorted by their UTF-8 bytes):
+
+        doc_id_offsets[n_docs + 1]   offsets into the id blob
+        doc_lengths[n_docs]
+        term_offsets[n_terms + 1]    offsets into the term blob
+        postings_start[n_terms + 1]  prefix sums, df = start[i + 1] - start[i]
+        postings_docs[P]             document indexes per term, ascending
+        postings_tfs[P]              term frequencies, parallel to postings_docs
+        id blob, term blob
+
+    Only the vocabulary is decoded on open; postings, lengths and ids are
+    read straight from the mapping when a query touches them.
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self._file = open(path, "rb")
+        self._views = []
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        try:
+            self._open(fingerprint)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, fingerprint: str):
+        view = memoryview(self._mmap)
+        self._views.append(view)
+
+        magic, version, byte_order, n_docs, n_terms, total_length, fp_len = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            raise ValueError("Unsupported BM25 index format")
+
+        stored_fingerprint = bytes(view[_HEADER.size:_HEADER.size + fp_len]).decode("utf-8")
+        if stored_fingerprint != fingerprint:
+            raise ValueError("BM25 index is stale")
+
+        self.n_docs = n_docs
+        self.n_terms = n_terms
+        self.total_length = total_length
+        pos = _align(_HEADER.size + fp_len)
+
+        def take(count: int):
+            nonlocal pos
+            end = pos + 4 * count
+            if end > len(view):
+                raise ValueError("Truncated BM25 index")
+            array_view = view[pos:end].cast("I")
+            self._views.append(array_view)
+            pos = end
+            return array_view
+
+        self.doc_id_offsets = take(n_docs + 1)
+        self.doc_lengths = take(n_docs)
+        term_offsets = take(n_terms + 1)
+        self.postings_start = take(n_terms + 1)
+        total_postings = self.postings_start[n_terms]
+        self.postings_docs = take(total_postings)
+        self.postings_tfs = take(total_postings)
+
+        ids_end = pos + self.doc_id_offsets[n_docs]
+        self._id_blob = view[pos:ids_end]
+        self._views.append(self._id_blob)
+        term_blob = bytes(view[ids_end:ids_end + term_offsets[n_terms]])
+
+        self.terms = {
+            term_blob[term_offsets[i]:term_offsets[i + 1]].decode("utf-8"): i
+            for i in range(n_terms)
+        }
+
+    def doc_id_bytes(self, index: int) -> bytes:
+        return bytes(self._id_blob[self.doc_id_offsets[index]:self.doc_id_offsets[index + 1]])
+
+    def doc_id(self, index: int) -> str:
+        return self.doc_id_bytes(index).decode("utf-8")
+
+    def find(self, doc_id: str) -> Optional[int]:
+        """Binary search for a document index by id"""
+        target = doc_id.encode("utf-8")
+        lo, hi = 0, self.n_docs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.doc_id_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_docs and self.doc_id_bytes(lo) == target:
+            return lo
+        return None
+
+    def document_frequency(self, term: str) -> int:
+        term_index = self.terms.get(term)
+        if term_index is None:
+            return 0
+        return self.postings_start[term_index + 1] - self.postings_start[term_index]
+
+    def deleted_frequency(self, term: str, deleted: set) -> int:
+        """Number of documents in deleted (tombstoned indexes) that contain term"""
+        term_index = self.terms.get(term)
+        if term_index is None or not deleted:
+            return 0
+        start = self.postings_start[term_index]
+        end = self.postings_start[term_index + 1]
+        if len(deleted) < end - start:
+            # Postings are sorted by document index: binary search each tombstone
+            docs = self.postings_docs
+            count = 0
+            for index in deleted:
+                position = bisect_left(docs, index, start, end)
+                count += position < end and docs[position] == index
+            return count
+        return sum(1 for index in self.postings_docs[start:end] if index in deleted)
+
+    def postings(self, term: str):
+        """Return (doc indexes, term frequencies) views for term, or None"""
+        term_index = self.terms.get(term)
+        if term_index is None:
+            return None
+        start = self.postings_start[term_index]
+        end = self.postings_start[term_index + 1]
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def close(self):
+        # Views must be released before the mapping can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an incrementally maintained inverted index.
+
+    Adding or removing a chunk only touches the postings of that chunk's
+    terms, and scoring only touches the postings of the query terms.
+
+    The index is a read-only memory-mapped base segment (loaded from disk)
+    plus an in-memory delta of chunks added since. Removing a chunk from the
+    base segment records a tombstone, which the next save merges away.
+    Document frequencies leave tombstoned chunks out, so they never exceed
+    the number of live documents N.
+
+    IDF uses the non-negative Lucene form log(1 + (N - n + 0.5) / (n + 0.5)),
+    since the epsilon floor used by rank_bm25's BM25Okapi depends on the
+    average IDF over the whole vocabulary and cannot be kept incrementally.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+
+        # In-memory delta
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {doc_id: term frequency}
+        self._doc_lengths: Dict[str, int] = {}  # doc_id -> number of tokens
+        self._doc_terms: Dict[str, tuple] = {}  # doc_id -> unique terms (for removal)
+        self._total_length = 0
+
+        # Memory-mapped base segment and its tombstones
+        self._base: Optional[_DiskSegment] = None
+        self._base_deleted = set()
+        self._base_deleted_length = 0
+
+        self.pending_changes = 0  # adds/removes since the last save or load
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        base_docs = self._base.n_docs - len(self._base_deleted) if self._base else 0
+        return base_docs + len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._doc_lengths or self._find_base(doc_id) is not None
+
+    @property
+    def total_length(self) -> int:
+        base_length = self._base.total_length - self._base_deleted_length if self._base else 0
+        return base_length + self._total_length
+
+    @property
+    def average_length(self) -> float:
+        total_docs = len(self)
+        return self.total_length / total_docs if total_docs else 0.0
+
+    def document_frequency(self, term: str) -> int:
+        """Number of live documents containing term"""
+        base_df = 0
+        if self._base:
+            base_df = self._base.document_frequency(term)
+            if base_df and self._base_deleted:
+                base_df -= self._base.deleted_frequency(term, self._base_deleted)
+        return base_df + len(self._postings.get(term, ()))
+
+    def _find_base(self, doc_id: str) -> Optional[int]:
+        """Index of a live document in the base segment"""
+        if self._base is None:
+            return None
+        index = self._base.find(doc_id)
+        if index is None or index in self._base_deleted:
+            return None
+        return index
+
+    def add(self, doc_id: str, text: str):
+        """
+        Index a single document, replacing any previous version with the same id.
+
+        Args:
+            doc_id: Chunk identifier (ChromaDB id)
+            text: Chunk text
+        """
+        tokens = tokenize(text)
+        term_counts = Counter(tokens)
+
+        with self._lock:
+            self._remove_locked(doc_id)
+
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+
+            self._doc_lengths[doc_id] = len(tokens)
+            self._doc_terms[doc_id] = tuple(term_counts)
+            self._total_length += len(tokens)
+            self.pending_changes += 1
+
+    def add_many(self, doc_ids: Iterable[str], texts: Iterable[str]):
+        """Index several documents"""
+        for doc_id, text in zip(doc_ids, texts):
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a document from the index.
+
+        Returns:
+            True if the document was indexed
+        """
+        with self._lock:
+            removed = self._remove_locked(doc_id)
+            if removed:
+                self.pending_changes += 1
+            return removed
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        if doc_id in self._doc_lengths:
+            for term in self._doc_terms.pop(doc_id, ()):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            return True
+
+        base_index = self._find_base(doc_id)
+        if base_index is not None:
+            self._base_deleted.add(base_index)
+            self._base_deleted_length += self._base.doc_lengths[base_index]
+            return True
+
+        return False
+
+    def clear(self):
+        """Drop all documents"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._total_length = 0
+            self._close_base()
+            self.pending_changes = 0
+
+    def _close_base(self):
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+        self._base_deleted = set()
+        self._base_deleted_length = 0
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency of term"""
+        n = self.document_frequency(term)
+        total_docs = len(self)
+        return math.log(1 + (total_docs - n + 0.5) / (n + 0.5))
+
+    def _accumulate(self, query_tokens: List[str], k: Optional[int] = None) -> Tuple[Dict[str, float], Dict[int, float]]:
+        """
+        Term-at-a-time scoring over the postings of the query terms.
+
+        When k is given, terms are processed in decreasing order of their
+        maximum possible contribution (idf * (k1 + 1)). Once the k-th best
+        accumulated score exceeds what all remaining terms could add
+        together, documents not seen so far cannot reach the top k, so the
+        remaining postings only update existing accumulators (MaxScore-style
+        pruning; the top k stays exact).
+
+        Returns:
+            (delta scores keyed by doc id, base segment scores keyed by index)
+        """
+        delta_scores: Dict[str, float] = {}
+        base_scores: Dict[int, float] = {}
+
+        if len(self) == 0:
+            return delta_scores, base_scores
+
+        avg_length = self.average_length or 1.0
+        k1 = self.k1
+        b = self.b
+        base = self._base
+        deleted = self._base_deleted
+
+        weighted_terms = [(term, self.idf(term)) for term in query_tokens]
+        weighted_terms = [(term, idf) for term, idf in weighted_terms if self.document_frequency(term)]
+        if k is not None:
+            weighted_terms.sort(key=lambda entry: entry[1], reverse=True)
+
+        # remaining_bounds[i] = best possible score from terms i.. onwards
+        remaining_bounds = [0.0] * (len(weighted_terms) + 1)
+        for i in range(len(weighted_terms) - 1, -1, -1):
+            remaining_bounds[i] = remaining_bounds[i + 1] + weighted_terms[i][1] * (k1 + 1)
+
+        admit_new = True
+        for position, (term, idf) in enumerate(weighted_terms):
+            if k is not None and admit_new and len(delta_scores) + len(base_scores) >= k:
+                kth_score = heapq.nlargest(k, chain(delta_scores.values(), base_scores.values()))[-1]
+                admit_new = kth_score <= remaining_bounds[position]
+
+            postings = self._postings.get(term)
+            if postings:
+                for doc_id, tf in postings.items():
+                    if not admit_new and doc_id not in delta_scores:
+                        continue
+                    norm = k1 * (1 - b + b * self._doc_lengths[doc_id] / avg_length)
+                    delta_scores[doc_id] = delta_scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+            base_postings = base.postings(term) if base else None
+            if base_postings:
+                lengths = base.doc_lengths
+                for index, tf in zip(*base_postings):
+                    if index in deleted or (not admit_new and index not in base_scores):
+                        continue
+                    norm = k1 * (1 - b + b * lengths[index] / avg_length)
+                    base_scores[index] = base_scores.get(index, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return delta_scores, base_scores
+
+    def get_scores(self, query_tokens: List[str]) -> Dict[str, float]:
+        """
+        Score every document that contains at least one query token.
+
+        Args:
+            query_tokens: Tokenized query (see tokenize)
+
+        Returns:
+            Dict of doc_id -> BM25 score (documents without matches are omitted)
+        """
+        with self._lock:
+            scores, base_scores = self._accumulate(query_tokens)
+
+            # Resolve base ids only for documents that actually matched
+            for index, score in base_scores.items():
+                scores[self._base.doc_id(index)] = score
+
+        return scores
+
+    def search(self, query_tokens: List[str], k: int) -> List[Tuple[str, float]]:
+        """
+        Return the k best scoring documents without scoring or sorting the corpus.
+
+        Only postings of the query terms are read, and the top k is selected
+        with a heap instead of a full sort.
+
+        Args:
+            query_tokens: Tokenized query (see tokenize)
+            k: Number of results
+
+        Returns:
+            List of (doc_id, score) tuples sorted by score, highest first
+        """
+        if k <= 0:
+            return []
+
+        with self._lock:
+            delta_scores, base_scores = self._accumulate(query_tokens, k)
+
+            candidates = chain(
+                ((score, 0, doc_id) for doc_id, score in delta_scores.items()),
+                ((score, 1, index) for index, score in base_scores.items())
+            )
+            top = heapq.nlargest(k, candidates, key=lambda entry: entry[0])
+
+            return [
+                (key if segment == 0 else self._base.doc_id(key), score)
+                for score, segment, key in top
+            ]
+
+    # ===== PERSISTENCE =====
+
+    def load(self, path: str, fingerprint: str) -> bool:
+        """
+        Replace the index contents with a persisted segment.
+
+        Args:
+            path: Index file written by save()
+            fingerprint: Collection version the file must have been saved against
+
+        Returns:
+            True if the file was loaded, False if it is missing, corrupt or stale
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            segment = _DiskSegment(path, fingerprint)
+        except Exception as e:
+            print(f"BM25 index at {path} not usable: {e}")
+            return False
+
+        with self._lock:
+            self.clear()
+            self._base = segment
+        return True
+
+    def save(self, path: str, fingerprint: str):
+        """
+        Merge the base segment, tombstones and delta into a new file and map it.
+
+        Args:
+            path: Destination index file (written atomically via a temp file)
+            fingerprint: Collection version this index corresponds to
+        """
+        with self._lock:
+            tmp_path = f"{path}.tmp"
+            self._write_merged(tmp_path, fingerprint)
+
+            # The old mapping must be closed before the file can be replaced on Windows
+            self._close_base()
+            os.replace(tmp_path, path)
+
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._total_length = 0
+            self._base = _DiskSegment(path, fingerprint)
+            self.pending_changes = 0
+
+    def _write_merged(self, path: str, fingerprint: str):
+        base = self._base
+
+        # Live documents sorted by id bytes; remember where each one lands
+        live = []
+        if base is not None:
+            for index in range(base.n_docs):
+                if index not in self._base_deleted:
+                    live.append((base.doc_id_bytes(index), base.doc_lengths[index], index))
+        for doc_id, length in self._doc_lengths.items():
+            live.append((doc_id.encode("utf-8"), length, doc_id))
+        live.sort(key=lambda entry: entry[0])
+
+        base_map: Dict[int, int] = {}
+        delta_map: Dict[str, int] = {}
+        doc_id_offsets = array("I", [0])
+        doc_lengths = array("I")
+        id_blob = bytearray()
+        total_length = 0
+
+        for new_index, (id_bytes, length, source) in enumerate(live):
+            if isinstance(source, int):
+                base_map[source] = new_index
+            else:
+                delta_map[source] = new_index
+            id_blob += id_bytes
+            doc_id_offsets.append(len(id_blob))
+            doc_lengths.append(length)
+            total_length += length
+
+        terms = set(self._postings)
+        if base is not None:
+            terms.update(base.terms)
+
+        term_offsets = array("I", [0])
+        postings_start = array("I", [0])
+        postings_docs = array("I")
+        postings_tfs = array("I")
+        term_blob = bytearray()
+
+        for term in sorted(terms):
+            entries = []
+            base_postings = base.postings(term) if base is not None else None
+            if base_postings:
+                for index, tf in zip(*base_postings):
+                    new_index = base_map.get(index)
+                    if new_index is not None:
+                        entries.append((new_index, tf))
+            for doc_id, tf in self._postings.get(term, {}).items():
+                entries.append((delta_map[doc_id], tf))
+            if not entries:
+                continue
+
+            entries.sort()
+            term_blob += term.encode("utf-8")
+            term_offsets.append(len(term_blob))
+            postings_docs.extend(entry[0] for entry in entries)
+            postings_tfs.extend(entry[1] for entry in entries)
+            postings_start.append(len(postings_docs))
+
+        fingerprint_bytes = fingerprint.encode("utf-8")
+        header = _HEADER.pack(
+            _MAGIC, FORMAT_VERSION, _BYTE_ORDER,
+            len(live), len(term_offsets) - 1, total_length, len(fingerprint_bytes)
+        )
+
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(fingerprint_bytes)
+            f.write(b"\x00" * (_align(len(header) + len(fingerprint_bytes)) - len(header) - len(fingerprint_bytes)))
+            for values in (doc_id_offsets, doc_lengths, term_offsets, postings_start, postings_docs, postings_tfs):
+                values.tofile(f)
+            f.write(id_blob)
+            f.write(term_blob)
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,223 @@
+"""
+Bulk import of local archives into Synapse
+Reads text/markdown/HTML files from directories and records from JSONL files,
+and streams them to the /bulk endpoint in large NDJSON requests, where they
+are chunked, embedded and written to the collection in big batches. Reports
+documents/sec as it goes
+
+JSONL records are either /bulk records ({"text", "metadata", "image_urls"})
+or flat objects with a "text" (or "content") field, whose other fields
+become the metadata (url, title, timestamp, ...)
+
+Usage:
+    python bulk_ingest.py ~/notes history.jsonl --batch 1000
+    python bulk_ingest.py ~/saved_pages --chunking-mode structure
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+API_BASE = "http://localhost:8000"
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".org"}
+HTML_EXTENSIONS = {".html", ".htm"}
+JSONL_EXTENSIONS = {".jsonl", ".ndjson"}
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Visible text and <title> of an HTML file"""
+
+    SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth and data.strip():
+            self.parts.append(data.strip())
+
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+
+def file_record(path: Path, chunking_mode: str = "text") -> Optional[Dict]:
+    """/bulk record for a text, markdown or HTML file (None if it is empty)"""
+    content = path.read_text(encoding="utf-8", errors="replace")
+    title = path.stem
+    page_fields = {}
+    if path.suffix.lower() in HTML_EXTENSIONS:
+        extractor = HTMLTextExtractor()
+        extractor.feed(content)
+        if chunking_mode == "structure":
+            # Structure mode chunks the page by its headings, from the HTML itself
+            page_fields["clean_html"] = content
+        content = extractor.text()
+        title = extractor.title.strip() or title
+
+    if not content.strip():
+        return None
+
+    modified = datetime.fromtimestamp(path.stat().st_mtime)
+    return {
+        "text": content,
+        "metadata": {
+            "title": title,
+            "source": "bulk_import",
+            "file_path": str(path),
+            "timestamp": modified.isoformat(),
+            "timestamp_readable": modified.strftime("%Y-%m-%d %H:%M:%S"),
+            **page_fields,
+        },
+    }
+
+
+def jsonl_record(obj: Dict) -> Optional[Dict]:
+    """/bulk record for one JSONL object (None if it has no content)"""
+    if "metadata" in obj:
+        return obj
+
+    metadata = {key: value for key, value in obj.items() if key not in ("text", "content", "image_urls")}
+    metadata.setdefault("source", "bulk_import")
+    url = metadata.get("url")
+    if url and "domain" not in metadata:
+        metadata["domain"] = urlparse(url).netloc
+
+    text = obj.get("text") or obj.get("content") or ""
+    if not text.strip() and not obj.get("image_urls"):
+        return None
+    return {"text": text, "metadata": metadata, "image_urls": obj.get("image_urls", [])}
+
+
+def iter_records(paths: list, skipped: list, chunking_mode: str = "text") -> Iterator[Dict]:
+    """Records from every supported file under the given files and directories"""
+    for root in paths:
+        root = Path(root).expanduser()
+        files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+        for path in files:
+            suffix = path.suffix.lower()
+            try:
+                if suffix in JSONL_EXTENSIONS:
+                    with open(path, encoding="utf-8") as f:
+                        for line_number, line in enumerate(f, 1):
+                            if not line.strip():
+                                continue
+                            try:
+                                record = jsonl_record(json.loads(line))
+                            except (ValueError, AttributeError) as e:
+                                skipped.append(f"{path}:{line_number}: {e}")
+                                continue
+                            if record:
+                                yield record
+                elif suffix in TEXT_EXTENSIONS or suffix in HTML_EXTENSIONS:
+                    record = file_record(path, chunking_mode)
+                    if record:
+                        yield record
+            except (OSError, ValueError) as e:
+                skipped.append(f"{path}: {e}")
+
+
+def batches(records: Iterator[Dict], size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def post_batch(client: httpx.Client, batch: list, enable_chunking: bool, chunking_mode: str) -> Dict:
+    """Send one batch to /bulk as a streamed NDJSON body"""
+    def body():
+        for record in batch:
+            record.setdefault("enable_chunking", enable_chunking)
+            record.setdefault("chunking_mode", chunking_mode)
+            yield (json.dumps(record) + "\n").encode("utf-8")
+
+    response = client.post(
+        f"{API_BASE}/bulk",
+        content=body(),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    global API_BASE
+
+    parser = argparse.ArgumentParser(description="Import directories and JSONL files into Synapse via /bulk")
+    parser.add_argument("paths", nargs="+", help="Directories (searched recursively) and/or files")
+    parser.add_argument("--batch", type=int, default=1000, help="Documents per /bulk request")
+    parser.add_argument("--no-chunking", action="store_true", help="Store each document as a single chunk")
+    parser.add_argument("--chunking-mode", choices=["text", "structure"], default="text",
+                        help="structure: chunk HTML files (and records with clean_html) by section")
+    parser.add_argument("--api", default=API_BASE, help="Synapse backend URL")
+    args = parser.parse_args()
+    API_BASE = args.api.rstrip("/")
+
+    skipped = []
+    totals = {"documents": 0, "ingested": 0, "queued": 0, "failed": 0, "chunks": 0}
+    start = time.perf_counter()
+
+    with httpx.Client(timeout=httpx.Timeout(30.0, read=None)) as client:
+        for batch in batches(iter_records(args.paths, skipped, args.chunking_mode), args.batch):
+            try:
+                result = post_batch(client, batch, not args.no_chunking, args.chunking_mode)
+            except httpx.HTTPError as e:
+                print(f"✗ Batch of {len(batch)} documents failed: {e}")
+                totals["failed"] += len(batch)
+                continue
+
+            for key in totals:
+                totals[key] += result[key]
+            for error in result["errors"]:
+                print(f"✗ Rejected record: {error['error']}")
+
+            elapsed = time.perf_counter() - start
+            done = totals["ingested"] + totals["queued"]
+            print(f"✓ {done} documents ({totals['chunks']} chunks) in {elapsed:.1f}s - "
+                  f"batch {result['documents_per_second']:.1f} docs/s, overall {done / elapsed:.1f} docs/s")
+
+    elapsed = time.perf_counter() - start
+    done = totals["ingested"] + totals["queued"]
+    print("=" * 80)
+    print(f"Ingested {totals['ingested']}, queued {totals['queued']} (pages with images or re-captures), "
+          f"failed {totals['failed']}, {totals['chunks']} chunks")
+    print(f"{done} documents in {elapsed:.1f}s = {done / elapsed if elapsed else 0:.1f} documents/sec")
+    for message in skipped:
+        print(f"✗ Skipped {message}")
+    if totals["failed"] or skipped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
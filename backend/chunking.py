@@ -0,0 +1,359 @@
+"""
+Token-aware text chunking
+Splits text into overlapping chunks sized in tokens of the embedding model,
+so no chunk is longer than what the SigLIP text tower actually reads (it
+truncates everything past its maximum length). Chunks are produced lazily
+as slices of the input, in time linear in its length.
+
+Structure-aware mode splits a captured page's clean_html into sections
+under its headings instead, and only cuts a section at a chunk boundary
+when it does not fit in one chunk
+"""
+
+import math
+import re
+from collections import deque
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Counts tokens for a batch of texts (e.g. SigLIPEmbeddings.count_tokens)
+TokenCounter = Callable[[List[str]], List[int]]
+
+DEFAULT_MAX_TOKENS = 64  # SigLIP text max length
+DEFAULT_OVERLAP_TOKENS = 8
+COUNT_BATCH_SIZE = 256  # sentences tokenized per tokenizer call
+
+# Chunking modes accepted by /save and /bulk
+CHUNKING_MODES = ("text", "structure")
+HEADING_PATH_SEPARATOR = " > "
+
+# A sentence ends at .!? followed by whitespace (like the old splitter), or
+# before a blank line, or at the end of the text
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s|$)|(?=\n[ \t]*\n)|$)", re.DOTALL)
+WORD_PATTERN = re.compile(r"\S+")
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def approximate_token_count(texts: List[str]) -> List[int]:
+    """
+    Tokenizer-free estimate of SentencePiece token counts (~1 token per
+    short word or punctuation mark, long words split every 6 characters).
+    Used when the real tokenizer is not available.
+    """
+    return [
+        sum(max(1, math.ceil(len(piece) / 6)) for piece in _APPROX_TOKEN_PATTERN.findall(text))
+        for text in texts
+    ]
+
+
+def _split_long_span(
+    text: str,
+    start: int,
+    end: int,
+    max_tokens: int,
+    count_tokens: TokenCounter
+) -> Iterator[Tuple[int, int, int]]:
+    """Split a span longer than max_tokens at word boundaries (or inside over-long words)"""
+    words = [match.span() for match in WORD_PATTERN.finditer(text, start, end)]
+    word_tokens = count_tokens([text[s:e] for s, e in words])
+
+    piece_start = piece_end = None
+    piece_tokens = 0
+    for (word_start, word_end), tokens in zip(words, word_tokens):
+        if tokens > max_tokens:
+            if piece_start is not None:
+                yield piece_start, piece_end, piece_tokens
+                piece_start, piece_tokens = None, 0
+            yield from _split_long_word(text, word_start, word_end, tokens, max_tokens, count_tokens)
+            continue
+
+        if piece_start is not None and piece_tokens + tokens > max_tokens:
+            yield piece_start, piece_end, piece_tokens
+            piece_start, piece_tokens = None, 0
+        if piece_start is None:
+            piece_start = word_start
+        piece_end = word_end
+        piece_tokens += tokens
+
+    if piece_start is not None:
+        yield piece_start, piece_end, piece_tokens
+
+
+def _split_long_word(
+    text: str,
+    start: int,
+    end: int,
+    tokens: int,
+    max_tokens: int,
+    count_tokens: TokenCounter
+) -> Iterator[Tuple[int, int, int]]:
+    """Cut a single over-long token run (URLs, base64, ...) into character slices that fit"""
+    if tokens <= max_tokens or end - start <= 1:
+        yield start, end, tokens
+        return
+
+    pieces = math.ceil(tokens / max_tokens)
+    step = max(1, math.ceil((end - start) / pieces))
+    bounds = [(s, min(s + step, end)) for s in range(start, end, step)]
+    for (s, e), piece_tokens in zip(bounds, count_tokens([text[s:e] for s, e in bounds])):
+        yield from _split_long_word(text, s, e, piece_tokens, max_tokens, count_tokens)
+
+
+def iter_units(
+    text: str,
+    max_tokens: int,
+    count_tokens: TokenCounter,
+    count_batch_size: int = COUNT_BATCH_SIZE
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Sentences of text as (start, end, tokens), each at most max_tokens long.
+
+    Sentences are tokenized in batches; longer ones are split at word boundaries.
+    """
+    spans = SENTENCE_PATTERN.finditer(text)
+    while True:
+        batch = [match.span() for _, match in zip(range(count_batch_size), spans)]
+        if not batch:
+            return
+        for (start, end), tokens in zip(batch, count_tokens([text[s:e] for s, e in batch])):
+            if tokens > max_tokens:
+                yield from _split_long_span(text, start, end, max_tokens, count_tokens)
+            else:
+                yield start, end, tokens
+
+
+def iter_chunks(
+    text: str,
+    count_tokens: TokenCounter,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS
+) -> Iterator[str]:
+    """
+    Lazily split text into chunks of at most max_tokens tokens.
+
+    Whole sentences are packed into each chunk; the trailing sentences of a
+    chunk (up to overlap_tokens) are repeated at the start of the next one.
+
+    Args:
+        text: Text to split
+        count_tokens: Batch token counter of the embedding model
+        max_tokens: Token budget per chunk (model max length minus anything appended)
+        overlap_tokens: Tokens of context carried into the next chunk
+
+    Yields:
+        Chunk strings (slices of text)
+    """
+    max_tokens = max(1, max_tokens)
+    for chunk, _ in _pack_units(text, iter_units(text, max_tokens, count_tokens), max_tokens, overlap_tokens):
+        yield chunk
+
+
+def _pack_units(
+    text: str,
+    units: Iterable[Tuple[int, int, int]],
+    max_tokens: int,
+    overlap_tokens: int
+) -> Iterator[Tuple[str, int]]:
+    """Pack counted sentences (from iter_units) into (chunk, tokens) for iter_chunks"""
+    window = deque()  # (start, end, tokens) of the sentences in the current chunk
+    window_tokens = 0
+    has_new = False  # the window holds a sentence not yet emitted
+
+    for start, end, tokens in units:
+        if window and window_tokens + tokens > max_tokens:
+            yield text[window[0][0]:window[-1][1]], window_tokens
+            has_new = False
+            # Keep the tail as overlap, as long as the next sentence still fits
+            while window and (window_tokens > overlap_tokens or window_tokens + tokens > max_tokens):
+                window_tokens -= window.popleft()[2]
+
+        window.append((start, end, tokens))
+        window_tokens += tokens
+        has_new = True
+
+    if has_new:
+        yield text[window[0][0]:window[-1][1]], window_tokens
+
+
+class SectionParser(HTMLParser):
+    """
+    Content blocks of a page's clean_html in document order, each with the
+    path of headings it sits under.
+
+    The extension builds clean_html from every matching element, so nested
+    blocks (a <p> inside a <blockquote>, a nested <ul>) appear a second time
+    on their own; those repeats are dropped.
+    """
+
+    HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+    BLOCK_TAGS = {"p", "ul", "ol", "table", "blockquote", "pre"}
+    CONTAINER_TAGS = {"ul", "ol", "table", "blockquote"}
+    SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__()
+        self.blocks = []  # (heading_path, text, is_heading)
+        self._headings = []  # (level, text) of the current heading path
+        self._block_tag = None
+        self._block_depth = 0
+        self._parts = []
+        self._skip_depth = 0
+        self._last_block_tag = None
+        self._last_block_text = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._block_tag is None:
+            if tag in self.HEADING_TAGS or tag in self.BLOCK_TAGS:
+                self._block_tag = tag
+                self._block_depth = 1
+                self._parts = []
+            return
+
+        if tag == self._block_tag:
+            self._block_depth += 1
+        # Keep list items and table rows on their own lines
+        if tag == "li":
+            self._parts.append("\n- ")
+        elif tag == "tr":
+            self._parts.append("\n")
+        elif tag in ("td", "th"):
+            self._parts.append(" | ")
+        elif tag in ("br", "p", "div"):
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag != self._block_tag:
+            return
+        self._block_depth -= 1
+        if self._block_depth == 0:
+            self._finish_block()
+
+    def handle_data(self, data):
+        if self._block_tag is not None and not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        if self._block_tag is not None:
+            self._finish_block()
+
+    def _finish_block(self):
+        tag = self._block_tag
+        self._block_tag = None
+        lines = (" ".join(line.split()) for line in "".join(self._parts).split("\n"))
+        text = "\n".join(line.strip(" |") if tag == "table" else line for line in lines if line.strip(" |-"))
+        if not text:
+            return
+
+        if tag in self.HEADING_TAGS:
+            level = self.HEADING_TAGS[tag]
+            while self._headings and self._headings[-1][0] >= level:
+                self._headings.pop()
+            self._headings.append((level, text))
+        elif self._last_block_tag in self.CONTAINER_TAGS and (
+            " ".join(text.split()) in " ".join(self._last_block_text.split())
+        ):
+            # Repeat of a block nested in the previous one
+            return
+
+        self._last_block_tag = tag
+        self._last_block_text = text
+        self.blocks.append((
+            HEADING_PATH_SEPARATOR.join(heading for _, heading in self._headings), text, tag in self.HEADING_TAGS
+        ))
+
+
+def iter_sections(html: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    (heading_path, block texts) of each section of clean_html, in document order.
+
+    A section holding nothing but its heading (an <h2> directly followed by an
+    <h3>) is carried into the next section instead of standing alone.
+    """
+    parser = SectionParser()
+    parser.feed(html)
+    parser.close()
+
+    current_path: Optional[str] = None
+    blocks = []
+    headings_only = True
+    for heading_path, text, is_heading in parser.blocks:
+        if heading_path != current_path and blocks and not (headings_only and is_heading):
+            yield current_path, blocks
+            blocks = []
+            headings_only = True
+        current_path = heading_path
+        blocks.append(text)
+        headings_only = headings_only and is_heading
+    if blocks:
+        yield current_path, blocks
+
+
+def common_heading_path(a: str, b: str) -> str:
+    """Headings two heading paths have in common ("Guide > Install" and "Guide > Usage" -> "Guide")"""
+    common = []
+    for heading_a, heading_b in zip(a.split(HEADING_PATH_SEPARATOR), b.split(HEADING_PATH_SEPARATOR)):
+        if heading_a != heading_b:
+            break
+        common.append(heading_a)
+    return HEADING_PATH_SEPARATOR.join(common)
+
+
+def iter_section_chunks(
+    html: str,
+    count_tokens: TokenCounter,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS
+) -> Iterator[Tuple[str, str]]:
+    """
+    Split clean_html into section-aligned chunks of at most max_tokens tokens.
+
+    Each section (its heading and the blocks under it) is packed sentence by
+    sentence like iter_chunks, so no chunk straddles two sections. A short
+    section that fits entirely into what is left of the previous chunk joins
+    it, and the chunk is tagged with the headings they have in common.
+
+    Args:
+        html: The page's clean_html
+        count_tokens: Batch token counter of the embedding model
+        max_tokens: Token budget per chunk
+        overlap_tokens: Tokens repeated between chunks of the same section
+
+    Yields:
+        (chunk, heading_path) with heading_path like "Guide > Install > Linux"
+    """
+    max_tokens = max(1, max_tokens)
+    pending = None  # last chunk of the previous section: (text, tokens, heading_path)
+
+    for heading_path, blocks in iter_sections(html):
+        # Blank lines end a sentence at every block boundary
+        section = "\n\n".join(blocks)
+        # Counted once: the same sentences decide whether the section joins the
+        # previous chunk and, if not, how it is packed
+        units = list(iter_units(section, max_tokens, count_tokens))
+        section_tokens = sum(tokens for _, _, tokens in units)
+        if pending and pending[1] + section_tokens <= max_tokens:
+            pending = (
+                f"{pending[0]}\n\n{section}",
+                pending[1] + section_tokens,
+                common_heading_path(pending[2], heading_path)
+            )
+            continue
+
+        if pending:
+            yield pending[0], pending[2]
+        chunks = _pack_units(section, units, max_tokens, overlap_tokens)
+        last, last_tokens = next(chunks)
+        for chunk, tokens in chunks:
+            yield last, heading_path
+            last, last_tokens = chunk, tokens
+        pending = (last, last_tokens, heading_path)
+
+    if pending:
+        yield pending[0], pending[2]
@@ -0,0 +1,398 @@
+"""
+Document-level store for heavy page fields
+Keeps clean_html, structured_content and youtube_videos once per captured
+page (keyed by document_id) instead of copying them into the metadata of
+every chunk and image in ChromaDB. The largest fields go to a compressed
+content-addressed blob store and the row only keeps their hashes; blobs are
+reference-counted and removed once no document points at them
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from blob_store import BlobStore
+
+
+# Metadata fields stored once per document rather than per chunk/image
+PAGE_LEVEL_FIELDS = ("clean_html", "structured_content", "youtube_videos")
+
+# Page fields written to the blob store (rows keep a reference only)
+BLOB_FIELDS = ("clean_html", "structured_content")
+
+# Query parameters that never change page content
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "si"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Fragments starting with these are client-side routes (#/inbox, #!/item/3), not anchors
+ROUTE_FRAGMENT_PREFIXES = ("/", "!")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so re-captures of the same page compare equal.
+
+    Lowercases scheme and host, drops default ports, tracking parameters
+    (utm_*, fbclid, ...) and a trailing slash, and sorts the remaining query
+    parameters. In-page anchors are dropped, but route-like fragments of
+    single-page apps (#/path, #!path) are kept since they select the content.
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    fragment = parts.fragment if parts.fragment.startswith(ROUTE_FRAGMENT_PREFIXES) else ""
+    return urlunsplit((scheme, host, path, urlencode(query), fragment))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of text, used to compare documents and chunks across captures"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_page_fields(metadata: Dict) -> tuple:
+    """
+    Separate heavy page-level fields from the rest of a metadata dict.
+
+    Args:
+        metadata: Metadata as posted by the extension
+
+    Returns:
+        (page_fields, chunk_metadata) dictionaries
+    """
+    page_fields = {key: metadata[key] for key in PAGE_LEVEL_FIELDS if key in metadata}
+    chunk_metadata = {key: value for key, value in metadata.items() if key not in PAGE_LEVEL_FIELDS}
+    return page_fields, chunk_metadata
+
+
+class DocumentStore:
+    """SQLite-backed store of page-level fields keyed by document_id"""
+
+    def __init__(self, path: str, blob_store: Optional[BlobStore] = None):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database file
+            blob_store: Where BLOB_FIELDS are written (kept inline when None)
+        """
+        self.path = path
+        self.blob_store = blob_store
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    page_fields TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS document_versions (
+                    document_id TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    canonical_url TEXT,
+                    content_hash TEXT NOT NULL,
+                    chunk_hashes TEXT NOT NULL,
+                    chunks_added INTEGER NOT NULL,
+                    chunks_kept INTEGER NOT NULL,
+                    chunks_removed INTEGER NOT NULL,
+                    captured_at REAL NOT NULL,
+                    PRIMARY KEY (document_id, version)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS document_versions_url ON document_versions (canonical_url)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS document_versions_hash ON document_versions (content_hash)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "blob_refs" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN blob_refs TEXT NOT NULL DEFAULT '{}'")
+            has_refcounts = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blob_refcounts'"
+            ).fetchone()
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blob_refcounts (hash TEXT PRIMARY KEY, refs INTEGER NOT NULL)"
+            )
+            if not has_refcounts:
+                # Stores written before blobs were counted: count the existing references
+                self._add_refs(
+                    ref["hash"]
+                    for (blob_refs,) in self._conn.execute("SELECT blob_refs FROM documents").fetchall()
+                    for ref in json.loads(blob_refs or "{}").values()
+                )
+        if not has_refcounts:
+            # ...and drop the blobs replaced documents left behind
+            with self._lock:
+                self._sweep_unreferenced()
+
+    def _add_refs(self, hashes: Iterable[str]):
+        """Count one more reference per hash (caller holds the lock and transaction)"""
+        self._conn.executemany(
+            "INSERT INTO blob_refcounts (hash, refs) VALUES (?, ?) "
+            "ON CONFLICT(hash) DO UPDATE SET refs = refs + excluded.refs",
+            Counter(hashes).items()
+        )
+
+    def _drop_refs(self, hashes: Iterable[str]) -> List[str]:
+        """
+        Count one reference less per hash (caller holds the lock and transaction).
+
+        Returns:
+            Hashes no document references any more
+        """
+        counts = Counter(hashes)
+        self._conn.executemany(
+            "UPDATE blob_refcounts SET refs = refs - ? WHERE hash = ?",
+            [(count, digest) for digest, count in counts.items()]
+        )
+        unreferenced = [
+            digest for digest in counts
+            if (self._conn.execute("SELECT refs FROM blob_refcounts WHERE hash = ?", (digest,)).fetchone()
+                or (0,))[0] <= 0
+        ]
+        self._conn.executemany("DELETE FROM blob_refcounts WHERE hash = ?", [(digest,) for digest in unreferenced])
+        return unreferenced
+
+    def _delete_blobs(self, hashes: Iterable[str]):
+        """Remove unreferenced blobs (after the commit, still under the lock, so no put can revive one mid-delete)"""
+        if self.blob_store is not None:
+            for digest in hashes:
+                self.blob_store.delete(digest)
+
+    def _sweep_unreferenced(self):
+        """Remove blobs without a refcount row (leaked by replaced or deleted documents)"""
+        if self.blob_store is None:
+            return
+        referenced = {row[0] for row in self._conn.execute("SELECT hash FROM blob_refcounts")}
+        self._delete_blobs([digest for digest in self.blob_store.digests() if digest not in referenced])
+
+    def _old_blob_hashes(self, document_id: str) -> List[str]:
+        row = self._conn.execute("SELECT blob_refs FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return [ref["hash"] for ref in json.loads(row[0] or "{}").values()] if row else []
+
+    def _write_blob(self, value) -> Dict:
+        """Store one field value in the blob store and return its reference"""
+        if isinstance(value, str):
+            return {"hash": self.blob_store.put(value.encode("utf-8")), "format": "text"}
+        return {"hash": self.blob_store.put(json.dumps(value).encode("utf-8")), "format": "json"}
+
+    def _read_blob(self, ref: Dict):
+        data = self.blob_store.get(ref["hash"]) if self.blob_store else None
+        if data is None:
+            return None
+        text = data.decode("utf-8")
+        return text if ref.get("format") == "text" else json.loads(text)
+
+    def _resolve(self, page_fields: str, blob_refs: str, load_blobs: bool) -> Dict:
+        fields = json.loads(page_fields)
+        if load_blobs:
+            for key, ref in json.loads(blob_refs or "{}").items():
+                fields[key] = self._read_blob(ref)
+        return fields
+
+    def put(self, document_id: str, page_fields: Dict):
+        """Insert or replace the page fields of a document, releasing blobs the old fields used"""
+        inline_fields = dict(page_fields)
+        blob_values = {}
+        if self.blob_store is not None:
+            for key in BLOB_FIELDS:
+                if inline_fields.get(key):
+                    blob_values[key] = inline_fields.pop(key)
+
+        now = time.time()
+        # Blobs are written under the lock: a put can then never find a blob
+        # on disk that a concurrent delete is about to remove
+        with self._lock:
+            with self._conn:
+                blob_refs = {key: self._write_blob(value) for key, value in blob_values.items()}
+                old_hashes = self._old_blob_hashes(document_id)
+                self._add_refs(ref["hash"] for ref in blob_refs.values())
+                unreferenced = self._drop_refs(old_hashes)
+                self._conn.execute(
+                    """
+                    INSERT INTO documents (document_id, page_fields, blob_refs, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(document_id) DO UPDATE SET
+                        page_fields = excluded.page_fields,
+                        blob_refs = excluded.blob_refs,
+                        updated_at = excluded.updated_at
+                    """,
+                    (document_id, json.dumps(inline_fields), json.dumps(blob_refs), now, now)
+                )
+            self._delete_blobs(unreferenced)
+
+    def get(self, document_id: str, load_blobs: bool = True) -> Optional[Dict]:
+        """
+        Get the page fields of a document.
+
+        Args:
+            document_id: Document identifier
+            load_blobs: Read and decompress blob-stored fields (otherwise they are omitted)
+
+        Returns:
+            Dict of page fields, or None if the document is not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_fields, blob_refs FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+        return self._resolve(row[0], row[1], load_blobs) if row else None
+
+    def get_many(self, document_ids: Iterable[str], load_blobs: bool = True) -> Dict[str, Dict]:
+        """
+        Get page fields for several documents in one query.
+
+        Args:
+            document_ids: Document identifiers
+            load_blobs: Read and decompress blob-stored fields (otherwise they are omitted)
+
+        Returns:
+            Dict of document_id -> page fields (missing documents are omitted)
+        """
+        ids = list(dict.fromkeys(document_ids))
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT document_id, page_fields, blob_refs FROM documents WHERE document_id IN ({placeholders})",
+                ids
+            ).fetchall()
+        return {
+            document_id: self._resolve(page_fields, blob_refs, load_blobs)
+            for document_id, page_fields, blob_refs in rows
+        }
+
+    def find_document(self, canonical_url: str, text_hash: str) -> Optional[str]:
+        """
+        Find the document a capture is a re-capture of.
+
+        Matches on canonical URL; captures without a URL match on identical content.
+
+        Returns:
+            document_id of the most recently captured match, or None
+        """
+        if canonical_url:
+            where, params = "canonical_url = ?", (canonical_url,)
+        else:
+            where, params = "content_hash = ? AND (canonical_url IS NULL OR canonical_url = '')", (text_hash,)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT document_id FROM document_versions WHERE {where} ORDER BY captured_at DESC LIMIT 1",
+                params
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest_version(self, document_id: str) -> Optional[Dict]:
+        """Most recent version record of a document, or None if it has none"""
+        versions = self.versions(document_id, limit=1)
+        return versions[0] if versions else None
+
+    def add_version(
+        self,
+        document_id: str,
+        canonical_url: str,
+        text_hash: str,
+        chunk_hashes: List[str],
+        chunks_added: int,
+        chunks_kept: int,
+        chunks_removed: int
+    ) -> int:
+        """
+        Record a capture of a document.
+
+        Returns:
+            The new version number (1 for the first capture)
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM document_versions WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+            version = row[0] + 1
+            self._conn.execute(
+                """
+                INSERT INTO document_versions (document_id, version, canonical_url, content_hash, chunk_hashes,
+                                               chunks_added, chunks_kept, chunks_removed, captured_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (document_id, version, canonical_url, text_hash, json.dumps(chunk_hashes),
+                 chunks_added, chunks_kept, chunks_removed, time.time())
+            )
+        return version
+
+    def versions(self, document_id: str, limit: int = 100) -> List[Dict]:
+        """Version history of a document, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT version, canonical_url, content_hash, chunk_hashes,
+                       chunks_added, chunks_kept, chunks_removed, captured_at
+                FROM document_versions WHERE document_id = ? ORDER BY version DESC LIMIT ?
+                """,
+                (document_id, limit)
+            ).fetchall()
+        return [
+            {
+                "version": version,
+                "canonical_url": canonical_url,
+                "content_hash": text_hash,
+                "chunk_hashes": json.loads(chunk_hashes),
+                "chunks_added": added,
+                "chunks_kept": kept,
+                "chunks_removed": removed,
+                "captured_at": captured_at,
+            }
+            for version, canonical_url, text_hash, chunk_hashes, added, kept, removed, captured_at in rows
+        ]
+
+    def document_ids(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT document_id FROM documents")]
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM documents")
+                self._conn.execute("DELETE FROM document_versions")
+                self._conn.execute("DELETE FROM blob_refcounts")
+            if self.blob_store is not None:
+                self.blob_store.clear()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,212 @@
+"""
+Embedding executor for running SigLIP inference off the event loop
+Every embedding call goes through a bounded worker pool so FastAPI handlers
+keep serving /query and /images while captures are being embedded
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from siglip_embeddings import SigLIPEmbeddings, DEFAULT_TEXT_BATCH_SIZE
+
+
+class EmbeddingQueueFull(Exception):
+    """Raised when the embedding queue stays full past the admission timeout"""
+
+
+class _Waiter:
+    """A caller waiting for an admission slot (a thread or an event loop task)"""
+
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+
+    def grant(self):
+        """Hand the slot over (caller holds the slots lock)"""
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class _AdmissionSlots:
+    """
+    Counting semaphore shared by threads and event loop tasks.
+
+    Released slots are handed to waiters in FIFO order. Async callers wait on
+    a future of their own loop instead of parking a thread, so a burst of
+    queued ingest calls never ties up the default executor that /query uses
+    for store reads.
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter: _Waiter = None) -> bool:
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            if waiter is not None:
+                self._waiters.append(waiter)
+            return False
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Stop waiting; returns True if the slot was granted in the meantime"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        """Block the calling thread for up to timeout seconds"""
+        waiter = _Waiter()
+        if self._try_acquire(waiter):
+            return True
+        if waiter.event.wait(timeout):
+            return True
+        return self._abandon(waiter)
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """Wait on the running event loop for up to timeout seconds"""
+        waiter = _Waiter(asyncio.get_running_loop())
+        if self._try_acquire(waiter):
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                # Granted after we stopped waiting: pass the slot on
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().grant()
+            else:
+                self._free += 1
+
+
+class EmbeddingExecutor:
+    """
+    Bounded thread pool that owns all SigLIP inference.
+
+    At most max_workers calls run at once and at most max_queue more wait
+    for a worker. Callers beyond that block (sync) or await (async) for a
+    free slot, and give up with EmbeddingQueueFull after admission_timeout
+    seconds, which gives ingest bursts backpressure instead of an unbounded
+    backlog of pending forward passes.
+    """
+
+    def __init__(
+        self,
+        embeddings: SigLIPEmbeddings,
+        max_workers: int = 2,
+        max_queue: int = 64,
+        admission_timeout: float = 30.0
+    ):
+        """
+        Initialize the worker pool.
+
+        Args:
+            embeddings: Loaded SigLIP embeddings instance
+            max_workers: Number of threads running inference concurrently
+            max_queue: Number of calls allowed to wait for a worker
+            admission_timeout: Seconds to wait for a queue slot before failing
+        """
+        self.embeddings = embeddings
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.admission_timeout = admission_timeout
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="siglip-embed"
+        )
+        self._slots = _AdmissionSlots(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running or waiting for a worker"""
+        with self._lock:
+            return self._in_flight
+
+    def _release(self, _future: Future = None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _submit_admitted(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Submit a call from synchronous code, blocking while the queue is full.
+
+        Raises:
+            EmbeddingQueueFull: If no slot frees up within admission_timeout
+        """
+        if not self._slots.acquire(self.admission_timeout):
+            raise EmbeddingQueueFull(
+                f"Embedding queue full ({self.max_workers} workers, {self.max_queue} queued)"
+            )
+        return self._submit_admitted(fn, *args, **kwargs)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run a call on the pool from async code without blocking the event loop.
+
+        Raises:
+            EmbeddingQueueFull: If no slot frees up within admission_timeout
+        """
+        # Waits on the event loop itself; no thread is held while the queue is full
+        if not await self._slots.acquire_async(self.admission_timeout):
+            raise EmbeddingQueueFull(
+                f"Embedding queue full ({self.max_workers} workers, {self.max_queue} queued)"
+            )
+
+        future = self._submit_admitted(fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    # Async entry points (FastAPI handlers and background tasks)
+
+    async def embed_pixel_values(self, pixel_values) -> List[List[float]]:
+        return await self.run(self.embeddings.embed_pixel_values, pixel_values)
+
+    # Sync entry points (ChromaDB embedding functions running on worker threads)
+
+    def embed_texts_sync(self, texts: List[str], batch_size: int = DEFAULT_TEXT_BATCH_SIZE) -> List[List[float]]:
+        return self.submit(self.embeddings.embed_texts, texts, batch_size).result()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and wait for running calls to finish"""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,109 @@
+"""
+Fake OpenAI-compatible chat completions server for local testing
+Streams a canned answer token by token with configurable latency, so
+/query and /query/stream can be exercised without an API key
+
+Usage:
+    python fake_llm_server.py --port 8001 --first-token-ms 400 --token-ms 30
+
+    # In another shell, point the backend at it
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://localhost:8001/v1 python main.py
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake LLM Server")
+
+# Latency settings, overridden from the command line
+LATENCY = {"first_token_ms": 400.0, "token_ms": 30.0}
+
+
+def build_answer(prompt: str) -> str:
+    """Produce a deterministic answer that mentions the query and some context"""
+    query_match = re.search(r"^Query: (.*)$", prompt, re.MULTILINE)
+    query = query_match.group(1).strip() if query_match else "your question"
+
+    context_match = re.search(r"Context:\n(.*?)\n\nInstructions:", prompt, re.DOTALL)
+    context = context_match.group(1) if context_match else ""
+    context_words = re.sub(r"Chunk \d+:", " ", context).split()[:60]
+
+    return (
+        f"Here is what your saved notes say about \"{query}\": "
+        + " ".join(context_words)
+        + (" ..." if context_words else "(no context provided)")
+    )
+
+
+def tokenize_answer(answer: str) -> list:
+    """Split into word-sized pieces (keeping the following space) like a real token stream"""
+    return re.findall(r"\S+\s*", answer)
+
+
+def completion_chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake-model")
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    answer = build_answer(prompt)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        await asyncio.sleep((LATENCY["first_token_ms"] + LATENCY["token_ms"] * len(tokenize_answer(answer))) / 1000)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(answer.split()),
+                      "total_tokens": len(prompt.split()) + len(answer.split())},
+        }
+
+    async def events():
+        await asyncio.sleep(LATENCY["first_token_ms"] / 1000)
+        yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for token in tokenize_answer(answer):
+            yield completion_chunk(completion_id, model, {"content": token})
+            await asyncio.sleep(LATENCY["token_ms"] / 1000)
+        yield completion_chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-ms", type=float, default=LATENCY["first_token_ms"])
+    parser.add_argument("--token-ms", type=float, default=LATENCY["token_ms"])
+    args = parser.parse_args()
+
+    LATENCY["first_token_ms"] = args.first_token_ms
+    LATENCY["token_ms"] = args.token_ms
+    uvicorn.run(app, host=args.host, port=args.port)
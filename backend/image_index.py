@@ -0,0 +1,246 @@
+"""
+Index of stored images for cross-capture deduplication
+Maps content hashes (and perceptual hashes) to the shared image file and
+its SigLIP embedding, and image URLs to the content they served, so an
+image seen before is neither downloaded, stored nor embedded again
+
+References are taken with the same transaction that finds an image and
+dropped with the one that deletes its file, so a capture reusing an image
+can never be left pointing at a file another capture just removed
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class ImageIndex:
+    """SQLite-backed content-hash -> (shared file, embedding) index"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: SQLite database file (may be shared with the document store)
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    content_hash TEXT PRIMARY KEY,
+                    phash TEXT,
+                    file_path TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    embedding BLOB NOT NULL,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS images_phash ON images (phash)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS image_urls (url TEXT PRIMARY KEY, content_hash TEXT NOT NULL)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(image_urls)")}
+            # Validators of the response the URL was downloaded from, and when they were last confirmed
+            for column, column_type in (("etag", "TEXT"), ("last_modified", "TEXT"), ("checked_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE image_urls ADD COLUMN {column} {column_type}")
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        content_hash, phash, file_path, filename, width, height, embedding, refcount = row
+        return {
+            "content_hash": content_hash,
+            "phash": phash,
+            "file_path": file_path,
+            "filename": filename,
+            "width": width,
+            "height": height,
+            # Empty while the capture that stored the image is still embedding it
+            "embedding": np.frombuffer(embedding, dtype=np.float32).tolist() or None,
+            "refcount": refcount,
+        }
+
+    def _select(self, where: str, params: tuple) -> Optional[Dict]:
+        """First matching image (caller holds the lock)"""
+        row = self._conn.execute(
+            f"""
+            SELECT content_hash, phash, file_path, filename, width, height, embedding, refcount
+            FROM images WHERE {where} LIMIT 1
+            """,
+            params
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def _take_reference(self, image: Dict) -> Dict:
+        self._conn.execute(
+            "UPDATE images SET refcount = refcount + 1 WHERE content_hash = ?", (image["content_hash"],)
+        )
+        image["refcount"] += 1
+        return image
+
+    def url_validators(self, url: str) -> Optional[Dict]:
+        """
+        What is known about the last download of a URL.
+
+        Returns:
+            Dict with content_hash, etag, last_modified and checked_at, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, etag, last_modified, checked_at FROM image_urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "etag": row[1], "last_modified": row[2], "checked_at": row[3] or 0.0}
+
+    def claim_url(self, url: str, revalidated: bool = False) -> Optional[Dict]:
+        """
+        Take a reference to the embedded image last downloaded from a URL.
+
+        Args:
+            url: Image URL
+            revalidated: The server just confirmed the image is unchanged (refreshes checked_at)
+
+        Returns:
+            The image, or None if the URL is unknown, not embedded yet or its file is gone
+        """
+        with self._lock, self._conn:
+            image = self._select("content_hash = (SELECT content_hash FROM image_urls WHERE url = ?)", (url,))
+            if image is None or image["embedding"] is None or not os.path.exists(image["file_path"]):
+                return None
+            if revalidated:
+                self._conn.execute("UPDATE image_urls SET checked_at = ? WHERE url = ?", (time.time(), url))
+            return self._take_reference(image)
+
+    def claim(
+        self,
+        content_hash: str,
+        phash: str,
+        file_path: str,
+        filename: str,
+        width: Optional[int],
+        height: Optional[int],
+        match_phash: bool = False,
+        source_url: Optional[str] = None,
+        validators: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Take a reference to the stored copy of an image, registering it on first use.
+
+        Called before the new copy is moved into file_path: while the reference
+        is held no release can delete that file.
+
+        Args:
+            content_hash: SHA-256 of the original bytes
+            phash: Perceptual hash
+            file_path: Shared file the image is (or will be) stored in
+            filename: Shared file name
+            width: Image width
+            height: Image height
+            match_phash: Reuse a stored image with the same perceptual hash
+            source_url: URL the image was downloaded from
+            validators: ETag/Last-Modified of that download
+
+        Returns:
+            The referenced image; its embedding is None until set_embedding is called
+        """
+        with self._lock, self._conn:
+            image = self._select("content_hash = ?", (content_hash,))
+            if image is None and match_phash:
+                image = self._select("phash = ? AND length(embedding) > 0", (phash,))
+                if image is not None and not os.path.exists(image["file_path"]):
+                    image = None
+
+            if image is not None:
+                self._take_reference(image)
+            else:
+                self._conn.execute(
+                    """
+                    INSERT INTO images (content_hash, phash, file_path, filename, width, height, embedding, refcount, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                    """,
+                    (content_hash, phash, file_path, filename, width, height, b"", time.time())
+                )
+                image = {
+                    "content_hash": content_hash, "phash": phash, "file_path": file_path, "filename": filename,
+                    "width": width, "height": height, "embedding": None, "refcount": 1,
+                }
+
+            if source_url:
+                validators = validators or {}
+                self._conn.execute(
+                    """
+                    INSERT INTO image_urls (url, content_hash, etag, last_modified, checked_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        content_hash = excluded.content_hash,
+                        etag = excluded.etag,
+                        last_modified = excluded.last_modified,
+                        checked_at = excluded.checked_at
+                    """,
+                    (source_url, image["content_hash"], validators.get("etag"),
+                     validators.get("last_modified"), time.time())
+                )
+            return image
+
+    def set_embedding(self, content_hash: str, embedding: List[float]):
+        """Store the embedding of a newly registered image (kept if one is already set)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE images SET embedding = ? WHERE content_hash = ? AND length(embedding) = 0",
+                (np.asarray(embedding, dtype=np.float32).tobytes(), content_hash)
+            )
+
+    def release(self, content_hash: str) -> bool:
+        """
+        Drop one reference to a stored image, deleting its file with the last one.
+
+        The file is removed under the lock, after the refcount check, so a
+        concurrent claim either keeps the image alive or no longer finds it.
+
+        Returns:
+            True when no references were left and the image was deleted
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE images SET refcount = refcount - 1 WHERE content_hash = ?", (content_hash,)
+                )
+                row = self._conn.execute(
+                    "SELECT refcount, file_path FROM images WHERE content_hash = ?", (content_hash,)
+                ).fetchone()
+                if row is None or row[0] > 0:
+                    return False
+                self._conn.execute("DELETE FROM images WHERE content_hash = ?", (content_hash,))
+                self._conn.execute("DELETE FROM image_urls WHERE content_hash = ?", (content_hash,))
+            try:
+                os.remove(row[1])
+            except OSError:
+                pass
+            return True
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images")
+            self._conn.execute("DELETE FROM image_urls")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
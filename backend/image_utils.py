@@ -4,15 +4,53 @@ Image storage and management utilities
 
 import os
 import uuid
+import asyncio
+import hashlib
+import shutil
 import httpx
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
+from urllib.parse import urlparse
 from PIL import Image
 import io
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Turns decoded RGB images into model-ready pixel values (e.g. SigLIPEmbeddings.preprocess_images)
+Preprocessor = Callable[[List[Image.Image]], Any]
 
 # Image storage configuration
 IMAGE_STORAGE_DIR = "./chroma_db/images"
+# Content-addressed images shared by every document that captured them
+SHARED_IMAGE_DIR_NAME = "_shared"
+
+# Download client defaults (overridable through init_http_client)
+DEFAULT_MAX_CONNECTIONS = 32  # concurrent downloads across all hosts
+DEFAULT_MAX_PER_HOST = 6  # concurrent downloads per host (browsers use 6)
+DEFAULT_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_IMAGE_BYTES = 20 * 1024 * 1024  # larger downloads/uploads are rejected
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 256 * 1024  # each UploadFile.read is a threadpool hop, so reads are larger
+
+# Formats browsers display as-is, with the extension they are stored under.
+# Anything else PIL can decode (TIFF, PSD, ...) is re-encoded to PNG.
+BROWSER_FORMATS = {"JPEG": ".jpg", "MPO": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp", "BMP": ".bmp", "ICO": ".ico"}
+FORMAT_EXTENSIONS = {"JPEG": {".jpg", ".jpeg"}, "MPO": {".jpg", ".jpeg"}}
+NORMALIZED_FORMAT = ("PNG", ".png")
+
+# Process-wide download client, created on app startup and closed on shutdown
+_http_client: Optional[httpx.AsyncClient] = None
+_global_limit: Optional[asyncio.Semaphore] = None
+_host_limits: Dict[str, "_HostLimit"] = {}
+_max_per_host = DEFAULT_MAX_PER_HOST
 
 
 def ensure_image_directory():
@@ -20,6 +58,107 @@ def ensure_image_directory():
     Path(IMAGE_STORAGE_DIR).mkdir(parents=True, exist_ok=True)
 
 
+class ImageTooLarge(Exception):
+    """Raised when an image exceeds the configured byte limit"""
+
+
+class ImageNotModified(Exception):
+    """Raised when a conditional download finds the image unchanged (HTTP 304)"""
+
+
+class StoredImage:
+    """An image written to disk, with what ingest needs from its single decode"""
+
+    __slots__ = ("path", "filename", "width", "height", "pixel_values", "content_hash", "phash", "validators")
+
+    def __init__(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        pixel_values: Any,
+        content_hash: str = "",
+        phash: str = ""
+    ):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.width = width
+        self.height = height
+        self.pixel_values = pixel_values  # preprocessed model input (3 x H x W), None once embedded
+        self.content_hash = content_hash  # SHA-256 of the original bytes
+        self.phash = phash  # perceptual difference hash of the pixels
+        self.validators = None  # ETag/Last-Modified of the response, for downloaded images
+
+    @property
+    def dimensions(self) -> Dict[str, int]:
+        return {"width": self.width, "height": self.height}
+
+
+def get_shared_image_dir() -> str:
+    """Get or create the directory of content-addressed shared images"""
+    shared_dir = Path(IMAGE_STORAGE_DIR) / SHARED_IMAGE_DIR_NAME
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    return str(shared_dir)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 8) -> str:
+    """
+    Perceptual difference hash (dHash): one bit per horizontally adjacent
+    pixel pair of a tiny grayscale thumbnail. Resized or recompressed copies
+    of the same picture get the same (or a very close) hash.
+
+    Returns:
+        Hash as a hex string (hash_size * hash_size bits)
+    """
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(thumbnail.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def shared_image_path(stored_image: StoredImage) -> str:
+    """Path of the shared copy of a stored image (named after its content hash)"""
+    extension = os.path.splitext(stored_image.path)[1].lower()
+    return os.path.join(get_shared_image_dir(), stored_image.content_hash + extension)
+
+
+def share_image(stored_image: StoredImage, shared_path: Optional[str] = None) -> StoredImage:
+    """
+    Move a stored image to the shared directory under its content hash.
+    If the same content is already there, the new copy is dropped.
+
+    Args:
+        stored_image: Freshly stored image
+        shared_path: Shared file to use (shared_image_path by default)
+
+    Returns:
+        The same StoredImage, pointing at the shared file
+    """
+    shared_path = shared_path or shared_image_path(stored_image)
+
+    if os.path.exists(shared_path):
+        os.remove(stored_image.path)
+    else:
+        os.replace(stored_image.path, shared_path)
+
+    stored_image.path = shared_path
+    stored_image.filename = os.path.basename(shared_path)
+    return stored_image
+
+
 def get_document_image_dir(document_id: str) -> str:
     """
     Get or create directory for a document's images
@@ -35,57 +174,291 @@ def get_document_image_dir(document_id: str) -> str:
     return str(doc_dir)
 
 
-async def download_image_from_url(url: str, save_path: str, timeout: int = 30) -> bool:
+def init_http_client(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+) -> httpx.AsyncClient:
     """
-    Download image from URL and save to filesystem
+    Create the shared download client (connection pool with keep-alive,
+    HTTP/2 when the h2 package is installed).
 
     Args:
-        url: Image URL
-        save_path: Path to save the image
-        timeout: Request timeout in seconds
+        max_connections: Global limit on concurrent downloads and pooled connections
+        max_per_host: Concurrent downloads allowed per host
+        keepalive_expiry: Seconds idle connections stay in the pool
+        connect_timeout: Seconds to establish a connection
+        read_timeout: Seconds to wait between received bytes
 
     Returns:
-        True if successful, False otherwise
+        The shared client
     """
+    global _http_client, _global_limit, _host_limits, _max_per_host
+
+    if _http_client is not None:
+        return _http_client
+
+    _http_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+    )
+    _global_limit = asyncio.Semaphore(max_connections)
+    _host_limits = {}
+    _max_per_host = max_per_host
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared download client and its pooled connections"""
+    global _http_client, _global_limit, _host_limits
+
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _global_limit = None
+    _host_limits = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared download client (created with defaults when used outside the app)"""
+    return _http_client or init_http_client()
+
+
+class _HostLimit:
+    """Download slots of one host and the number of downloads holding or awaiting one"""
+
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, slots: int):
+        self.semaphore = asyncio.Semaphore(slots)
+        self.users = 0
+
+
+@asynccontextmanager
+async def _host_slot(url: str):
+    """
+    Hold one of a host's download slots.
+
+    A host's entry only exists while downloads to it are running or waiting,
+    so captures touching many hosts do not grow _host_limits without bound.
+    """
+    host = urlparse(url).netloc.lower()
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = _HostLimit(_max_per_host)
+    limit.users += 1
+    try:
+        async with limit.semaphore:
+            yield
+    finally:
+        limit.users -= 1
+        if limit.users == 0 and _host_limits.get(host) is limit:
+            del _host_limits[host]
+
+
+def finalize_image(
+    source_path: str,
+    save_path: str,
+    content_hash: Optional[str] = None,
+    preprocess: Optional[Preprocessor] = None
+) -> StoredImage:
+    """
+    Decode an image once and move it to its final location.
+
+    Browser-displayable formats are kept byte-for-byte (the extension is
+    corrected to match the real format); other formats are re-encoded to PNG.
+    The decoded image is preprocessed right away and closed, so only the
+    (much smaller) model input is kept until the image is embedded.
+
+    Args:
+        source_path: Temporary file holding the raw image bytes
+        save_path: Requested destination (its suffix may change)
+        content_hash: SHA-256 of the raw bytes, if already computed while writing them
+        preprocess: Produces the model input from the decoded image (none kept when None)
+
+    Returns:
+        StoredImage with final path, dimensions, pixel values and hashes
+    """
+    base, extension = os.path.splitext(save_path)
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
+        content_hash = content_hash or file_sha256(source_path)
+        with Image.open(source_path) as image:
+            image.load()
+            image_format = image.format
+            width, height = image.size
+            with image.convert("RGB") as rgb:
+                phash = difference_hash(rgb)
+                pixel_values = preprocess([rgb])[0] if preprocess else None
+
+            if image_format not in BROWSER_FORMATS:
+                save_path = base + NORMALIZED_FORMAT[1]
+                image.save(save_path, format=NORMALIZED_FORMAT[0])
+
+        # Renamed after the file is closed (Windows cannot replace open files)
+        if image_format in BROWSER_FORMATS:
+            if extension.lower() not in FORMAT_EXTENSIONS.get(image_format, {BROWSER_FORMATS[image_format]}):
+                save_path = base + BROWSER_FORMATS[image_format]
+            os.replace(source_path, save_path)
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+
+    return StoredImage(save_path, width, height, pixel_values, content_hash, phash)
+
+
+async def download_image_from_url(
+    url: str,
+    save_path: str,
+    timeout: Optional[float] = None,
+    max_bytes: int = DEFAULT_MAX_IMAGE_BYTES,
+    preprocess: Optional[Preprocessor] = None,
+    validators: Optional[Dict] = None
+) -> Optional[StoredImage]:
+    """
+    Stream an image from URL to the filesystem
 
-            # Validate it's an image
-            image = Image.open(io.BytesIO(response.content))
+    Args:
+        url: Image URL
+        save_path: Path to save the image (the suffix follows the real format)
+        timeout: Request timeout in seconds (defaults to the shared client's timeouts)
+        max_bytes: Abort downloads larger than this
+        preprocess: Produces the model input from the decoded image
+        validators: etag/last_modified of a previous download, to make the request conditional
 
-            # Save image
-            image.save(save_path)
-            return True
+    Returns:
+        StoredImage if successful, None otherwise
 
+    Raises:
+        ImageNotModified: The server confirmed the image matches validators
+    """
+    part_path = save_path + ".part"
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        client = get_http_client()
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+
+        # Slots are only held while talking to the host. The host slot comes
+        # first, so downloads queued behind a busy host do not sit on global slots
+        async with _host_slot(url), _global_limit:
+            async with client.stream("GET", url, headers=headers, timeout=request_timeout) as response:
+                if response.status_code == 304 and headers:
+                    raise ImageNotModified(url)
+                response.raise_for_status()
+                response_validators = {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                }
+
+                content_length = response.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                    raise ImageTooLarge(f"{content_length} bytes exceeds limit of {max_bytes}")
+
+                received = 0
+                digest = hashlib.sha256()
+                with open(part_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > max_bytes:
+                            raise ImageTooLarge(f"more than {max_bytes} bytes")
+                        digest.update(chunk)
+                        f.write(chunk)
+
+        # Decode (and re-encode if needed) off the event loop
+        stored_image = await asyncio.to_thread(finalize_image, part_path, save_path, digest.hexdigest(), preprocess)
+        stored_image.validators = response_validators
+        return stored_image
+
+    except ImageNotModified:
+        raise
     except Exception as e:
         print(f"Failed to download image from {url}: {e}")
-        return False
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return None
 
 
-def save_uploaded_image(file_content: bytes, save_path: str) -> bool:
+async def spool_upload(upload, spool_path: str, max_bytes: int = DEFAULT_MAX_IMAGE_BYTES) -> str:
     """
-    Save uploaded image file to filesystem
+    Stream an uploaded file to disk without holding it in memory
 
     Args:
-        file_content: Image file bytes
-        save_path: Path to save the image
+        upload: File-like object with an async read(size) (e.g. FastAPI UploadFile)
+        spool_path: Where to write the bytes
+        max_bytes: Abort uploads larger than this
 
     Returns:
-        True if successful, False otherwise
+        SHA-256 of the uploaded bytes
+
+    Raises:
+        ImageTooLarge if the upload exceeds max_bytes (the partial file is removed)
     """
+    received = 0
+    digest = hashlib.sha256()
     try:
-        # Validate it's an image
-        image = Image.open(io.BytesIO(file_content))
+        with open(spool_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ImageTooLarge(f"more than {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise
+    return digest.hexdigest()
+
+
+def save_uploaded_image(
+    spool_path: str,
+    save_path: str,
+    content_hash: Optional[str] = None,
+    preprocess: Optional[Preprocessor] = None
+) -> Optional[StoredImage]:
+    """
+    Store a spooled upload as a document image
 
-        # Save image
-        image.save(save_path)
-        return True
+    The spooled file is left in place (it is linked, not moved), so a retried
+    ingest job can store it again; the job queue deletes it when the job ends.
+
+    Args:
+        spool_path: File written by spool_upload
+        save_path: Path to save the image (the suffix follows the real format)
+        content_hash: SHA-256 returned by spool_upload
+        preprocess: Produces the model input from the decoded image
+
+    Returns:
+        StoredImage if successful, None otherwise
+    """
+    part_path = save_path + ".part"
+    try:
+        try:
+            os.link(spool_path, part_path)
+        except OSError:
+            # Different filesystem (or no hard links): fall back to a copy
+            shutil.copyfile(spool_path, part_path)
+        return finalize_image(part_path, save_path, content_hash, preprocess)
 
     except Exception as e:
         print(f"Failed to save uploaded image: {e}")
-        return False
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return None
 
 
 def get_image_dimensions(file_path: str) -> Optional[Dict[str, int]]:
@@ -0,0 +1,336 @@
+"""
+Durable ingest job queue
+Captures accepted by /save are written here before the response is sent and
+picked up by a fixed number of ingest workers, so queued work survives a
+restart, bursts are drained at a bounded rate and every capture has a status
+that can be polled
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+JOB_STATES = (QUEUED, RUNNING, DONE, FAILED)
+
+
+class JobQueue:
+    """SQLite-backed FIFO of ingest jobs with retry scheduling"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the queue.
+
+        Args:
+            path: SQLite database file (may be shared with the document store)
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_document ON jobs (document_id)")
+            # Spooled uploads owned by a job, deleted once it can no longer be retried
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_files (job_id INTEGER NOT NULL, path TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS job_files_job ON job_files (job_id)")
+            # Document a capture key (canonical URL, or content hash without one) was first queued for,
+            # so captures queued before the first one is stored still share its document
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS capture_documents (match_key TEXT PRIMARY KEY, document_id TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        job_id, document_id, status, attempts, error, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "document_id": document_id,
+            "status": status,
+            "attempts": attempts,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def _reserve(self, match_key: str, document_id: str) -> str:
+        """Map match_key to document_id unless it is mapped already (caller holds the lock and transaction)"""
+        self._conn.execute(
+            "INSERT OR IGNORE INTO capture_documents (match_key, document_id) VALUES (?, ?)",
+            (match_key, document_id)
+        )
+        return self._conn.execute(
+            "SELECT document_id FROM capture_documents WHERE match_key = ?", (match_key,)
+        ).fetchone()[0]
+
+    def _insert(self, document_id: str, payload: Dict, files: List[str]) -> int:
+        """Insert a queued job and its files (caller holds the lock and transaction)"""
+        now = time.time()
+        cursor = self._conn.execute(
+            """
+            INSERT INTO jobs (document_id, status, payload, created_at, available_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (document_id, QUEUED, json.dumps(payload), now, now)
+        )
+        job_id = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT INTO job_files (job_id, path) VALUES (?, ?)", [(job_id, path) for path in files]
+        )
+        return job_id
+
+    def enqueue(self, document_id: str, payload: Dict, files: List[str] = ()) -> int:
+        """
+        Add a job.
+
+        Args:
+            document_id: Document the job ingests
+            payload: JSON-serializable keyword arguments for the ingest function
+            files: Spooled files the job owns (deleted when it is done or failed for good)
+
+        Returns:
+            The new job_id
+        """
+        with self._lock, self._conn:
+            return self._insert(document_id, payload, files)
+
+    def enqueue_capture(self, match_key: str, document_id: str, payload: Dict,
+                        files: List[str] = ()) -> Tuple[int, str]:
+        """
+        Add a job for a capture, reusing the document an earlier capture of match_key was queued for.
+
+        The key is mapped in the same transaction as the job is written, so two
+        captures of a new page queued back to back share one document.
+
+        Args:
+            match_key: Canonical URL of the capture, or its content hash when it has no URL
+            document_id: Document to use when match_key was never queued
+            payload: JSON-serializable keyword arguments for the ingest function
+            files: Spooled files the job owns
+
+        Returns:
+            (job_id, document_id the job ingests)
+        """
+        with self._lock, self._conn:
+            document_id = self._reserve(match_key, document_id)
+            return self._insert(document_id, payload, files), document_id
+
+    def reserve_document(self, match_key: str, document_id: str) -> str:
+        """
+        Map a capture key to a document written without a job (e.g. by a bulk import).
+
+        Returns:
+            The document match_key is mapped to (document_id unless it was mapped already)
+        """
+        with self._lock, self._conn:
+            return self._reserve(match_key, document_id)
+
+    def clear_documents(self):
+        """Forget every capture key (the documents they pointed at were deleted)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM capture_documents")
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Take the oldest job that is due and mark it running.
+
+        Returns:
+            Job dict with "payload" added, or None if nothing is due
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """
+                SELECT job_id, payload FROM jobs
+                WHERE status = ? AND available_at <= ?
+                ORDER BY available_at, job_id LIMIT 1
+                """,
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, payload = row
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ? WHERE job_id = ?",
+                (RUNNING, now, job_id)
+            )
+            job = self._get(job_id)
+
+        job["payload"] = json.loads(payload)
+        return job
+
+    def _release_files(self, job_id: int):
+        """Delete a job's spooled files (caller holds the lock and transaction)"""
+        paths = [row[0] for row in self._conn.execute("SELECT path FROM job_files WHERE job_id = ?", (job_id,))]
+        self._conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def complete(self, job_id: int):
+        """Mark a job done and delete its spooled files and payload (the page text is stored by now)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, payload = '{}', error = NULL, finished_at = ? WHERE job_id = ?",
+                (DONE, time.time(), job_id)
+            )
+            self._release_files(job_id)
+
+    def fail(self, job_id: int, error: str, retry_in: Optional[float] = None):
+        """
+        Record a failed attempt.
+
+        Args:
+            job_id: Job that failed
+            error: Error message shown in the job status
+            retry_in: Seconds until the job is retried; None fails it for good
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            if retry_in is None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                    (FAILED, error, now, job_id)
+                )
+                self._release_files(job_id)
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ? WHERE job_id = ?",
+                    (QUEUED, error, now + retry_in, job_id)
+                )
+
+    def requeue_running(self) -> int:
+        """
+        Put jobs left running by a previous process back in the queue.
+
+        Returns:
+            Number of jobs requeued
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING)
+            )
+            return cursor.rowcount
+
+    def purge_queued(self) -> int:
+        """
+        Delete jobs that have not started (or wait for a retry) and their spooled files.
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._lock, self._conn:
+            job_ids = [row[0] for row in self._conn.execute("SELECT job_id FROM jobs WHERE status = ?", (QUEUED,))]
+            for job_id in job_ids:
+                self._release_files(job_id)
+            self._conn.execute("DELETE FROM jobs WHERE status = ?", (QUEUED,))
+            return len(job_ids)
+
+    def prune(self, older_than: float) -> int:
+        """
+        Delete finished jobs.
+
+        Args:
+            older_than: Age in seconds after which done/failed jobs are removed
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = time.time() - older_than
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff)
+            )
+            return cursor.rowcount
+
+    def file_paths(self) -> set:
+        """Spooled files still owned by a queued or running job"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT path FROM job_files")}
+
+    def _get(self, job_id: int) -> Optional[Dict]:
+        row = self._conn.execute(
+            """
+            SELECT job_id, document_id, status, attempts, error, created_at, started_at, finished_at
+            FROM jobs WHERE job_id = ?
+            """,
+            (job_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def jobs_for_document(self, document_id: str, limit: int = 20) -> List[Dict]:
+        """Jobs of a document, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT job_id, document_id, status, attempts, error, created_at, started_at, finished_at
+                FROM jobs WHERE document_id = ? ORDER BY job_id DESC LIMIT ?
+                """,
+                (document_id, limit)
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def depth(self) -> int:
+        """Jobs waiting or in progress"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next queued job is due (0 if one is due now), or None if the queue is empty"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def metrics(self) -> Dict:
+        """Job counts per state and the age of the oldest queued job"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+        metrics = {state: counts.get(state, 0) for state in JOB_STATES}
+        metrics["depth"] = metrics[QUEUED] + metrics[RUNNING]
+        metrics["oldest_queued_seconds"] = round(time.time() - oldest, 1) if oldest else 0.0
+        return metrics
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,144 @@
+"""
+Load test for query embedding under concurrency
+Reports throughput and p50/p99 latency with and without micro-batching
+
+Modes:
+    inprocess - drives SigLIP directly from N concurrent threads, once calling
+                embed_texts per query and once through TextEmbeddingBatcher
+    http      - fires concurrent POST /query requests at a running server
+
+Usage:
+    python load_test_query.py --mode inprocess --concurrency 16 --requests 256
+    python load_test_query.py --mode http --concurrency 16 --requests 256
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+API_BASE = "http://localhost:8000"
+
+QUERIES = [
+    "where is the best beach I can visit",
+    "notes from yesterday morning about transformers",
+    "recipe with garlic and lemon",
+    "how does attention work in neural networks",
+    "articles about vector databases",
+    "that hiking trail I saved last week",
+    "python async event loop blocking",
+    "summary of the product design meeting",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_load(call, concurrency: int, total_requests: int) -> dict:
+    """Run total_requests calls across concurrency threads and collect latencies"""
+    latencies = []
+    lock = threading.Lock()
+    rng = random.Random(0)
+    queries = [rng.choice(QUERIES) + f" #{i}" for i in range(total_requests)]
+
+    def worker(query: str):
+        start = time.perf_counter()
+        call(query)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, queries))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "throughput": total_requests / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def print_result(label: str, result: dict):
+    print(
+        f"{label:<28} {result['throughput']:8.1f} req/s   "
+        f"p50 {result['p50_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms"
+    )
+
+
+def run_inprocess(args):
+    from siglip_embeddings import SigLIPEmbeddings, TextEmbeddingBatcher
+
+    siglip = SigLIPEmbeddings()
+    siglip.embed_texts(QUERIES)  # warm up
+
+    # Unbatched: every caller runs its own forward pass, serialized like the
+    # old single-model path
+    model_lock = threading.Lock()
+
+    def unbatched(query: str):
+        with model_lock:
+            siglip.embed_texts([query])
+
+    print_result("unbatched", run_load(unbatched, args.concurrency, args.requests))
+
+    for max_wait_ms in args.max_wait_ms:
+        batcher = TextEmbeddingBatcher(
+            siglip.embed_texts,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+        result = run_load(lambda q: batcher.embed([q]), args.concurrency, args.requests)
+        batcher.close()
+        print_result(f"batched (wait={max_wait_ms}ms)", result)
+
+
+def run_http(args):
+    import requests
+
+    session_local = threading.local()
+
+    def query(text: str):
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        response = session.post(f"{args.api_base}/query", json={
+            "query": text,
+            "top_k": 5,
+            "include_images": True
+        })
+        response.raise_for_status()
+
+    print_result("server /query", run_load(query, args.concurrency, args.requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query embedding load test")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2.0, 5.0, 10.0])
+    parser.add_argument("--api-base", default=API_BASE)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"Query load test: mode={args.mode} concurrency={args.concurrency} requests={args.requests}")
+    print("=" * 80)
+
+    if args.mode == "inprocess":
+        run_inprocess(args)
+    else:
+        run_http(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,105 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import chromadb
 from chromadb.config import Settings
 import uuid
-import re
 import time
 import json
 import os
 import asyncio
+import tempfile
+import threading
+import weakref
+from contextlib import asynccontextmanager
+import numpy as np
+from collections import ChainMap, Counter
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
-from rank_bm25 import BM25Okapi
-from openai import OpenAI
+from openai import AsyncOpenAI
 from urllib.parse import urlparse, unquote
-from siglip_embeddings import get_siglip_embeddings
+from siglip_embeddings import (
+    get_siglip_embeddings,
+    read_text_input_format,
+    write_text_input_format,
+    TEXT_INPUT_FORMAT,
+    TextEmbeddingBatcher,
+    QueryEmbeddingCache,
+    normalize_query_text
+)
+from embedding_executor import EmbeddingExecutor, EmbeddingQueueFull
+from bm25_index import BM25Index, WriteGeneration, tokenize
+from chunking import CHUNKING_MODES, iter_chunks, iter_section_chunks
+from blob_store import BlobStore
+from document_store import DocumentStore, canonicalize_url, content_hash, split_page_fields
+from metadata_codec import LazyMetadata, encode_metadata
+from stats_ledger import StatsLedger
+from image_index import ImageIndex
+from job_queue import JobQueue
+from scoring import (
+    fuse_rankings,
+    apply_temporal_decay,
+    top_n,
+    DEFAULT_RRF_K,
+    DEFAULT_DECAY_HALF_LIFE_HOURS,
+    DEFAULT_DECAY_WEIGHT
+)
 from image_utils import (
     get_document_image_dir,
+    init_http_client,
+    close_http_client,
     download_image_from_url,
+    spool_upload,
     save_uploaded_image,
-    get_image_dimensions,
+    ImageTooLarge,
+    ImageNotModified,
+    share_image,
+    shared_image_path,
+    StoredImage,
+    SHARED_IMAGE_DIR_NAME,
     IMAGE_STORAGE_DIR
 )
 
 # Load environment variables
 load_dotenv()
 
-# Configure OpenAI
+# Configure OpenAI (async client so generation never blocks the event loop).
+# OPENAI_BASE_URL can point at fake_llm_server.py for local testing.
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 if OPENAI_API_KEY:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    openai_model = "gpt-4.1"
+    openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    openai_model = os.getenv("OPENAI_MODEL", "gpt-4.1")
 else:
     openai_client = None
     openai_model = None
     print("Warning: OPENAI_API_KEY not found. Query responses will be disabled.")
 
-app = FastAPI(title="SigLIP Embedding Search API with ChromaDB")
+OPENAI_NOT_CONFIGURED_MESSAGE = "OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file."
+OPENAI_ERROR_MESSAGE = "I found relevant information but couldn't generate a response. Please check the results."
+NO_RESULTS_MESSAGE = "No relevant text chunks found for your query."
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the download client and ingest workers; stop and persist everything on shutdown"""
+    startup_http_client()
+    await startup_ingest_workers()
+    try:
+        yield
+    finally:
+        await shutdown_ingest_workers()
+        await shutdown_http_client()
+        shutdown_embedding_executor()
+        shutdown_bm25_index()
+
+
+app = FastAPI(title="SigLIP Embedding Search API with ChromaDB", lifespan=lifespan)
 
 # Add CORS middleware to allow Chrome extension requests
 app.add_middleware(
@@ -51,32 +110,163 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Chunking configuration
-CHUNK_SIZE = 800  # characters per chunk
-CHUNK_OVERLAP = 150  # overlap between chunks
-MIN_CHUNK_SIZE = 100  # minimum chunk size
+# Chunking configuration (in SigLIP tokens; the text tower truncates anything longer)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))  # 0 = the model's maximum text length
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "8"))  # context repeated in the next chunk
+# "text" chunks the flat page text; "structure" chunks clean_html by section (falls back to text)
+DEFAULT_CHUNKING_MODE = os.getenv("CHUNKING_MODE", "text")
+
+# Embedding configuration
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))  # max texts per SigLIP forward pass
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))  # threads running SigLIP inference
+EMBED_QUEUE_SIZE = int(os.getenv("EMBED_QUEUE_SIZE", "64"))  # calls allowed to wait for a worker
+EMBED_ADMISSION_TIMEOUT = float(os.getenv("EMBED_ADMISSION_TIMEOUT", "30"))  # seconds before 503
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "16"))  # query texts per micro-batch
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))  # micro-batch window
+INGEST_BATCH_MAX_WAIT_MS = float(os.getenv("INGEST_BATCH_MAX_WAIT_MS", "20"))  # window for coalescing documents
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))  # recent query embeddings kept
+
+# Query limits (requests outside them are rejected with 422)
+QUERY_MAX_TOP_K = int(os.getenv("QUERY_MAX_TOP_K", "50"))  # text results per query
+QUERY_MAX_TOP_K_IMAGES = int(os.getenv("QUERY_MAX_TOP_K_IMAGES", "20"))  # image results per query
+QUERY_MAX_POOL_MULTIPLIER = int(os.getenv("QUERY_MAX_POOL_MULTIPLIER", "10"))  # candidates = top_k * multiplier
+
+# Image download configuration (one pooled client shared by all captures)
+IMAGE_DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("IMAGE_DOWNLOAD_MAX_CONNECTIONS", "32"))  # across all hosts
+IMAGE_DOWNLOAD_MAX_PER_HOST = int(os.getenv("IMAGE_DOWNLOAD_MAX_PER_HOST", "6"))  # concurrent downloads per host
+IMAGE_DOWNLOAD_KEEPALIVE = float(os.getenv("IMAGE_DOWNLOAD_KEEPALIVE", "30"))  # seconds idle connections are kept
+IMAGE_DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_CONNECT_TIMEOUT", "5"))
+IMAGE_DOWNLOAD_READ_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_READ_TIMEOUT", "30"))
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))  # per downloaded/uploaded image
+IMAGE_EMBED_BATCH_SIZE = int(os.getenv("IMAGE_EMBED_BATCH_SIZE", "8"))  # images per SigLIP forward pass
+# Also treat images with an equal perceptual hash (resized/recompressed copies) as duplicates
+IMAGE_PHASH_DEDUP = os.getenv("IMAGE_PHASH_DEDUP", "false").lower() == "true"
+# Seconds an image URL is reused without asking the server whether the image changed
+IMAGE_URL_REVALIDATE_AFTER = float(os.getenv("IMAGE_URL_REVALIDATE_AFTER", "86400"))
 
 # ChromaDB configuration
 CHROMA_PERSIST_DIR = "./chroma_db"
 COLLECTION_NAME = "text_embeddings"
 
+# Page-level fields (clean_html, structured_content, youtube_videos), stored once per document
+DOCUMENT_STORE_PATH = os.path.join(CHROMA_PERSIST_DIR, "documents.sqlite3")
+# Compressed, content-addressed storage for clean_html and structured_content
+BLOB_STORE_DIR = os.path.join(CHROMA_PERSIST_DIR, "blobs")
+
+# /stats counters, kept in the document store database
+STATS_LEDGER_PATH = DOCUMENT_STORE_PATH
+STATS_BACKFILL_BATCH_SIZE = 500  # entries read per page when recounting an existing collection
+
+# Content hash -> shared image file and embedding, kept in the document store database
+IMAGE_INDEX_PATH = DOCUMENT_STORE_PATH
+
+# Durable ingest queue, kept in the document store database
+JOB_QUEUE_PATH = DOCUMENT_STORE_PATH
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # captures ingested concurrently
+INGEST_QUEUE_MAX_DEPTH = int(os.getenv("INGEST_QUEUE_MAX_DEPTH", "500"))  # queued + running jobs before 429
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+INGEST_RETRY_BASE_DELAY = float(os.getenv("INGEST_RETRY_BASE_DELAY", "10"))  # seconds, doubled per attempt
+INGEST_POLL_INTERVAL = 5.0  # seconds an idle worker waits before re-checking the queue
+INGEST_JOB_RETENTION_HOURS = float(os.getenv("INGEST_JOB_RETENTION_HOURS", "168"))  # finished jobs kept
+# Uploaded images are streamed here by /save and read from disk by the ingest workers
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(CHROMA_PERSIST_DIR, "upload_spool"))
+
+# Bulk ingest (/bulk)
+BULK_BATCH_DOCUMENTS = int(os.getenv("BULK_BATCH_DOCUMENTS", "256"))  # documents chunked and embedded together
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "2000"))  # entries per collection.add
+BULK_MAX_ERRORS_REPORTED = 50
+
+# BM25 index persistence
+BM25_INDEX_PATH = os.path.join(CHROMA_PERSIST_DIR, "bm25_index.bin")
+BM25_GENERATION_PATH = os.path.join(CHROMA_PERSIST_DIR, "bm25_generation")
+# Text input format the collection's text embeddings were made with
+TEXT_INPUT_FORMAT_PATH = os.path.join(CHROMA_PERSIST_DIR, "text_input_format")
+BM25_PERSIST_EVERY = int(os.getenv("BM25_PERSIST_EVERY", "500"))  # chunk changes between index saves
+
 # Initialize ChromaDB client (persistent)
 chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
 
+# Initialize document-level store
+document_store = DocumentStore(DOCUMENT_STORE_PATH, blob_store=BlobStore(BLOB_STORE_DIR))
+
+# Initialize stats counters
+stats_ledger = StatsLedger(STATS_LEDGER_PATH)
+
+# Initialize image deduplication index
+image_index = ImageIndex(IMAGE_INDEX_PATH)
+
+# Initialize durable ingest queue
+job_queue = JobQueue(JOB_QUEUE_PATH)
+os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+job_available = asyncio.Event()
+ingest_worker_tasks = []
+
+# One ingest at a time per document, so re-captures of a page diff against a settled version
+document_locks = weakref.WeakValueDictionary()
+
 # Initialize SigLIP embeddings (singleton)
 siglip = get_siglip_embeddings()
 
 # Get embedding dimension
 EMBEDDING_DIM = siglip.get_embedding_dimension()
 
+# Chunks never exceed what the text tower reads
+CHUNK_MAX_TOKENS = min(CHUNK_MAX_TOKENS or siglip.max_text_tokens, siglip.max_text_tokens)
+
+# All SigLIP inference runs on this bounded pool, never on the event loop
+embedding_executor = EmbeddingExecutor(
+    siglip,
+    max_workers=EMBED_WORKERS,
+    max_queue=EMBED_QUEUE_SIZE,
+    admission_timeout=EMBED_ADMISSION_TIMEOUT
+)
+
+# Query texts from concurrent /query requests are embedded together
+query_batcher = TextEmbeddingBatcher(
+    lambda texts: embedding_executor.embed_texts_sync(texts, batch_size=QUERY_BATCH_MAX_SIZE),
+    max_batch_size=QUERY_BATCH_MAX_SIZE,
+    max_wait_ms=QUERY_BATCH_MAX_WAIT_MS,
+    name="siglip-query-batcher"
+)
+
+# Chunks from concurrently processed captures share forward passes
+ingest_batcher = TextEmbeddingBatcher(
+    lambda texts: embedding_executor.embed_texts_sync(texts, batch_size=EMBED_BATCH_SIZE),
+    max_batch_size=EMBED_BATCH_SIZE,
+    max_wait_ms=INGEST_BATCH_MAX_WAIT_MS,
+    name="siglip-ingest-batcher"
+)
+
+# Recent query embeddings, so repeated/refreshed searches skip the model
+query_embedding_cache = QueryEmbeddingCache(max_size=QUERY_EMBED_CACHE_SIZE)
+
+
+async def embed_query(query: str) -> List[float]:
+    """
+    Embed a query once, reusing a cached embedding for the same normalized text.
+
+    Args:
+        query: Raw query string from the request
+
+    Returns:
+        Query embedding
+    """
+    key = normalize_query_text(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = (await query_batcher.embed_async([key]))[0]
+        query_embedding_cache.put(key, embedding)
+    return embedding
+
 
 # Custom embedding function for ChromaDB
 class SigLIPEmbeddingFunction(chromadb.EmbeddingFunction):
     """ChromaDB-compatible embedding function using SigLIP"""
 
     def __call__(self, input: chromadb.Documents) -> chromadb.Embeddings:
-        # Batch embed texts
-        embeddings = siglip.embed_texts(input)
+        # Micro-batched with other in-flight queries on the embedding pool (callers
+        # run collection queries via asyncio.to_thread, so blocking here is off the loop)
+        embeddings = query_batcher.embed(list(input))
         return embeddings
 
 
@@ -95,11 +285,24 @@ except:
     )
     print(f"Created new collection: {COLLECTION_NAME}")
 
+# Queries are only comparable with text embeddings made from the same text inputs
+if read_text_input_format(TEXT_INPUT_FORMAT_PATH) != TEXT_INPUT_FORMAT:
+    if collection.count():
+        raise RuntimeError(
+            f"Collection '{COLLECTION_NAME}' holds text embeddings made with an older text input format "
+            f"(expected '{TEXT_INPUT_FORMAT}'). Re-embed them before starting the server: "
+            "python migrate_document_store.py --reembed-text"
+        )
+    write_text_input_format(TEXT_INPUT_FORMAT_PATH)
+
+
+# BM25 Index (for keyword-based search), maintained incrementally on ingest
+bm25_index = BM25Index()
+write_generation = WriteGeneration(BM25_GENERATION_PATH)
 
-# BM25 Index (for keyword-based search)
-bm25_index = None
-bm25_documents = []
-bm25_ids = []
+# Serializes collection writes with BM25 updates so a persisted index always
+# matches the collection version recorded in its fingerprint
+index_write_lock = threading.Lock()
 
 
 def get_time_of_day(hour: int) -> str:
@@ -114,66 +317,198 @@ def get_time_of_day(hour: int) -> str:
         return "night"
 
 
-def rebuild_bm25_index():
-    """Rebuild BM25 index from ChromaDB collection"""
-    global bm25_index, bm25_documents, bm25_ids
+def enhance_timestamp(timestamp_readable: str) -> str:
+    """Readable capture time with weekday and time of day (e.g. "Tuesday evening, 07:30 PM")"""
+    if not timestamp_readable:
+        return timestamp_readable
+    try:
+        dt = datetime.fromisoformat(timestamp_readable.replace("T", " ").split(".")[0])
+        day_name = dt.strftime("%A")
+        time_str = dt.strftime("%I:%M %p")
+        time_of_day = get_time_of_day(dt.hour)
+        return f"{day_name} {time_of_day}, {time_str}"
+    except Exception as e:
+        print(f"Warning: Could not parse timestamp: {e}")
+        return timestamp_readable
+
+
+def stamp_chunk(chunk: str, enhanced_timestamp: str) -> str:
+    """Chunk text as embedded and stored, with the capture time appended"""
+    if enhanced_timestamp:
+        return f"{chunk}\n[Saved: {enhanced_timestamp}]"
+    return chunk
 
+
+def chunk_position(idx: int, total_chunks: int, heading_path: str = "") -> Dict:
+    """Position fields of a text chunk's metadata"""
+    return {
+        "chunk_index": idx,
+        "total_chunks": total_chunks,
+        "is_chunked": total_chunks > 1,
+        "heading_path": heading_path,
+    }
+
+
+def text_chunk_metadata(
+    serialized_metadata: Dict,
+    doc_id: str,
+    idx: int,
+    total_chunks: int,
+    chunk: str,
+    chunk_hash: str,
+    current_time: float,
+    timestamp_readable: str,
+    heading_path: str = ""
+) -> Dict:
+    """ChromaDB metadata of a newly embedded text chunk"""
+    return {
+        **serialized_metadata,
+        "type": "text",
+        "document_id": doc_id,
+        **chunk_position(idx, total_chunks, heading_path),
+        "chunk_size": len(chunk),
+        "chunk_hash": chunk_hash,
+        "timestamp_unix": current_time,
+        "timestamp_readable": timestamp_readable,
+    }
+
+
+def bm25_fingerprint() -> str:
+    """
+    Collection version the BM25 index is checked against: the collection id
+    (changes on /clear) and the write generation (bumped before every write)
+    """
+    return f"{collection.id}:{write_generation.value}"
+
+
+def rebuild_bm25_index():
+    """Rebuild BM25 index from ChromaDB collection (only when the persisted index is stale)"""
     try:
         # Get all text documents from ChromaDB
-        all_data = collection.get(where={"type": "text"})
+        all_data = collection.get(where={"type": "text"}, include=["documents"])
 
+        bm25_index.clear()
         if not all_data['documents']:
-            bm25_index = None
-            bm25_documents = []
-            bm25_ids = []
             return
 
-        # Tokenize documents for BM25
-        bm25_documents = all_data['documents']
-        bm25_ids = all_data['ids']
-
-        # Simple tokenization (split by whitespace and lowercase)
-        tokenized_docs = [doc.lower().split() for doc in bm25_documents]
-
-        # Create BM25 index
-        bm25_index = BM25Okapi(tokenized_docs)
-        print(f"BM25 index rebuilt with {len(bm25_documents)} documents")
+        bm25_index.add_many(all_data['ids'], all_data['documents'])
+        print(f"BM25 index rebuilt with {len(bm25_index)} documents")
 
     except Exception as e:
         print(f"Error rebuilding BM25 index: {e}")
-        bm25_index = None
+        bm25_index.clear()
 
 
-def reciprocal_rank_fusion(semantic_results: List[tuple], bm25_results: List[tuple], k: int = 60) -> List[tuple]:
+def persist_bm25_index():
+    """Write the BM25 index to disk, versioned against the current collection"""
+    with index_write_lock:
+        try:
+            start = time.time()
+            bm25_index.save(BM25_INDEX_PATH, bm25_fingerprint())
+            print(f"BM25 index persisted ({len(bm25_index)} documents) in {(time.time() - start) * 1000:.0f}ms")
+        except Exception as e:
+            print(f"Warning: Could not persist BM25 index: {e}")
+
+
+def load_or_rebuild_bm25_index():
+    """Map the persisted BM25 index, rebuilding it only when missing or stale"""
+    start = time.time()
+    if bm25_index.load(BM25_INDEX_PATH, bm25_fingerprint()):
+        print(f"BM25 index loaded with {len(bm25_index)} documents in {(time.time() - start) * 1000:.1f}ms")
+        return
+
+    rebuild_bm25_index()
+    persist_bm25_index()
+
+
+def write_entries(
+    ids: List[str],
+    documents: List[str],
+    metadatas: List[Dict],
+    embeddings: List[List[float]],
+    delete_ids: List[str] = None,
+    update_ids: List[str] = None,
+    update_metadatas: List[Dict] = None,
+    recount_document_id: Optional[str] = None
+) -> int:
     """
-    Combine semantic search and BM25 results using Reciprocal Rank Fusion (RRF)
+    Add entries to ChromaDB and index their text chunks for BM25.
+
+    Re-captures also delete entries that disappeared and update the metadata
+    of entries that were kept (without re-embedding them).
 
     Args:
-        semantic_results: List of (id, score) tuples from semantic search
-        bm25_results: List of (id, score) tuples from BM25
-        k: Constant for RRF (default 60)
+        ids, documents, metadatas, embeddings: New entries
+        delete_ids: Entries to remove
+        update_ids: Entries whose metadata is merged with update_metadatas
+        recount_document_id: Recount this document's stats instead of adding to them
 
     Returns:
-        List of (id, fused_score) tuples sorted by fused score
+        Number of text chunks added to the BM25 index
     """
-    rrf_scores = {}
+    with index_write_lock:
+        # Bumped first, so a crash part-way through leaves any saved index stale
+        write_generation.bump()
+
+        if delete_ids:
+            collection.delete(ids=delete_ids)
+            for entry_id in delete_ids:
+                bm25_index.remove(entry_id)
+
+        if update_ids:
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+
+        if ids:
+            collection.add(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings
+            )
 
-    # Add semantic search scores
-    for rank, (doc_id, _) in enumerate(semantic_results):
-        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0) + 1 / (k + rank + 1)
+        # Only the new chunks are tokenized and indexed
+        text_chunks = 0
+        for entry_id, document, entry_metadata in zip(ids, documents, metadatas):
+            if entry_metadata.get("type") == "text":
+                bm25_index.add(entry_id, document)
+                text_chunks += 1
+
+        if recount_document_id:
+            current = collection.get(where={"document_id": recount_document_id}, include=["documents", "metadatas"])
+            stats_ledger.remove_document(recount_document_id)
+            stats_ledger.record_entries(current["documents"], current["metadatas"])
+        else:
+            stats_ledger.record_entries(documents, metadatas)
 
-    # Add BM25 scores
-    for rank, (doc_id, _) in enumerate(bm25_results):
-        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0) + 1 / (k + rank + 1)
+    if bm25_index.pending_changes >= BM25_PERSIST_EVERY:
+        persist_bm25_index()
 
-    # Sort by fused score
-    fused_results = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
+    return text_chunks
 
-    return fused_results
 
+def backfill_stats_ledger():
+    """Recount the stats ledger when it does not match the collection (e.g. first run after upgrading)"""
+    total = collection.count()
+    if stats_ledger.totals()["total_entries"] == total:
+        return
 
-# Initialize BM25 index on startup
-rebuild_bm25_index()
+    start = time.time()
+
+    def batches():
+        for offset in range(0, total, STATS_BACKFILL_BATCH_SIZE):
+            page = collection.get(limit=STATS_BACKFILL_BATCH_SIZE, offset=offset, include=["documents", "metadatas"])
+            yield page["documents"], page["metadatas"]
+
+    try:
+        stats_ledger.rebuild(batches())
+        print(f"Stats ledger backfilled from {total} entries in {(time.time() - start) * 1000:.0f}ms")
+    except Exception as e:
+        print(f"Error backfilling stats ledger: {e}")
+
+
+# Initialize BM25 index and stats counters on startup
+load_or_rebuild_bm25_index()
+backfill_stats_ledger()
 
 
 # Pydantic models
@@ -185,11 +520,24 @@ class TextInput(BaseModel):
 
 class QueryInput(BaseModel):
     query: str
-    top_k: int = 5
-    top_k_images: int = 3  # Number of image results to return
+    top_k: int = Field(default=5, ge=1, le=QUERY_MAX_TOP_K)
+    top_k_images: int = Field(default=3, ge=1, le=QUERY_MAX_TOP_K_IMAGES)  # Number of image results to return
     include_images: bool = True  # Enable/disable image results
     enable_temporal_decay: bool = True  # Boost recent results (helps with recency bias)
     use_bm25_fusion: bool = True  # Enable BM25 + RRF fusion
+    semantic_weight: float = Field(default=1.0, ge=0)  # RRF weight of the semantic ranking
+    bm25_weight: float = Field(default=1.0, ge=0)  # RRF weight of the BM25 ranking
+    rrf_k: int = Field(default=DEFAULT_RRF_K, ge=0, le=1000)  # RRF rank constant
+    # Age at which the recency boost halves
+    decay_half_life_hours: float = Field(default=DEFAULT_DECAY_HALF_LIFE_HOURS, gt=0)
+    decay_weight: float = Field(default=DEFAULT_DECAY_WEIGHT, ge=0, le=1)  # Share of the final score from recency
+    # Candidates per ranking = top_k * multiplier
+    candidate_pool_multiplier: int = Field(default=3, ge=1, le=QUERY_MAX_POOL_MULTIPLIER)
+    # Fused candidates re-scored with temporal decay = top_k * multiplier
+    rerank_pool_multiplier: int = Field(default=2, ge=1, le=QUERY_MAX_POOL_MULTIPLIER)
+    # "summary" omits structured_content, youtube_videos and clean_html from sources
+    # (the frontend loads them from /source/{document_id}); "full" includes them
+    source_fields: Literal["summary", "full"] = "summary"
 
 
 class SourceDocument(BaseModel):
@@ -201,6 +549,7 @@ class SourceDocument(BaseModel):
     timestamp: Optional[str] = None
     snippet: str  # First 200 chars
     relevance_score: float
+    # Page content, only filled by /source and by /query with source_fields="full"
     structured_content: Optional[Dict] = None  # Headings, paragraphs, lists, tables, images
     youtube_videos: Optional[List[Dict]] = None
     clean_html: Optional[str] = None
@@ -220,30 +569,148 @@ class SearchResult(BaseModel):
     metadata: Dict
 
 
+class StoreRoundTrips:
+    """
+    Runs ChromaDB reads for a single request off the event loop and counts them,
+    so the number of store round trips per query can be reported.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    async def query(self, **kwargs) -> Dict:
+        self.count += 1
+        return await asyncio.to_thread(collection.query, **kwargs)
+
+    async def get(self, **kwargs) -> Dict:
+        self.count += 1
+        return await asyncio.to_thread(collection.get, **kwargs)
+
+
 # Helper functions
-def deserialize_metadata(metadata: Dict) -> Dict:
+def stored_image_url(metadata) -> Optional[str]:
+    """URL an image entry is served from (shared images live outside the document folder)"""
+    folder = metadata.get('image_dir') or metadata.get('document_id', '')
+    filename = metadata.get('filename', '')
+    if folder and filename:
+        return f"/images/{folder}/{filename}"
+    return None
+
+
+async def claim_stored_image(stored_image: StoredImage, source_url: Optional[str] = None) -> Optional[List[float]]:
+    """
+    Take a reference to the shared copy of a freshly stored image, moving it
+    into the shared directory when the content is new. The reference is taken
+    before the move, so no concurrent release can delete the shared file.
+
+    Returns:
+        The reusable embedding of a known image, or None when it still has to be embedded
+    """
+    shared_path = shared_image_path(stored_image)
+    known = await asyncio.to_thread(
+        image_index.claim,
+        stored_image.content_hash,
+        stored_image.phash,
+        shared_path,
+        os.path.basename(shared_path),
+        stored_image.width,
+        stored_image.height,
+        match_phash=IMAGE_PHASH_DEDUP,
+        source_url=source_url,
+        validators=stored_image.validators
+    )
+    if known["embedding"] is None:
+        await asyncio.to_thread(share_image, stored_image, known["file_path"])
+        return None
+
+    await asyncio.to_thread(os.remove, stored_image.path)
+    stored_image.path, stored_image.filename = known["file_path"], known["filename"]
+    stored_image.content_hash, stored_image.phash = known["content_hash"], known["phash"]
+    stored_image.width, stored_image.height = known["width"], known["height"]
+    stored_image.pixel_values = None
+    return known["embedding"]
+
+
+async def release_images(content_hashes: List[str]):
+    """Drop image references; the index deletes a shared file with its last reference"""
+    for released_hash in content_hashes:
+        await asyncio.to_thread(image_index.release, released_hash)
+
+
+def shared_image_metadata(stored_image: StoredImage) -> Dict:
+    """Metadata fields locating a shared image and its hashes"""
+    return {
+        "file_path": stored_image.path,
+        "filename": stored_image.filename,
+        "image_dir": SHARED_IMAGE_DIR_NAME,
+        "content_hash": stored_image.content_hash,
+        "phash": stored_image.phash,
+    }
+
+
+async def embed_image_batch(batch: List[tuple]) -> List[tuple]:
     """
-    Deserialize JSON strings in metadata back to dictionaries/lists
+    Embed ingested images in one forward pass.
 
     Args:
-        metadata: Metadata dictionary from ChromaDB
+        batch: (image_id, document, metadata, StoredImage) tuples
 
     Returns:
-        Metadata with deserialized complex fields
+        (image_id, document, metadata, embedding) tuples
     """
-    deserialized = {}
-    for key, value in metadata.items():
-        if isinstance(value, str):
-            # Try to parse as JSON
-            try:
-                deserialized[key] = json.loads(value)
-            except (json.JSONDecodeError, ValueError):
-                # Not JSON, keep as string
-                deserialized[key] = value
-        else:
-            # Keep non-string values as-is
-            deserialized[key] = value
-    return deserialized
+    # Images were preprocessed when decoded; only the forward pass uses an embedding worker
+    pixel_values = [item[3].pixel_values for item in batch]
+    for item in batch:
+        item[3].pixel_values = None
+    embeddings = await embedding_executor.embed_pixel_values(pixel_values)
+    return [(image_id, document, metadata, embedding)
+            for (image_id, document, metadata, _), embedding in zip(batch, embeddings)]
+
+
+async def embed_images_as_completed(image_tasks: List, batch_size: int = IMAGE_EMBED_BATCH_SIZE) -> List[tuple]:
+    """
+    Run image download/save coroutines concurrently and embed the finished
+    images in batches while the remaining downloads are still in flight.
+
+    Args:
+        image_tasks: Coroutines returning (image_id, document, metadata, StoredImage)
+            for images that need embedding, (image_id, document, metadata, embedding)
+            for images already seen, or None
+        batch_size: Images per forward pass
+
+    Returns:
+        (image_id, document, metadata, embedding) tuples, in image_index order
+    """
+    pending = []
+    embed_tasks = []
+    embedded = []
+
+    for next_done in asyncio.as_completed(image_tasks):
+        try:
+            result = await next_done
+        except Exception as e:
+            print(f"✗ Error processing image in background: {e}")
+            continue
+        if result and isinstance(result[3], StoredImage):
+            pending.append(result)
+        elif result:
+            embedded.append(result)  # duplicate of a stored image, embedding reused
+        if len(pending) >= batch_size:
+            embed_tasks.append(asyncio.create_task(embed_image_batch(pending)))
+            pending = []
+
+    if pending:
+        embed_tasks.append(asyncio.create_task(embed_image_batch(pending)))
+
+    reused = len(embedded)
+    for batch_result in await asyncio.gather(*embed_tasks, return_exceptions=True):
+        if isinstance(batch_result, Exception):
+            print(f"✗ Error embedding image batch in background: {batch_result}")
+            continue
+        embedded.extend(batch_result)
+
+    print(f"✓ Embedded {len(embedded) - reused} images in {len(embed_tasks)} batches, reused {reused}")
+    return sorted(embedded, key=lambda item: item[2]["image_index"])
 
 
 def get_file_extension_from_url(url: str) -> str:
@@ -276,39 +743,59 @@ def get_file_extension_from_url(url: str) -> str:
         return '.jpg'
 
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """
-    Split text into overlapping chunks, trying to preserve sentence boundaries.
+def chunk_token_budget(enhanced_timestamp: str = "") -> int:
+    """Tokens available to a chunk's text once the "[Saved: ...]" suffix is reserved"""
+    reserved_tokens = siglip.count_tokens([stamp_chunk("", enhanced_timestamp)])[0] if enhanced_timestamp else 0
+    # A malformed timestamp must not squeeze out the text itself
+    return max(CHUNK_MAX_TOKENS - reserved_tokens, CHUNK_MAX_TOKENS // 2)
+
+
+def chunk_text(text: str, enhanced_timestamp: str = "") -> List[str]:
     """
-    if len(text) <= chunk_size:
-        return [text]
+    Split text into overlapping chunks that fit SigLIP's text length.
 
-    chunks = []
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    current_chunk = ""
+    Args:
+        text: Text to split
+        enhanced_timestamp: Capture time appended to every chunk (see stamp_chunk),
+            whose tokens are reserved in each chunk's budget
 
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
-            chunks.append(current_chunk.strip())
+    Returns:
+        Chunks in document order
+    """
+    max_tokens = chunk_token_budget(enhanced_timestamp)
+    chunks = list(iter_chunks(text, siglip.count_tokens, max_tokens, CHUNK_OVERLAP_TOKENS))
+    return chunks or [text]
 
-            if overlap > 0 and len(current_chunk) >= overlap:
-                overlap_text = current_chunk[-overlap:].strip()
-                current_chunk = overlap_text + " " + sentence
-            else:
-                current_chunk = sentence
-        else:
-            if current_chunk:
-                current_chunk += " " + sentence
-            else:
-                current_chunk = sentence
 
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
+def chunk_page(
+    text: str,
+    metadata_dict: Dict,
+    chunking_mode: str = "text",
+    enhanced_timestamp: str = ""
+) -> List[Tuple[str, str]]:
+    """
+    Chunk a capture with the requested chunking mode.
 
-    if len(chunks) > 1:
-        chunks = [c for c in chunks if len(c) >= MIN_CHUNK_SIZE]
+    In "structure" mode the page's clean_html is split into section-aligned
+    chunks, each tagged with the headings it sits under. Pages without
+    clean_html (or whose clean_html has no text) are chunked as flat text.
 
-    return chunks if chunks else [text]
+    Args:
+        text: Flat page text
+        metadata_dict: Capture metadata (clean_html is read from it)
+        chunking_mode: "text" or "structure"
+        enhanced_timestamp: Capture time appended to every chunk
+
+    Returns:
+        (chunk, heading_path) pairs in document order
+    """
+    clean_html = metadata_dict.get("clean_html")
+    if chunking_mode == "structure" and isinstance(clean_html, str) and clean_html.strip():
+        max_tokens = chunk_token_budget(enhanced_timestamp)
+        sections = list(iter_section_chunks(clean_html, siglip.count_tokens, max_tokens, CHUNK_OVERLAP_TOKENS))
+        if sections:
+            return sections
+    return [(chunk, "") for chunk in chunk_text(text, enhanced_timestamp)]
 
 
 async def process_content_background(
@@ -317,25 +804,59 @@ async def process_content_background(
     metadata_dict: Dict,
     enable_chunking: bool,
     image_url_list: List[str],
-    uploaded_images: List[tuple]  # List of (filename, file_content) tuples
+    uploaded_images: List[tuple],  # List of (filename, spool path, sha256) tuples
+    chunking_mode: str = "text"
 ):
     """
     Background task to process text chunking and image embedding.
     Processes images in parallel for better performance.
+
+    Re-captures of a stored document (same document_id) are diffed per chunk:
+    unchanged chunks keep their embeddings, only new chunks are embedded,
+    removed chunks are deleted, and a version record is written.
     """
+    lock = document_locks.setdefault(doc_id, asyncio.Lock())
+    async with lock:
+        await ingest_document(
+            doc_id, text, metadata_dict, enable_chunking, image_url_list, uploaded_images, chunking_mode
+        )
+
+
+async def ingest_document(
+    doc_id: str,
+    text: str,
+    metadata_dict: Dict,
+    enable_chunking: bool,
+    image_url_list: List[str],
+    uploaded_images: List[tuple],
+    chunking_mode: str = "text"
+):
+    """Chunk, embed and store one capture (see process_content_background)"""
     try:
         print(f"\n=== Background processing started for {doc_id} ===")
         current_time = time.time()
 
+        # Previous capture of this document, if any
+        previous_version = await asyncio.to_thread(document_store.latest_version, doc_id)
+        version = previous_version["version"] + 1 if previous_version else 1
+        # Entry ids of later versions are prefixed so they never collide with kept entries
+        id_prefix = doc_id if version == 1 else f"{doc_id}_v{version}"
+        previous_entries = {"ids": [], "metadatas": []}
+        if previous_version:
+            previous_entries = await asyncio.to_thread(
+                collection.get, where={"document_id": doc_id}, include=["metadatas"]
+            )
+            print(f"Re-capture of {doc_id}: diffing against version {previous_version['version']}")
+
+        # Heavy page fields are stored once per document; chunks and images
+        # only carry the lightweight fields plus document_id as a reference
+        page_fields, chunk_level_metadata = split_page_fields(metadata_dict)
+        if page_fields:
+            await asyncio.to_thread(document_store.put, doc_id, page_fields)
+
         # Serialize complex metadata fields to JSON strings for ChromaDB
-        serialized_metadata = {}
-        for key, value in metadata_dict.items():
-            if isinstance(value, (dict, list)):
-                serialized_metadata[key] = json.dumps(value)
-            elif isinstance(value, (str, int, float, bool)) or value is None:
-                serialized_metadata[key] = value
-            else:
-                serialized_metadata[key] = str(value)
+        # (the codec records which fields it encoded so reads decode only those)
+        serialized_metadata = encode_metadata(chunk_level_metadata)
 
         # Prepare lists for batch ChromaDB insert
         all_ids = []
@@ -343,90 +864,116 @@ async def process_content_background(
         all_metadatas = []
         all_embeddings = []
 
+        # Re-capture changes to existing entries
+        delete_ids = []
+        update_ids = []
+        update_metadatas = []
+        chunk_hashes = []
+        chunks_kept = 0
+
+        # Stored chunks of the previous version by text hash; matching chunks are
+        # kept, the rest are deleted (all of them when the new capture has no text)
+        previous_chunks = {}
+        for entry_id, entry_metadata in zip(previous_entries["ids"], previous_entries["metadatas"]):
+            if entry_metadata.get("type", "text") == "text":
+                previous_chunks.setdefault(entry_metadata.get("chunk_hash"), []).append(entry_id)
+
         # ===== PROCESS TEXT =====
         text_chunks_count = 0
         if text.strip():
             try:
                 print(f"Processing text content in background...")
-                if enable_chunking:
-                    chunks = chunk_text(text)
-                else:
-                    chunks = [text]
-
-                text_chunks_count = len(chunks)
-                print(f"✓ Created {text_chunks_count} text chunks")
 
                 # Get readable timestamp with time-of-day
                 timestamp_readable = metadata_dict.get("timestamp", "")
-                enhanced_timestamp = timestamp_readable
-                if timestamp_readable:
-                    try:
-                        dt = datetime.fromisoformat(timestamp_readable.replace("T", " ").split(".")[0])
-                        day_name = dt.strftime("%A")
-                        time_str = dt.strftime("%I:%M %p")
-                        time_of_day = get_time_of_day(dt.hour)
-                        enhanced_timestamp = f"{day_name} {time_of_day}, {time_str}"
-                    except Exception as e:
-                        print(f"Warning: Could not parse timestamp: {e}")
-                        enhanced_timestamp = timestamp_readable
-
-                for idx, chunk in enumerate(chunks):
-                    try:
-                        chunk_id = f"{doc_id}_chunk_{idx}"
-                        chunk_with_timestamp = chunk
-                        if enhanced_timestamp:
-                            chunk_with_timestamp = f"{chunk}\n[Saved: {enhanced_timestamp}]"
-
-                        text_embedding = siglip.embed_text(chunk_with_timestamp)
-
-                        chunk_metadata = {
-                            **serialized_metadata,
-                            "type": "text",
-                            "document_id": doc_id,
-                            "chunk_index": idx,
-                            "total_chunks": text_chunks_count,
-                            "is_chunked": text_chunks_count > 1,
-                            "chunk_size": len(chunk),
-                            "timestamp_unix": current_time,
-                            "timestamp_readable": timestamp_readable,
-                        }
-
-                        all_ids.append(chunk_id)
-                        all_documents.append(chunk_with_timestamp)
-                        all_metadatas.append(chunk_metadata)
-                        all_embeddings.append(text_embedding)
-
-                    except Exception as e:
-                        print(f"✗ Error processing text chunk {idx} in background: {e}")
+                enhanced_timestamp = enhance_timestamp(timestamp_readable)
 
+                if enable_chunking:
+                    # Tokenizing a long page takes a while, so it runs off the event loop
+                    chunks = await asyncio.to_thread(
+                        chunk_page, text, metadata_dict, chunking_mode, enhanced_timestamp
+                    )
+                else:
+                    chunks = [(text, "")]
+
+                text_chunks_count = len(chunks)
+                print(f"✓ Created {text_chunks_count} text chunks ({chunking_mode} mode)")
+
+                new_chunks = []  # (idx, chunk, chunk_hash, heading_path)
+                kept_ids = []
+                kept_metadatas = []
+                capture_hashes = []
+                for idx, (chunk, heading_path) in enumerate(chunks):
+                    chunk_hash = content_hash(chunk)
+                    capture_hashes.append(chunk_hash)
+                    if previous_chunks.get(chunk_hash):
+                        # Unchanged text: keep the embedding, refresh position and page metadata.
+                        # The timestamps stay those of the first capture, which the stored
+                        # text and its embedding carry in their [Saved: ...] stamp
+                        kept_ids.append(previous_chunks[chunk_hash].pop())
+                        kept_metadatas.append({
+                            **{key: value for key, value in serialized_metadata.items() if key != "timestamp"},
+                            **chunk_position(idx, text_chunks_count, heading_path),
+                        })
+                    else:
+                        new_chunks.append((idx, chunk, chunk_hash, heading_path))
+
+                chunk_texts = [stamp_chunk(chunk, enhanced_timestamp) for _, chunk, _, _ in new_chunks]
+
+                # Embed new chunks in size-bounded batches, shared with other queued captures
+                text_embeddings = await ingest_batcher.embed_async(chunk_texts) if chunk_texts else []
+
+                for (idx, chunk, chunk_hash, heading_path), chunk_with_timestamp, text_embedding in zip(
+                    new_chunks, chunk_texts, text_embeddings
+                ):
+                    all_ids.append(f"{id_prefix}_chunk_{idx}")
+                    all_documents.append(chunk_with_timestamp)
+                    all_metadatas.append(text_chunk_metadata(
+                        serialized_metadata, doc_id, idx, text_chunks_count, chunk, chunk_hash,
+                        current_time, timestamp_readable, heading_path
+                    ))
+                    all_embeddings.append(text_embedding)
+
+                update_ids.extend(kept_ids)
+                update_metadatas.extend(kept_metadatas)
+                chunk_hashes = capture_hashes
+                chunks_kept = len(kept_ids)
             except Exception as e:
                 print(f"✗ Error in background text processing: {e}")
+                raise
+
+        # Previous chunks not kept above are stale, whatever the new text is
+        # (they are only dropped by the write, after the new chunks are embedded)
+        delete_ids.extend(entry_id for entry_ids in previous_chunks.values() for entry_id in entry_ids)
+        if previous_version:
+            print(f"✓ Chunk diff: {text_chunks_count - chunks_kept} new, {chunks_kept} kept, {len(delete_ids)} removed")
 
         # ===== PROCESS IMAGES IN PARALLEL =====
         images_saved = 0
         image_dir = None
+        claimed_hashes = []  # image references this capture took, released again if unused
 
         if uploaded_images or image_url_list:
             image_dir = get_document_image_dir(doc_id)
             print(f"✓ Created image directory: {image_dir}")
 
-        # Create async tasks for parallel image processing
-        async def process_uploaded_image(idx: int, filename: str, file_content: bytes):
+        # Coroutines that save/download and decode one image each (embedding happens in batches)
+        async def process_uploaded_image(idx: int, filename: str, spool_path: str, file_hash: str):
             try:
                 print(f"Processing uploaded image {idx + 1} in background")
                 file_extension = Path(filename).suffix or ".jpg"
                 save_filename = f"image_{idx}{file_extension}"
                 file_path = str(Path(image_dir) / save_filename)
 
-                if save_uploaded_image(file_content, file_path):
-                    dimensions = None
-                    try:
-                        dimensions = get_image_dimensions(file_path)
-                    except Exception as e:
-                        print(f"Warning: Could not get dimensions: {e}")
-
-                    image_embedding = siglip.embed_image(file_path)
-                    image_id = f"{doc_id}_image_{idx}"
+                # Written and decoded once; the decode also yields dimensions and pixel values
+                stored_image = await asyncio.to_thread(
+                    save_uploaded_image, spool_path, file_path, file_hash, siglip.preprocess_images
+                )
+                if stored_image:
+                    # Same content stored before: reuse its file and embedding
+                    known_embedding = await claim_stored_image(stored_image)
+                    claimed_hashes.append(stored_image.content_hash)
+                    image_id = f"{id_prefix}_image_{idx}"
                     alt_text = serialized_metadata.get(f"image_{idx}_alt", "")
                     image_document = f"[IMAGE] {alt_text}" if alt_text else f"[IMAGE] Uploaded image {idx}"
 
@@ -434,16 +981,15 @@ async def process_content_background(
                         "type": "image",
                         "document_id": doc_id,
                         "image_index": idx,
-                        "file_path": file_path,
-                        "filename": save_filename,
+                        **shared_image_metadata(stored_image),
                         "alt_text": alt_text,
                         "source": "upload",
                         "timestamp_unix": current_time,
                         **serialized_metadata,
-                        **(dimensions or {})
+                        **stored_image.dimensions
                     }
 
-                    return (image_id, image_document, image_metadata, image_embedding, save_filename)
+                    return (image_id, image_document, image_metadata, known_embedding or stored_image)
             except Exception as e:
                 print(f"✗ Error processing uploaded image {idx} in background: {e}")
                 return None
@@ -455,21 +1001,43 @@ async def process_content_background(
                 filename = f"image_url_{idx}{file_extension}"
                 file_path = str(Path(image_dir) / filename)
 
-                try:
-                    download_success = await download_image_from_url(img_url, file_path)
-                except Exception as e:
-                    print(f"Download failed: {e}")
-                    download_success = False
-
-                if download_success:
-                    dimensions = None
+                # URL seen before: reuse the stored file and embedding without downloading.
+                # Past IMAGE_URL_REVALIDATE_AFTER a conditional request checks the image is unchanged
+                known = stored_image = None
+                downloaded = False
+                previous = await asyncio.to_thread(image_index.url_validators, img_url)
+                if previous and time.time() - previous["checked_at"] < IMAGE_URL_REVALIDATE_AFTER:
+                    known = await asyncio.to_thread(image_index.claim_url, img_url)
+                elif previous:
                     try:
-                        dimensions = get_image_dimensions(file_path)
-                    except Exception as e:
-                        print(f"Warning: Could not get dimensions: {e}")
-
-                    image_embedding = siglip.embed_image(file_path)
-                    image_id = f"{doc_id}_image_url_{idx}"
+                        stored_image = await download_image_from_url(
+                            img_url, file_path, max_bytes=MAX_IMAGE_BYTES, preprocess=siglip.preprocess_images,
+                            validators=previous
+                        )
+                        downloaded = True
+                    except ImageNotModified:
+                        known = await asyncio.to_thread(image_index.claim_url, img_url, True)
+
+                if known:
+                    stored_image = StoredImage(known["file_path"], known["width"], known["height"], None,
+                                               known["content_hash"], known["phash"])
+                    known_embedding = known["embedding"]
+                else:
+                    if not downloaded:
+                        try:
+                            stored_image = await download_image_from_url(
+                                img_url, file_path, max_bytes=MAX_IMAGE_BYTES, preprocess=siglip.preprocess_images
+                            )
+                        except Exception as e:
+                            print(f"Download failed: {e}")
+                            stored_image = None
+                    # Same content stored before (e.g. another URL): reuse its file and embedding
+                    known_embedding = await claim_stored_image(stored_image, img_url) if stored_image else None
+                if stored_image:
+                    claimed_hashes.append(stored_image.content_hash)
+
+                if stored_image:
+                    image_id = f"{id_prefix}_image_url_{idx}"
                     alt_text = serialized_metadata.get(f"image_url_{idx}_alt", "")
                     image_document = f"[IMAGE] {alt_text}" if alt_text else f"[IMAGE] Image from {img_url}"
 
@@ -477,67 +1045,111 @@ async def process_content_background(
                         "type": "image",
                         "document_id": doc_id,
                         "image_index": len(uploaded_images) + idx,
-                        "file_path": file_path,
-                        "filename": filename,
+                        **shared_image_metadata(stored_image),
                         "source_url": img_url,
                         "alt_text": alt_text,
                         "source": "url",
                         "timestamp_unix": current_time,
                         **serialized_metadata,
-                        **(dimensions or {})
+                        **stored_image.dimensions
                     }
 
-                    return (image_id, image_document, image_metadata, image_embedding, filename)
+                    return (image_id, image_document, image_metadata, known_embedding or stored_image)
             except Exception as e:
                 print(f"✗ Error processing image URL {idx} in background: {e}")
                 return None
 
-        # Process all images in parallel
+        # Download all images concurrently
         image_tasks = []
 
         # Add uploaded image tasks
-        for idx, (filename, file_content) in enumerate(uploaded_images):
-            image_tasks.append(process_uploaded_image(idx, filename, file_content))
+        for idx, (filename, spool_path, file_hash) in enumerate(uploaded_images):
+            image_tasks.append(process_uploaded_image(idx, filename, spool_path, file_hash))
 
         # Add URL image tasks
         for idx, img_url in enumerate(image_url_list):
             image_tasks.append(process_image_url(idx, img_url))
 
-        # Wait for all image tasks to complete
+        # Embed finished images in batches while the rest are still downloading
         if image_tasks:
             print(f"Processing {len(image_tasks)} images in parallel...")
-            image_results = await asyncio.gather(*image_tasks, return_exceptions=True)
+            image_results = await embed_images_as_completed(image_tasks, IMAGE_EMBED_BATCH_SIZE)
 
-            for result in image_results:
-                if result and not isinstance(result, Exception):
-                    image_id, image_document, image_metadata, image_embedding, filename = result
-                    all_ids.append(image_id)
-                    all_documents.append(image_document)
-                    all_metadatas.append(image_metadata)
-                    all_embeddings.append(image_embedding)
-                    images_saved += 1
+            for image_id, image_document, image_metadata, image_embedding in image_results:
+                all_ids.append(image_id)
+                all_documents.append(image_document)
+                all_metadatas.append(image_metadata)
+                all_embeddings.append(image_embedding)
+                images_saved += 1
+
+        # Images live in the shared directory; the per-document folder only held downloads in flight
+        if image_dir:
+            try:
+                os.rmdir(image_dir)
+            except OSError:
+                pass
+
+        # Images of the previous version are replaced by this capture's images
+        # (shared files and embeddings make re-adding an unchanged image cheap)
+        chunks_removed = len(delete_ids)
+        released_hashes = []
+        for entry_id, entry_metadata in zip(previous_entries["ids"], previous_entries["metadatas"]):
+            if entry_metadata.get("type") == "image":
+                delete_ids.append(entry_id)
+                if entry_metadata.get("content_hash"):
+                    released_hashes.append(entry_metadata["content_hash"])
+
+        # Images that were claimed but did not make it into an entry
+        unused_claims = list((Counter(claimed_hashes) - Counter(
+            entry_metadata["content_hash"] for entry_metadata in all_metadatas
+            if entry_metadata.get("type") == "image" and entry_metadata.get("content_hash")
+        )).elements())
 
         # ===== SAVE TO CHROMADB =====
-        if all_ids:
+        if all_ids or delete_ids or update_ids:
             try:
                 print(f"Saving {len(all_ids)} entries to ChromaDB in background...")
-                collection.add(
-                    ids=all_ids,
-                    documents=all_documents,
-                    metadatas=all_metadatas,
-                    embeddings=all_embeddings
+                try:
+                    indexed_chunks = await asyncio.to_thread(
+                        write_entries, all_ids, all_documents, all_metadatas, all_embeddings,
+                        delete_ids=delete_ids,
+                        update_ids=update_ids,
+                        update_metadatas=update_metadatas,
+                        recount_document_id=doc_id if previous_version else None
+                    )
+                except Exception:
+                    # The job is retried from scratch and claims its images again
+                    await release_images(claimed_hashes)
+                    raise
+
+                # Store embeddings of new images so later captures can reuse them
+                for entry_metadata, embedding in zip(all_metadatas, all_embeddings):
+                    if entry_metadata.get("type") == "image" and entry_metadata.get("content_hash"):
+                        await asyncio.to_thread(image_index.set_embedding, entry_metadata["content_hash"], embedding)
+
+                # Released after the new entries took their references, so a kept
+                # image is never deleted in between; claims of images that failed to
+                # embed are given back as well
+                await release_images(released_hashes + unused_claims)
+                print(f"✓ Saved to ChromaDB successfully, BM25 index updated with {indexed_chunks} chunks")
+
+                await asyncio.to_thread(
+                    document_store.add_version,
+                    doc_id,
+                    canonicalize_url(metadata_dict.get("url", "")),
+                    content_hash(text),
+                    chunk_hashes,
+                    sum(1 for entry_metadata in all_metadatas if entry_metadata["type"] == "text"),
+                    chunks_kept,
+                    chunks_removed
                 )
-                print(f"✓ Saved to ChromaDB successfully")
-
-                if text_chunks_count > 0:
-                    try:
-                        rebuild_bm25_index()
-                        print(f"✓ BM25 index rebuilt")
-                    except Exception as e:
-                        print(f"Warning: Could not rebuild BM25 index: {e}")
+                print(f"✓ Recorded version {version} of {doc_id}")
 
             except Exception as e:
                 print(f"✗ Error saving to ChromaDB in background: {e}")
+                raise
+        else:
+            await release_images(unused_claims)
 
         print(f"✓ Background processing completed for {doc_id}: {text_chunks_count} chunks, {images_saved} images")
 
@@ -545,6 +1157,294 @@ async def process_content_background(
         print(f"✗ CRITICAL ERROR in background processing: {e}")
         import traceback
         traceback.print_exc()
+        # Surfaced to the ingest worker, which retries the job
+        raise
+
+
+def capture_match_key(metadata_dict: Dict, text: str) -> str:
+    """Key re-captures of a page share: its canonical URL, or its content hash when it has no URL"""
+    return canonicalize_url(metadata_dict.get("url", "")) or content_hash(text)
+
+
+def enqueue_capture(doc_id: str, text: str, metadata_dict: Dict, enable_chunking: bool,
+                    image_url_list: List[str], uploaded_images: List[tuple] = (),
+                    chunking_mode: str = "text") -> tuple:
+    """
+    Persist an ingest job for one capture (uploads as spooled paths).
+
+    doc_id is used unless an earlier capture of the same page was queued for
+    another document, which the job then ingests instead.
+
+    Returns:
+        (job_id, document_id)
+    """
+    return job_queue.enqueue_capture(
+        capture_match_key(metadata_dict, text),
+        doc_id,
+        {
+            "text": text,
+            "metadata_dict": metadata_dict,
+            "enable_chunking": enable_chunking,
+            "image_url_list": image_url_list,
+            "uploaded_images": [list(upload) for upload in uploaded_images],
+            "chunking_mode": chunking_mode,
+        },
+        files=[spool_path for _, spool_path, _ in uploaded_images]
+    )
+
+
+async def ingest_bulk_batch(records: List[Dict]) -> Dict:
+    """
+    Chunk, embed and store a batch of new text documents in one pass.
+
+    All chunks of the batch are embedded together and written with a few
+    large collection.add calls. Records that need the per-capture pipeline
+    (re-captures of stored pages, pages with images) are put on the ingest
+    queue instead, up to INGEST_QUEUE_MAX_DEPTH; the excess is rejected.
+
+    Args:
+        records: Parsed /bulk records ({"text", "metadata", "image_urls", "enable_chunking", "chunking_mode",
+            "line"})
+
+    Returns:
+        Counts of documents ingested and queued, chunks written, the document ids and the
+        (line, error) of records rejected because the queue is full
+    """
+    current_time = time.time()
+    documents = []  # (doc_id, canonical_url, text_hash, chunk_hashes)
+    page_fields_by_id = {}
+    deferred = []  # (doc_id, record) written after this batch, through the queue
+    queued_ids = []
+    seen = {}  # canonical URL (or text hash) -> doc_id within this batch
+    rejected = []  # (line, error) of records the full ingest queue could not take
+    queue_room = INGEST_QUEUE_MAX_DEPTH - await asyncio.to_thread(job_queue.depth)
+
+    ids, texts, metadatas = [], [], []
+    for record in records:
+        text = record["text"]
+        metadata_dict = record["metadata"]
+        canonical = canonicalize_url(metadata_dict.get("url", ""))
+        text_hash = content_hash(text)
+        match_key = canonical or text_hash
+
+        existing_doc_id = seen.get(match_key) or await asyncio.to_thread(
+            document_store.find_document, canonical, text_hash
+        )
+        doc_id = existing_doc_id or str(uuid.uuid4())
+        if not existing_doc_id and not record["image_urls"]:
+            # Claim the page for this batch; a capture of it still in the queue keeps its document
+            reserved_doc_id = await asyncio.to_thread(job_queue.reserve_document, match_key, doc_id)
+            if reserved_doc_id != doc_id:
+                existing_doc_id = doc_id = reserved_doc_id
+        if existing_doc_id or record["image_urls"]:
+            if queue_room <= 0:
+                rejected.append((record["line"], "Ingest queue is full, retry later"))
+                continue
+            queue_room -= 1
+            if existing_doc_id in page_fields_by_id:
+                # Duplicate within this batch: queue it once the first copy is stored
+                deferred.append((doc_id, record))
+            else:
+                _, doc_id = await asyncio.to_thread(
+                    enqueue_capture, doc_id, text, metadata_dict, record["enable_chunking"], record["image_urls"],
+                    (), record["chunking_mode"]
+                )
+                queued_ids.append(doc_id)
+            seen[match_key] = doc_id
+            continue
+
+        seen[match_key] = doc_id
+        page_fields, chunk_level_metadata = split_page_fields(metadata_dict)
+        page_fields_by_id[doc_id] = page_fields
+        serialized_metadata = encode_metadata(chunk_level_metadata)
+
+        timestamp_readable = metadata_dict.get("timestamp", "")
+        enhanced_timestamp = enhance_timestamp(timestamp_readable)
+        if record["enable_chunking"]:
+            chunks = await asyncio.to_thread(
+                chunk_page, text, metadata_dict, record["chunking_mode"], enhanced_timestamp
+            )
+        else:
+            chunks = [(text, "")]
+        chunk_hashes = []
+        for idx, (chunk, heading_path) in enumerate(chunks):
+            chunk_hash = content_hash(chunk)
+            chunk_hashes.append(chunk_hash)
+            ids.append(f"{doc_id}_chunk_{idx}")
+            texts.append(stamp_chunk(chunk, enhanced_timestamp))
+            metadatas.append(text_chunk_metadata(
+                serialized_metadata, doc_id, idx, len(chunks), chunk, chunk_hash,
+                current_time, timestamp_readable, heading_path
+            ))
+        documents.append((doc_id, canonical, text_hash, chunk_hashes))
+
+    embeddings = await ingest_batcher.embed_async(texts) if texts else []
+
+    def store_batch():
+        for doc_id, page_fields in page_fields_by_id.items():
+            if page_fields:
+                document_store.put(doc_id, page_fields)
+        for start in range(0, len(ids), BULK_WRITE_BATCH_SIZE):
+            end = start + BULK_WRITE_BATCH_SIZE
+            write_entries(ids[start:end], texts[start:end], metadatas[start:end], embeddings[start:end])
+        for doc_id, canonical, text_hash, chunk_hashes in documents:
+            document_store.add_version(doc_id, canonical, text_hash, chunk_hashes, len(chunk_hashes), 0, 0)
+        for doc_id, record in deferred:
+            enqueue_capture(
+                doc_id, record["text"], record["metadata"], record["enable_chunking"], record["image_urls"],
+                (), record["chunking_mode"]
+            )
+
+    await asyncio.to_thread(store_batch)
+    if queued_ids or deferred:
+        job_available.set()
+
+    return {
+        "ingested": len(documents),
+        "queued": len(queued_ids) + len(deferred),
+        "chunks": len(ids),
+        "document_ids": [doc_id for doc_id, _, _, _ in documents] + queued_ids + [doc_id for doc_id, _ in deferred],
+        "rejected": rejected,
+    }
+
+
+def parse_bulk_record(line: str) -> Dict:
+    """
+    Parse and validate one /bulk NDJSON line.
+
+    Raises:
+        ValueError if the line is not a record with text or image URLs, or names an unknown chunking mode
+    """
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+
+    text = record.get("text") or ""
+    metadata_dict = record.get("metadata") or {}
+    image_url_list = record.get("image_urls") or []
+    if not isinstance(text, str) or not isinstance(metadata_dict, dict) or not isinstance(image_url_list, list):
+        raise ValueError("text must be a string, metadata an object and image_urls an array")
+    if not text.strip() and not image_url_list:
+        raise ValueError("record has neither text nor image_urls")
+    chunking_mode = record.get("chunking_mode") or DEFAULT_CHUNKING_MODE
+    if chunking_mode not in CHUNKING_MODES:
+        raise ValueError(f"chunking_mode must be one of {', '.join(CHUNKING_MODES)}")
+
+    return {
+        "text": text,
+        "metadata": metadata_dict,
+        "image_urls": image_url_list,
+        "enable_chunking": bool(record.get("enable_chunking", True)),
+        "chunking_mode": chunking_mode,
+    }
+
+
+async def run_ingest_job(job: Dict):
+    """Run one claimed job and record its outcome (retrying with backoff on failure)"""
+    job_id = job["job_id"]
+    try:
+        await process_content_background(doc_id=job["document_id"], **job["payload"])
+        await asyncio.to_thread(job_queue.complete, job_id)
+        print(f"✓ Ingest job {job_id} done")
+    except Exception as e:
+        retry_in = None
+        if job["attempts"] < INGEST_JOB_MAX_ATTEMPTS:
+            retry_in = INGEST_RETRY_BASE_DELAY * 2 ** (job["attempts"] - 1)
+        await asyncio.to_thread(job_queue.fail, job_id, str(e), retry_in)
+        if retry_in is None:
+            print(f"✗ Ingest job {job_id} failed after {job['attempts']} attempts: {e}")
+        else:
+            print(f"✗ Ingest job {job_id} attempt {job['attempts']} failed, retrying in {retry_in:.0f}s: {e}")
+            job_available.set()
+
+
+async def ingest_worker(worker_index: int):
+    """Claim and run queued ingest jobs until cancelled at shutdown"""
+    while True:
+        try:
+            # Cleared before claiming, so an enqueue after an empty claim still wakes this worker
+            job_available.clear()
+            job = await asyncio.to_thread(job_queue.claim)
+            if job is not None:
+                print(f"Worker {worker_index} ingesting job {job['job_id']} ({job['document_id']})")
+                await run_ingest_job(job)
+                continue
+
+            next_due = await asyncio.to_thread(job_queue.next_due_in)
+        except Exception as e:
+            # Queue errors (e.g. "database is locked") must not end the worker; a job
+            # left running is requeued at the next startup
+            print(f"✗ Worker {worker_index} queue error, retrying in {INGEST_POLL_INTERVAL:.0f}s: {e}")
+            await asyncio.sleep(INGEST_POLL_INTERVAL)
+            continue
+
+        timeout = INGEST_POLL_INTERVAL if next_due is None else min(next_due, INGEST_POLL_INTERVAL)
+        try:
+            await asyncio.wait_for(job_available.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def remove_unowned_spool_files():
+    """Delete spooled uploads no queued or running job owns"""
+    owned = job_queue.file_paths()
+    for entry in os.scandir(UPLOAD_SPOOL_DIR):
+        if entry.is_file() and os.path.abspath(entry.path) not in owned:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+async def startup_ingest_workers():
+    """Resume jobs interrupted by the last shutdown and start the ingest workers"""
+    requeued = await asyncio.to_thread(job_queue.requeue_running)
+    pruned = await asyncio.to_thread(job_queue.prune, INGEST_JOB_RETENTION_HOURS * 3600)
+    if requeued or pruned:
+        print(f"✓ Ingest queue: {requeued} interrupted jobs requeued, {pruned} finished jobs pruned")
+
+    # Uploads spooled by requests that never got their job queued
+    await asyncio.to_thread(remove_unowned_spool_files)
+
+    for worker_index in range(INGEST_WORKERS):
+        ingest_worker_tasks.append(asyncio.create_task(ingest_worker(worker_index)))
+    print(f"✓ Started {INGEST_WORKERS} ingest workers ({job_queue.depth()} jobs queued)")
+
+
+async def shutdown_ingest_workers():
+    """Stop the workers; jobs they were running are requeued on the next startup"""
+    for task in ingest_worker_tasks:
+        task.cancel()
+    await asyncio.gather(*ingest_worker_tasks, return_exceptions=True)
+    ingest_worker_tasks.clear()
+
+
+def startup_http_client():
+    """Create the pooled image download client inside the server's event loop"""
+    init_http_client(
+        max_connections=IMAGE_DOWNLOAD_MAX_CONNECTIONS,
+        max_per_host=IMAGE_DOWNLOAD_MAX_PER_HOST,
+        keepalive_expiry=IMAGE_DOWNLOAD_KEEPALIVE,
+        connect_timeout=IMAGE_DOWNLOAD_CONNECT_TIMEOUT,
+        read_timeout=IMAGE_DOWNLOAD_READ_TIMEOUT
+    )
+
+
+async def shutdown_http_client():
+    await close_http_client()
+
+
+def shutdown_embedding_executor():
+    """Let in-flight embedding calls finish before the process exits"""
+    query_batcher.close()
+    ingest_batcher.close()
+    embedding_executor.shutdown(wait=True)
+
+
+def shutdown_bm25_index():
+    """Persist BM25 changes so the next startup can map the index directly"""
+    if bm25_index.pending_changes:
+        persist_bm25_index()
 
 
 # API Routes
@@ -571,8 +1471,13 @@ def root():
         ],
         "endpoints": {
             "/save": "POST - Save text and/or images with embeddings (multipart/form-data)",
+            "/bulk": "POST - Import many documents as NDJSON (one {text, metadata, image_urls} per line)",
             "/query": "POST - Query with natural language, returns GPT-4.1 response + images + sources",
+            "/query/stream": "POST - Same as /query, streamed as NDJSON (sources first, then LLM tokens)",
             "/source/{document_id}": "GET - Get full source document with structured content for readonly view",
+            "/source/{document_id}/versions": "GET - Get the capture history of a source document",
+            "/jobs": "GET - Get ingest queue metrics",
+            "/jobs/{document_id}": "GET - Get the ingest status of a saved document",
             "/images/{document_id}/{filename}": "GET - Serve stored images",
             "/stats": "GET - Get collection statistics",
             "/clear": "DELETE - Clear all embeddings and images"
@@ -582,43 +1487,59 @@ def root():
 
 @app.post("/save")
 async def save_content(
-    background_tasks: BackgroundTasks,
     text: str = Form(default=""),
     metadata: str = Form(default="{}"),
     enable_chunking: bool = Form(default=True),
+    chunking_mode: str = Form(default=DEFAULT_CHUNKING_MODE),  # "text" or "structure"
     image_urls: str = Form(default="[]"),  # JSON array of image URLs
     images: List[UploadFile] = File(default=[])  # Uploaded image files
 ):
     """
-    Save text and images with embeddings to ChromaDB using background tasks.
-    Returns immediately while processing happens asynchronously.
+    Save text and images with embeddings to ChromaDB through the durable ingest queue.
+    Returns immediately while processing happens asynchronously; poll /jobs/{document_id}.
 
     Supports both text chunking and image embeddings in the same vector space.
     Images are processed in parallel for better performance.
 
     Args:
-        background_tasks: FastAPI background tasks
         text: Text content to save
         metadata: JSON string with metadata
         enable_chunking: Whether to chunk large text
+        chunking_mode: "text" chunks the flat text; "structure" chunks clean_html by section
+            and tags each chunk with its heading path
         image_urls: JSON array of image URLs to download and embed
         images: Uploaded image files (multipart/form-data)
 
     Returns:
-        Immediate success response with document_id while processing continues in background
+        Immediate success response with document_id and job_id while processing continues in background
+
+    Raises:
+        HTTPException 429 when the ingest queue is full, 413 when an image exceeds MAX_IMAGE_BYTES,
+        400 for an unknown chunking_mode
     """
     try:
+        if chunking_mode not in CHUNKING_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"chunking_mode must be one of {', '.join(CHUNKING_MODES)}"
+            )
+
+        # Back-pressure: reject before reading the payload when the workers are this far behind
+        queue_depth = await asyncio.to_thread(job_queue.depth)
+        if queue_depth >= INGEST_QUEUE_MAX_DEPTH:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Ingest queue is full ({queue_depth} jobs pending), retry later",
+                headers={"Retry-After": str(int(INGEST_RETRY_BASE_DELAY))}
+            )
+
         # Log received data for debugging
         print(f"\n=== /save endpoint called ===")
         print(f"Text length: {len(text)} chars")
         print(f"Metadata length: {len(metadata)} chars")
         print(f"Image URLs: {image_urls[:200]}..." if len(image_urls) > 200 else f"Image URLs: {image_urls}")
         print(f"Uploaded images: {len(images)}")
-        print(f"Enable chunking: {enable_chunking}")
-
-        # Generate unique document ID
-        doc_id = str(uuid.uuid4())
-        print(f"Generated document ID: {doc_id}")
+        print(f"Enable chunking: {enable_chunking} ({chunking_mode} mode)")
 
         # Parse metadata
         try:
@@ -628,6 +1549,20 @@ async def save_content(
             print(f"✗ Error parsing metadata: {e}")
             metadata_dict = {}
 
+        # A re-capture of a stored page (same canonical URL, or same text when
+        # there is no URL) reuses its document ID and is diffed per chunk
+        existing_doc_id = await asyncio.to_thread(
+            document_store.find_document,
+            canonicalize_url(metadata_dict.get("url", "")),
+            content_hash(text)
+        )
+        if existing_doc_id:
+            doc_id = existing_doc_id
+            print(f"Re-capture of document ID: {doc_id}")
+        else:
+            doc_id = str(uuid.uuid4())
+            print(f"Generated document ID: {doc_id}")
+
         # Parse image URLs
         try:
             image_url_list = json.loads(image_urls)
@@ -636,32 +1571,51 @@ async def save_content(
             print(f"✗ Error parsing image URLs: {e}")
             image_url_list = []
 
-        # Read uploaded images into memory (so background task can access them)
-        uploaded_images = []
-        for uploaded_file in images:
-            file_content = await uploaded_file.read()
-            uploaded_images.append((uploaded_file.filename, file_content))
-
-        print(f"✓ Read {len(uploaded_images)} uploaded images into memory")
-
-        # Add background task
-        background_tasks.add_task(
-            process_content_background,
-            doc_id=doc_id,
-            text=text,
-            metadata_dict=metadata_dict,
-            enable_chunking=enable_chunking,
-            image_url_list=image_url_list,
-            uploaded_images=uploaded_images
-        )
+        # Stream uploaded images to the spool directory; only their paths travel with the job
+        uploaded_images = []  # (filename, spool path, sha256)
+        try:
+            for uploaded_file in images:
+                fd, spool_path = tempfile.mkstemp(
+                    suffix=Path(uploaded_file.filename or "").suffix, dir=UPLOAD_SPOOL_DIR
+                )
+                os.close(fd)
+                spool_path = os.path.abspath(spool_path)
+                file_hash = await spool_upload(uploaded_file, spool_path, MAX_IMAGE_BYTES)
+                uploaded_images.append((uploaded_file.filename, spool_path, file_hash))
+
+            print(f"✓ Spooled {len(uploaded_images)} uploaded images to disk")
 
-        print(f"✓ Background task queued for document {doc_id}")
+            # Persist the job before responding, so it survives a restart
+            job_id, queued_doc_id = await asyncio.to_thread(
+                enqueue_capture, doc_id, text, metadata_dict, enable_chunking, image_url_list, uploaded_images,
+                chunking_mode
+            )
+        except BaseException as e:
+            # The job owns the spooled files only once it is queued
+            for _, spool_path, _ in uploaded_images:
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
+            if isinstance(e, ImageTooLarge):
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Uploaded image {uploaded_file.filename} is larger than {MAX_IMAGE_BYTES} bytes"
+                )
+            raise
+        job_available.set()
+        if queued_doc_id != doc_id:
+            # The first capture of this page is still queued: this one joins its document
+            doc_id, existing_doc_id = queued_doc_id, queued_doc_id
+            print(f"Re-capture of queued document ID: {doc_id}")
+
+        print(f"✓ Ingest job {job_id} queued for document {doc_id}")
 
         # Return immediately with success
         return {
             "status": "success",
             "message": "Content received and queued for processing",
             "document_id": doc_id,
+            "recapture": existing_doc_id is not None,
+            "job_id": job_id,
             "processing_status": "queued",
             "text_length": len(text),
             "image_urls_count": len(image_url_list),
@@ -677,190 +1631,268 @@ async def save_content(
         raise HTTPException(status_code=500, detail=f"Error saving content: {str(e)}")
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query_content(query_input: QueryInput):
+@app.post("/bulk")
+async def bulk_ingest(request: Request):
     """
-    Query for similar content using hybrid search (BM25 + Semantic + RRF fusion).
+    Import many documents in one request, streamed as NDJSON (one JSON object per line):
 
-    Returns a tailored response from GPT-4.1 and relevant images.
+        {"text": "...", "metadata": {"url": "...", "title": "...", ...}, "image_urls": [], "enable_chunking": true,
+         "chunking_mode": "structure"}
 
-    Cross-modal search: Text queries can find relevant images and vice versa!
+    New text documents are chunked and embedded together in batches of
+    BULK_BATCH_DOCUMENTS and written with large collection.add calls before
+    the response is sent. Re-captures of stored pages and documents with
+    image_urls go through the ingest queue like /save (poll /jobs/{document_id});
+    those the queue has no room for (INGEST_QUEUE_MAX_DEPTH) are rejected.
 
-    Natural language time queries work because timestamps are embedded in chunk text.
-    Examples: "notes from yesterday", "this morning's ideas", "last week about AI"
+    Returns:
+        Counts of documents ingested, queued and rejected, chunks written and documents/sec
     """
+    start = time.perf_counter()
+    totals = {"documents": 0, "ingested": 0, "queued": 0, "failed": 0, "chunks": 0}
+    errors = []
+    document_ids = []
+    batch = []
+
+    async def flush():
+        result = await ingest_bulk_batch(batch)
+        for key in ("ingested", "queued", "chunks"):
+            totals[key] += result[key]
+        document_ids.extend(result["document_ids"])
+        totals["failed"] += len(result["rejected"])
+        for line_number, error in result["rejected"]:
+            if len(errors) < BULK_MAX_ERRORS_REPORTED:
+                errors.append({"line": line_number, "error": error})
+        batch.clear()
+
+    def add_line(line_number: int, line: str):
+        if not line.strip():
+            return
+        totals["documents"] += 1
+        try:
+            batch.append({**parse_bulk_record(line), "line": line_number})
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            totals["failed"] += 1
+            if len(errors) < BULK_MAX_ERRORS_REPORTED:
+                errors.append({"line": line_number, "error": str(e)})
+
     try:
-        import math
+        # Parse the body as it arrives; only one batch of records is held at a time
+        buffer = b""
+        line_number = 0
+        async for body_chunk in request.stream():
+            buffer += body_chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                add_line(line_number, line.decode("utf-8", errors="replace"))
+                if len(batch) >= BULK_BATCH_DOCUMENTS:
+                    await flush()
+        if buffer:
+            add_line(line_number + 1, buffer.decode("utf-8", errors="replace"))
+        if batch:
+            await flush()
+
+    except EmbeddingQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Embedding service busy, retry shortly: {str(e)}")
+    except Exception as e:
+        print(f"✗ Error in /bulk after {totals['ingested']} documents: {e}")
+        raise HTTPException(status_code=500, detail=f"Error in bulk ingest: {str(e)}")
 
-        # ===== GET TEXT RESULTS WITH HYBRID SEARCH =====
-        text_chunks = []
+    elapsed = time.perf_counter() - start
+    print(f"✓ /bulk: {totals['ingested']} ingested, {totals['queued']} queued, {totals['failed']} rejected "
+          f"in {elapsed:.1f}s")
+    return {
+        "status": "success",
+        **totals,
+        "errors": errors,
+        "document_ids": document_ids,
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round((totals["ingested"] + totals["queued"]) / elapsed, 1) if elapsed else 0.0,
+    }
 
-        if query_input.use_bm25_fusion and bm25_index:
-            # HYBRID SEARCH: BM25 + Semantic + RRF Fusion
 
-            # 1. Semantic search
-            semantic_results_raw = collection.query(
-                query_texts=[query_input.query],
-                n_results=query_input.top_k * 3,  # Get more candidates
-                where={"type": "text"}
-            )
+async def retrieve_context(query_input: QueryInput, store: StoreRoundTrips) -> tuple:
+    """
+    Run hybrid retrieval for a query (BM25 + Semantic + RRF fusion + temporal decay).
+
+    Args:
+        query_input: Query parameters
+        store: Round-trip counter used for every ChromaDB read
+
+    Returns:
+        (text_chunks for the LLM context, image URLs, SourceDocument list)
+    """
+    # Embed the query once and reuse it for every collection lookup
+    query_embedding = await embed_query(query_input.query)
+
+    # ===== GET TEXT RESULTS WITH HYBRID SEARCH =====
+    text_chunks = []
+    source_ids = []
+    chunk_records = {}  # chunk id -> (document, metadata), shared by decay, ranking and sources
+    relevance_scores = {}  # chunk id -> score shown on the source card
+    use_hybrid = query_input.use_bm25_fusion and len(bm25_index) > 0
+
+    if use_hybrid:
+        # HYBRID SEARCH: BM25 + Semantic + RRF Fusion
+
+        # 1. Semantic search
+        semantic_results_raw = await store.query(
+            query_embeddings=[query_embedding],
+            n_results=query_input.top_k * query_input.candidate_pool_multiplier,  # Get more candidates
+            where={"type": "text"},
+            include=["distances"]
+        )
+
+        semantic_ids = semantic_results_raw['ids'][0] if semantic_results_raw['ids'] else []
 
-            # Convert to (id, score) tuples for RRF
-            semantic_results = []
-            if semantic_results_raw['ids'] and len(semantic_results_raw['ids'][0]) > 0:
-                for i in range(len(semantic_results_raw['ids'][0])):
-                    doc_id = semantic_results_raw['ids'][0][i]
-                    distance = semantic_results_raw['distances'][0][i]
-                    similarity = 1 - distance
-                    semantic_results.append((doc_id, similarity))
-
-            # 2. BM25 search
-            query_tokens = query_input.query.lower().split()
-            bm25_scores = bm25_index.get_scores(query_tokens)
-
-            # Get top BM25 results
-            bm25_results = []
-            top_bm25_indices = sorted(range(len(bm25_scores)), key=lambda i: bm25_scores[i], reverse=True)
-            for idx in top_bm25_indices[:query_input.top_k * 3]:
-                bm25_results.append((bm25_ids[idx], bm25_scores[idx]))
-
-            # 3. RRF Fusion
-            fused_results = reciprocal_rank_fusion(semantic_results, bm25_results)
-
-            # Apply temporal decay to fused results
-            if query_input.enable_temporal_decay:
-                reranked_results = []
-                for doc_id, rrf_score in fused_results[:query_input.top_k * 2]:
-                    # Get metadata from ChromaDB
-                    doc_data = collection.get(ids=[doc_id])
-                    if doc_data['metadatas'] and len(doc_data['metadatas']) > 0:
-                        metadata = doc_data['metadatas'][0]
-                        timestamp_unix = metadata.get('timestamp_unix', time.time())
-                        age_hours = (time.time() - timestamp_unix) / 3600
-
-                        # Temporal decay
-                        decay_factor = math.exp(-age_hours / 24)
-                        final_score = 0.7 * rrf_score + 0.3 * decay_factor
-
-                        reranked_results.append((doc_id, final_score))
-
-                reranked_results.sort(key=lambda x: x[1], reverse=True)
-                fused_results = reranked_results
-
-            # Get top K document IDs
-            top_doc_ids = [doc_id for doc_id, _ in fused_results[:query_input.top_k]]
-
-            # Fetch full documents
-            if top_doc_ids:
-                top_docs_data = collection.get(ids=top_doc_ids)
-                text_chunks = top_docs_data['documents'] if top_docs_data['documents'] else []
+        # 2. BM25 search
+        query_tokens = tokenize(query_input.query)
+
+        # Get top BM25 results (only query-term postings are scored, heap selection)
+        bm25_results = bm25_index.search(query_tokens, query_input.top_k * query_input.candidate_pool_multiplier)
+        bm25_ids = [doc_id for doc_id, _ in bm25_results]
+
+        # 3. RRF Fusion (vectorized over the candidate pool)
+        fused_ids, fused_scores = fuse_rankings(
+            [semantic_ids, bm25_ids],
+            [query_input.semantic_weight, query_input.bm25_weight],
+            k=query_input.rrf_k
+        )
 
+        # Fetch documents and metadata for every candidate in one round trip
+        if query_input.enable_temporal_decay:
+            candidate_count = query_input.top_k * query_input.rerank_pool_multiplier
         else:
-            # SEMANTIC SEARCH ONLY (fallback)
-            text_results_raw = collection.query(
-                query_texts=[query_input.query],
-                n_results=query_input.top_k,
-                where={"type": "text"}
+            candidate_count = query_input.top_k
+        fused_results = top_n(fused_ids, fused_scores, candidate_count)
+        candidate_ids = [doc_id for doc_id, _ in fused_results]
+        if candidate_ids:
+            candidates_data = await store.get(ids=candidate_ids, include=["documents", "metadatas"])
+            for chunk_id, document, metadata in zip(
+                candidates_data['ids'], candidates_data['documents'], candidates_data['metadatas']
+            ):
+                chunk_records[chunk_id] = (document, metadata)
+
+        # Apply temporal decay to fused results
+        if query_input.enable_temporal_decay:
+            now = time.time()
+            pool = [(doc_id, score) for doc_id, score in fused_results if doc_id in chunk_records]
+            pool_ids = np.array([doc_id for doc_id, _ in pool], dtype=object)
+            pool_scores = np.array([score for _, score in pool], dtype=np.float64)
+            timestamps = np.array(
+                [(chunk_records[doc_id][1] or {}).get('timestamp_unix', now) for doc_id, _ in pool],
+                dtype=np.float64
             )
 
-            if text_results_raw['documents'] and len(text_results_raw['documents'][0]) > 0:
-                text_chunks = text_results_raw['documents'][0]
+            decayed_scores = apply_temporal_decay(
+                pool_scores,
+                timestamps,
+                now,
+                half_life_hours=query_input.decay_half_life_hours,
+                decay_weight=query_input.decay_weight
+            )
+            fused_results = top_n(pool_ids, decayed_scores, len(pool))
+
+        # Get top K document IDs
+        top_doc_ids = [doc_id for doc_id, _ in fused_results[:query_input.top_k] if doc_id in chunk_records]
+        text_chunks = [chunk_records[doc_id][0] for doc_id in top_doc_ids]
+        source_ids = top_doc_ids
+        relevance_scores = {doc_id: float(score) for doc_id, score in fused_results[:query_input.top_k]}
+
+    else:
+        # SEMANTIC SEARCH ONLY (fallback)
+        text_results_raw = await store.query(
+            query_embeddings=[query_embedding],
+            n_results=query_input.top_k,
+            where={"type": "text"}
+        )
+
+        if text_results_raw['documents'] and len(text_results_raw['documents'][0]) > 0:
+            text_chunks = text_results_raw['documents'][0]
+            source_ids = text_results_raw['ids'][0]
+            for i, chunk_id in enumerate(source_ids):
+                chunk_records[chunk_id] = (text_chunks[i], text_results_raw['metadatas'][0][i])
+                relevance_scores[chunk_id] = 1 - text_results_raw['distances'][0][i]
+
+    # ===== GET IMAGE RESULTS =====
+    image_urls = []
+    if query_input.include_images:
+        image_results_raw = await store.query(
+            query_embeddings=[query_embedding],
+            n_results=query_input.top_k_images,
+            where={"type": "image"},
+            include=["metadatas"]
+        )
+
+        if image_results_raw['ids'] and len(image_results_raw['ids'][0]) > 0:
+            for i in range(len(image_results_raw['ids'][0])):
+                metadata = image_results_raw['metadatas'][0][i]
+                image_url = stored_image_url(metadata)
+                if image_url:
+                    image_urls.append(image_url)
+
+    # ===== BUILD SOURCE ATTRIBUTION =====
+    sources = []
+    seen_documents = set()  # Track unique documents
+
+    # Page content is only read (and decompressed) when the caller asks for full sources
+    include_page_fields = query_input.source_fields == "full"
+    page_fields_by_document = {}
+    if include_page_fields:
+        # Page-level fields for all source documents in one lookup
+        source_document_ids = [
+            (chunk_records[chunk_id][1] or {}).get('document_id') for chunk_id in source_ids
+        ]
+        page_fields_by_document = await asyncio.to_thread(
+            document_store.get_many, [doc_id for doc_id in source_document_ids if doc_id]
+        )
 
-        # ===== GET IMAGE RESULTS =====
-        image_urls = []
-        if query_input.include_images:
-            image_results_raw = collection.query(
-                query_texts=[query_input.query],
-                n_results=query_input.top_k_images,
-                where={"type": "image"}
+    # Get source documents from text results (metadata already fetched above)
+    for chunk_id in source_ids:
+        snippet_text, raw_metadata = chunk_records[chunk_id]
+        # JSON fields are decoded only when a source actually reads them
+        chunk_metadata = LazyMetadata(raw_metadata)
+        doc_id = chunk_metadata.get('document_id')
+
+        # Only include each document once
+        if doc_id and doc_id not in seen_documents:
+            seen_documents.add(doc_id)
+            # Chunks saved before the document store existed still carry the page fields
+            metadata = ChainMap(page_fields_by_document.get(doc_id, {}), chunk_metadata)
+
+            # Get snippet (first chunk of the document)
+            snippet_text = snippet_text or ""
+            snippet = snippet_text[:200] + ("..." if len(snippet_text) > 200 else "")
+
+            # Build source document
+            source = SourceDocument(
+                document_id=doc_id,
+                url=metadata.get('url'),
+                title=metadata.get('title'),
+                domain=metadata.get('domain'),
+                favicon=metadata.get('favicon'),
+                timestamp=metadata.get('timestamp_readable'),
+                snippet=snippet,
+                relevance_score=relevance_scores.get(chunk_id, 0.0),
+                structured_content=metadata.get('structured_content') if include_page_fields else None,
+                youtube_videos=metadata.get('youtube_videos') if include_page_fields else None,
+                clean_html=metadata.get('clean_html') if include_page_fields else None
             )
+            sources.append(source)
 
-            if image_results_raw['ids'] and len(image_results_raw['ids'][0]) > 0:
-                for i in range(len(image_results_raw['ids'][0])):
-                    metadata = image_results_raw['metadatas'][0][i]
-                    doc_id = metadata.get('document_id', '')
-                    filename = metadata.get('filename', '')
-                    if doc_id and filename:
-                        image_urls.append(f"/images/{doc_id}/{filename}")
-
-        # ===== BUILD SOURCE ATTRIBUTION =====
-        sources = []
-        seen_documents = set()  # Track unique documents
-
-        # Get source documents from text results
-        if text_chunks:
-            # Get full data for text chunks to access metadata
-            if query_input.use_bm25_fusion and bm25_index:
-                # For hybrid search, we already have top_doc_ids
-                source_ids = top_doc_ids[:query_input.top_k]
-            else:
-                # For semantic-only search
-                if text_results_raw['ids'] and len(text_results_raw['ids'][0]) > 0:
-                    source_ids = text_results_raw['ids'][0]
-                else:
-                    source_ids = []
-
-            # Fetch metadata for each source chunk
-            for chunk_id in source_ids:
-                chunk_data = collection.get(ids=[chunk_id])
-                if chunk_data['metadatas'] and len(chunk_data['metadatas']) > 0:
-                    raw_metadata = chunk_data['metadatas'][0]
-                    # Deserialize JSON strings back to dicts/lists
-                    metadata = deserialize_metadata(raw_metadata)
-                    doc_id = metadata.get('document_id')
-
-                    # Only include each document once
-                    if doc_id and doc_id not in seen_documents:
-                        seen_documents.add(doc_id)
-
-                        # Get snippet (first chunk of the document)
-                        snippet_text = chunk_data['documents'][0] if chunk_data['documents'] else ""
-                        snippet = snippet_text[:200] + ("..." if len(snippet_text) > 200 else "")
-
-                        # Calculate relevance score (from distance/similarity)
-                        relevance_score = 0.0
-                        if query_input.use_bm25_fusion and fused_results:
-                            # Find this doc in fused results
-                            for fused_id, score in fused_results:
-                                if chunk_id == fused_id:
-                                    relevance_score = float(score)
-                                    break
-                        elif text_results_raw.get('distances'):
-                            # Use semantic similarity
-                            try:
-                                idx = source_ids.index(chunk_id)
-                                distance = text_results_raw['distances'][0][idx]
-                                relevance_score = 1 - distance
-                            except (IndexError, ValueError):
-                                relevance_score = 0.5
-
-                        # Build source document
-                        source = SourceDocument(
-                            document_id=doc_id,
-                            url=metadata.get('url'),
-                            title=metadata.get('title'),
-                            domain=metadata.get('domain'),
-                            favicon=metadata.get('favicon'),
-                            timestamp=metadata.get('timestamp_readable'),
-                            snippet=snippet,
-                            relevance_score=relevance_score,
-                            structured_content=metadata.get('structured_content'),
-                            youtube_videos=metadata.get('youtube_videos'),
-                            clean_html=metadata.get('clean_html')
-                        )
-                        sources.append(source)
+    return text_chunks, image_urls, sources
 
-        # ===== GENERATE OPENAI RESPONSE =====
-        openai_response = ""
 
-        if openai_client and text_chunks:
-            # Prepare context from top K chunks
-            context = "\n\n".join([f"Chunk {i+1}:\n{chunk}" for i, chunk in enumerate(text_chunks)])
+def build_prompt(query: str, text_chunks: List[str]) -> str:
+    """Create the OpenAI prompt from the top K chunks"""
+    # Prepare context from top K chunks
+    context = "\n\n".join([f"Chunk {i+1}:\n{chunk}" for i, chunk in enumerate(text_chunks)])
 
-            # Create prompt for OpenAI
-            prompt = f"""Based on the following context chunks from the user's saved notes, provide a clear, concise, and helpful response to their query.
+    return f"""Based on the following context chunks from the user's saved notes, provide a clear, concise, and helpful response to their query.
 
-Query: {query_input.query}
+Query: {query}
 
 Context:
 {context}
@@ -873,23 +1905,76 @@ Instructions:
 
 Response:"""
 
-            try:
-                completion = openai_client.chat.completions.create(
-                    model=openai_model,
-                    max_tokens=1024,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                openai_response = completion.choices[0].message.content
-            except Exception as e:
-                print(f"OpenAI API error: {e}")
-                openai_response = "I found relevant information but couldn't generate a response. Please check the results."
 
-        elif not openai_client:
-            openai_response = "OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file."
-        else:
-            openai_response = "No relevant text chunks found for your query."
+async def generate_response(query: str, text_chunks: List[str]) -> str:
+    """Generate the full OpenAI response for a query"""
+    if not openai_client:
+        return OPENAI_NOT_CONFIGURED_MESSAGE
+    if not text_chunks:
+        return NO_RESULTS_MESSAGE
+
+    try:
+        completion = await openai_client.chat.completions.create(
+            model=openai_model,
+            max_tokens=1024,
+            messages=[
+                {"role": "user", "content": build_prompt(query, text_chunks)}
+            ]
+        )
+        return completion.choices[0].message.content
+    except Exception as e:
+        print(f"OpenAI API error: {e}")
+        return OPENAI_ERROR_MESSAGE
+
+
+async def stream_response(query: str, text_chunks: List[str]):
+    """Yield OpenAI response tokens as they arrive"""
+    if not openai_client:
+        yield OPENAI_NOT_CONFIGURED_MESSAGE
+        return
+    if not text_chunks:
+        yield NO_RESULTS_MESSAGE
+        return
+
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=openai_model,
+            max_tokens=1024,
+            messages=[
+                {"role": "user", "content": build_prompt(query, text_chunks)}
+            ],
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"OpenAI API error: {e}")
+        yield OPENAI_ERROR_MESSAGE
+
+
+@app.post("/query", response_model=QueryResponse)
+async def query_content(query_input: QueryInput, response: Response):
+    """
+    Query for similar content using hybrid search (BM25 + Semantic + RRF fusion).
+
+    Returns a tailored response from GPT-4.1 and relevant images.
+
+    Cross-modal search: Text queries can find relevant images and vice versa!
+
+    Natural language time queries work because timestamps are embedded in chunk text.
+    Examples: "notes from yesterday", "this morning's ideas", "last week about AI"
+    """
+    try:
+        store = StoreRoundTrips()
+        text_chunks, image_urls, sources = await retrieve_context(query_input, store)
+
+        # Instrumentation: ChromaDB round trips used by this query
+        response.headers["X-Store-Round-Trips"] = str(store.count)
+        print(f"/query used {store.count} store round trips")
+
+        # ===== GENERATE OPENAI RESPONSE =====
+        openai_response = await generate_response(query_input.query, text_chunks)
 
         return QueryResponse(
             response=openai_response,
@@ -897,9 +1982,52 @@ Response:"""
             sources=sources
         )
 
+    except EmbeddingQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Embedding service busy, retry shortly: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying content: {str(e)}")
+
+
+@app.post("/query/stream")
+async def query_content_stream(query_input: QueryInput):
+    """
+    Streaming variant of /query, returned as NDJSON (one JSON object per line).
+
+    Sources and image URLs are sent as soon as retrieval finishes, then the
+    LLM response streams token by token:
+
+        {"type": "sources", "images": [...], "sources": [...]}
+        {"type": "token", "content": "..."}
+        {"type": "done"}
+    """
+    try:
+        store = StoreRoundTrips()
+        text_chunks, image_urls, sources = await retrieve_context(query_input, store)
+        print(f"/query/stream used {store.count} store round trips")
+    except EmbeddingQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Embedding service busy, retry shortly: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying content: {str(e)}")
 
+    def ndjson(event: Dict) -> str:
+        return json.dumps(jsonable_encoder(event)) + "\n"
+
+    async def events():
+        yield ndjson({"type": "sources", "images": image_urls, "sources": sources})
+        async for token in stream_response(query_input.query, text_chunks):
+            yield ndjson({"type": "token", "content": token})
+        yield ndjson({"type": "done"})
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={
+            "X-Store-Round-Trips": str(store.count),
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 
 @app.get("/source/{document_id}")
 async def get_source(document_id: str):
@@ -921,8 +2049,10 @@ async def get_source(document_id: str):
 
         # Get metadata from first chunk (contains full document metadata)
         raw_metadata = results['metadatas'][0]
-        # Deserialize JSON strings back to dicts/lists
-        metadata = deserialize_metadata(raw_metadata)
+        # Page-level fields live in the document store (legacy chunks carry them inline);
+        # clean_html and structured_content are decompressed from the blob store here
+        page_fields = await asyncio.to_thread(document_store.get, document_id) or {}
+        metadata = ChainMap(page_fields, LazyMetadata(raw_metadata))
 
         # Get all images for this document
         image_results = collection.get(where={
@@ -935,11 +2065,10 @@ async def get_source(document_id: str):
         images = []
         if image_results['metadatas']:
             for img_meta in image_results['metadatas']:
-                doc_id = img_meta.get('document_id', '')
-                filename = img_meta.get('filename', '')
-                if doc_id and filename:
+                image_url = stored_image_url(img_meta)
+                if image_url:
                     images.append({
-                        "url": f"/images/{doc_id}/{filename}",
+                        "url": image_url,
                         "alt": img_meta.get('alt_text', ''),
                         "width": img_meta.get('width'),
                         "height": img_meta.get('height')
@@ -981,6 +2110,55 @@ async def get_source(document_id: str):
         raise HTTPException(status_code=500, detail=f"Error retrieving source: {str(e)}")
 
 
+@app.get("/jobs")
+async def get_job_queue():
+    """
+    Get ingest queue metrics
+
+    Returns:
+        Job counts per state, queue depth, age of the oldest queued job and worker count
+    """
+    metrics = await asyncio.to_thread(job_queue.metrics)
+    return {**metrics, "workers": len(ingest_worker_tasks), "max_depth": INGEST_QUEUE_MAX_DEPTH}
+
+
+@app.get("/jobs/{document_id}")
+async def get_document_jobs(document_id: str):
+    """
+    Get the ingest status of a document
+
+    Args:
+        document_id: Document identifier returned by /save
+
+    Returns:
+        Status of the latest job plus all recent jobs of the document (one per capture)
+    """
+    jobs = await asyncio.to_thread(job_queue.jobs_for_document, document_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No ingest jobs found for this document")
+
+    return {"document_id": document_id, "processing_status": jobs[0]["status"], "jobs": jobs}
+
+
+@app.get("/source/{document_id}/versions")
+async def get_source_versions(document_id: str, limit: int = 100):
+    """
+    Get the capture history of a source document
+
+    Args:
+        document_id: Document identifier
+        limit: Maximum number of versions to return
+
+    Returns:
+        Versions newest first, with per-capture chunk diff counts
+    """
+    versions = await asyncio.to_thread(document_store.versions, document_id, limit)
+    if not versions:
+        raise HTTPException(status_code=404, detail="No versions recorded for this document")
+
+    return {"document_id": document_id, "versions": versions}
+
+
 @app.get("/images/{document_id}/{filename}")
 async def serve_image(document_id: str, filename: str):
     """
@@ -1009,47 +2187,46 @@ async def serve_image(document_id: str, filename: str):
 def get_stats():
     """Get statistics about stored embeddings, chunks, and images"""
 
-    # Get all data to calculate stats
-    all_data = collection.get()
-
-    document_ids = set()
-    chunked_docs = 0
-    total_chunks = 0
-    total_images = 0
-    total_text_entries = 0
-
-    if all_data['metadatas']:
-        for metadata in all_data['metadatas']:
-            if 'document_id' in metadata:
-                document_ids.add(metadata['document_id'])
-
-            entry_type = metadata.get('type', 'text')
-
-            if entry_type == 'image':
-                total_images += 1
-            else:
-                total_text_entries += 1
-                if metadata.get('is_chunked', False):
-                    total_chunks += 1
-                    if metadata.get('chunk_index', 0) == 0:
-                        chunked_docs += 1
+    # Counters are maintained on write, so this never scans the collection
+    totals = stats_ledger.totals()
 
     return {
-        "total_entries": collection.count(),
-        "total_text_entries": total_text_entries,
-        "total_images": total_images,
-        "unique_documents": len(document_ids),
-        "chunked_documents": chunked_docs,
-        "total_chunks": total_chunks,
+        "total_entries": totals["total_entries"],
+        "total_text_entries": totals["total_text_entries"],
+        "total_images": totals["total_images"],
+        "unique_documents": totals["unique_documents"],
+        "chunked_documents": totals["chunked_documents"],
+        "total_chunks": totals["total_chunks"],
+        "bytes_stored": {
+            "text": totals["text_bytes"],
+            "images": totals["image_bytes"]
+        },
+        "documents_by_domain": stats_ledger.documents_by_domain(),
         "storage_backend": "ChromaDB",
         "persist_directory": CHROMA_PERSIST_DIR,
         "collection_name": COLLECTION_NAME,
         "embedding_model": "google/siglip-so400m-patch14-384",
         "embedding_dimension": EMBEDDING_DIM,
         "chunking_config": {
-            "chunk_size": CHUNK_SIZE,
-            "overlap": CHUNK_OVERLAP,
-            "min_chunk_size": MIN_CHUNK_SIZE
+            "max_tokens": CHUNK_MAX_TOKENS,
+            "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+            "default_mode": DEFAULT_CHUNKING_MODE
+        },
+        "embedding_executor": {
+            "workers": embedding_executor.max_workers,
+            "max_queue": embedding_executor.max_queue,
+            "in_flight": embedding_executor.in_flight
+        },
+        "query_embedding_cache": {
+            "size": len(query_embedding_cache),
+            "max_size": query_embedding_cache.max_size,
+            "hits": query_embedding_cache.hits,
+            "misses": query_embedding_cache.misses
+        },
+        "ingest_queue": {
+            **job_queue.metrics(),
+            "workers": len(ingest_worker_tasks),
+            "max_depth": INGEST_QUEUE_MAX_DEPTH
         }
     }
 
@@ -1067,9 +2244,24 @@ def clear_store():
             embedding_function=SigLIPEmbeddingFunction(),
             metadata={"hnsw:space": "cosine"}
         )
-
-        # Clear BM25 index
-        rebuild_bm25_index()
+        write_text_input_format(TEXT_INPUT_FORMAT_PATH)
+
+        # Drop captures still waiting in the ingest queue, with their spooled uploads
+        # (jobs already running finish against the new collection)
+        job_queue.purge_queued()
+        job_queue.clear_documents()
+        remove_unowned_spool_files()
+
+        # Clear page-level fields, stats counters and the image index
+        document_store.clear()
+        stats_ledger.clear()
+        image_index.clear()
+
+        # Clear BM25 index and its persisted copy
+        with index_write_lock:
+            bm25_index.clear()
+            if os.path.exists(BM25_INDEX_PATH):
+                os.remove(BM25_INDEX_PATH)
 
         # Clear all stored images
         import shutil
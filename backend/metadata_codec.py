@@ -0,0 +1,125 @@
+"""
+Schema-aware metadata codec for ChromaDB
+ChromaDB metadata only holds scalars, so dicts and lists are stored as JSON
+strings. The codec records which fields it encoded in a marker field at
+write time, and LazyMetadata decodes only those fields, only when read
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional
+
+
+# Marker field listing the JSON-encoded keys of a metadata dict
+JSON_FIELDS_KEY = "_json_fields"
+JSON_FIELDS_SEPARATOR = ","
+
+
+def encode_metadata(metadata: Dict) -> Dict:
+    """
+    Convert a metadata dict to ChromaDB-compatible scalars.
+
+    Dicts and lists become JSON strings and their keys are recorded in
+    JSON_FIELDS_KEY; other non-scalar values are stored as str().
+
+    Args:
+        metadata: Metadata with arbitrary JSON-compatible values
+
+    Returns:
+        Metadata with scalar values only
+    """
+    encoded = {}
+    json_fields = []
+    for key, value in metadata.items():
+        if key == JSON_FIELDS_KEY:
+            continue
+        if isinstance(value, (dict, list)):
+            encoded[key] = json.dumps(value)
+            json_fields.append(key)
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            encoded[key] = value
+        else:
+            encoded[key] = str(value)
+
+    # Always written, so an empty marker distinguishes new rows from legacy ones
+    encoded[JSON_FIELDS_KEY] = JSON_FIELDS_SEPARATOR.join(json_fields)
+    return encoded
+
+
+def _json_fields(raw: Dict) -> Optional[frozenset]:
+    """JSON-encoded keys of a stored metadata dict, or None for legacy rows without a marker"""
+    marker = raw.get(JSON_FIELDS_KEY)
+    if marker is None:
+        return None
+    return frozenset(key for key in marker.split(JSON_FIELDS_SEPARATOR) if key)
+
+
+def _decode_legacy(value):
+    """
+    Rows written before the marker existed: only values that look like a
+    JSON object or array are worth trying (titles, URLs, paths are skipped)
+    """
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+class LazyMetadata(Mapping):
+    """Read-only view of stored metadata that decodes JSON fields on first access"""
+
+    __slots__ = ("_raw", "_json_fields", "_decoded")
+
+    def __init__(self, raw: Optional[Dict]):
+        self._raw = raw or {}
+        self._json_fields = _json_fields(self._raw)
+        self._decoded = {}
+
+    def __getitem__(self, key):
+        if key == JSON_FIELDS_KEY:
+            raise KeyError(key)
+        if key in self._decoded:
+            return self._decoded[key]
+
+        value = self._raw[key]
+        if self._json_fields is None:
+            value = _decode_legacy(value)
+        elif key in self._json_fields:
+            value = json.loads(value)
+        self._decoded[key] = value
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key != JSON_FIELDS_KEY and key in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._raw if key != JSON_FIELDS_KEY)
+
+    def __len__(self) -> int:
+        return len(self._raw) - (JSON_FIELDS_KEY in self._raw)
+
+    def to_dict(self, fields: Iterable[str] = None) -> Dict:
+        """
+        Decode into a plain dict.
+
+        Args:
+            fields: Only include these keys (all keys when None)
+        """
+        keys = self if fields is None else (key for key in fields if key in self)
+        return {key: self[key] for key in keys}
+
+
+def decode_metadata(raw: Optional[Dict], fields: Iterable[str] = None) -> Dict:
+    """
+    Eagerly decode stored metadata into a plain dict.
+
+    Args:
+        raw: Metadata as returned by ChromaDB
+        fields: Only decode these keys (all keys when None)
+
+    Returns:
+        Metadata with JSON fields decoded
+    """
+    return LazyMetadata(raw).to_dict(fields)
@@ -0,0 +1,204 @@
+"""
+Migrate page-level fields out of ChromaDB chunk/image metadata
+Moves clean_html, structured_content and youtube_videos from every entry's
+metadata into the document store (one row per document_id), moves any
+clean_html / structured_content still inline in document store rows into
+the blob store, and reports the on-disk size of the ChromaDB directory
+before and after
+
+Entries are rewritten in place (same ids and embeddings), one batch per
+metadata update, after their page fields are in the document store, so an
+interrupted run loses nothing and can simply be run again.
+
+With --reembed-text, every text entry is also re-embedded from its stored
+document with the current text input format (texts padded to the model's
+max length). Collections built before that change must be re-embedded once;
+the server refuses to start until they are.
+
+Stop the FastAPI server before running this script.
+
+Usage:
+    python migrate_document_store.py [--batch-size 200] [--vacuum] [--reembed-text]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+import chromadb
+
+from blob_store import BlobStore
+from document_store import BLOB_FIELDS, DocumentStore, PAGE_LEVEL_FIELDS
+
+# Configuration (matches main.py)
+CHROMA_PERSIST_DIR = "./chroma_db"
+COLLECTION_NAME = "text_embeddings"
+DOCUMENT_STORE_PATH = os.path.join(CHROMA_PERSIST_DIR, "documents.sqlite3")
+BLOB_STORE_DIR = os.path.join(CHROMA_PERSIST_DIR, "blobs")
+TEXT_INPUT_FORMAT_PATH = os.path.join(CHROMA_PERSIST_DIR, "text_input_format")
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of all files under path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def format_size(num_bytes: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def decode_page_field(key: str, value):
+    """Page fields were JSON-encoded in ChromaDB metadata (except raw HTML)"""
+    if key != "clean_html" and isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, ValueError):
+            return value
+    return value
+
+
+def reembed_text(collection, all_ids: list, batch_size: int) -> int:
+    """
+    Re-embed text entries from their stored documents (the exact text that was
+    embedded, capture stamp included) and record the text input format.
+
+    Embeddings are replaced in place, so an interrupted run can be run again;
+    the format is only recorded once every batch is done.
+
+    Returns:
+        Number of entries re-embedded
+    """
+    # Loads the model, so only imported for this step
+    from siglip_embeddings import get_siglip_embeddings, write_text_input_format
+
+    siglip = get_siglip_embeddings()
+    reembedded = 0
+    for offset in range(0, len(all_ids), batch_size):
+        batch = collection.get(ids=all_ids[offset:offset + batch_size], include=["documents", "metadatas"])
+        text_ids, texts = [], []
+        for entry_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            if (metadata or {}).get("type", "text") == "text" and document:
+                text_ids.append(entry_id)
+                texts.append(document)
+        if text_ids:
+            collection.update(ids=text_ids, embeddings=siglip.embed_texts(texts))
+            reembedded += len(text_ids)
+        print(f"  re-embedded {reembedded} text entries ({min(offset + batch_size, len(all_ids))}/{len(all_ids)})")
+
+    write_text_input_format(TEXT_INPUT_FORMAT_PATH)
+    return reembedded
+
+
+def migrate(batch_size: int, vacuum: bool, reembed: bool = False):
+    print("=" * 80)
+    print("Document store migration")
+    print("=" * 80)
+
+    size_before = directory_size(CHROMA_PERSIST_DIR)
+    print(f"ChromaDB directory before: {format_size(size_before)}")
+
+    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+    collection = client.get_collection(name=COLLECTION_NAME)
+    blob_store = BlobStore(BLOB_STORE_DIR)
+    document_store = DocumentStore(DOCUMENT_STORE_PATH, blob_store=blob_store)
+
+    # Snapshot ids first, so the batches do not depend on the collection's get order
+    all_ids = collection.get(include=[])["ids"]
+    total = len(all_ids)
+    migrated_entries = 0
+    migrated_documents = set()
+    offset = 0
+
+    while offset < total:
+        batch = collection.get(ids=all_ids[offset:offset + batch_size], include=["metadatas"])
+        if not batch["ids"]:
+            break
+
+        rewrite_ids, rewrite_metadatas = [], []
+
+        for i, entry_id in enumerate(batch["ids"]):
+            metadata = batch["metadatas"][i] or {}
+            if not any(key in metadata for key in PAGE_LEVEL_FIELDS):
+                continue
+
+            document_id = metadata.get("document_id")
+            if document_id and document_id not in migrated_documents:
+                page_fields = {
+                    key: decode_page_field(key, metadata[key])
+                    for key in PAGE_LEVEL_FIELDS if key in metadata
+                }
+                # Keep any fields already written by the server
+                existing = document_store.get(document_id) or {}
+                document_store.put(document_id, {**page_fields, **existing})
+                migrated_documents.add(document_id)
+
+            rewrite_ids.append(entry_id)
+            # Metadata updates merge keys; a None value removes the key
+            rewrite_metadatas.append({key: None for key in PAGE_LEVEL_FIELDS if key in metadata})
+
+        if rewrite_ids:
+            # A single update per batch, after the page fields are safely in the
+            # document store: a crash leaves every entry either untouched or migrated
+            collection.update(ids=rewrite_ids, metadatas=rewrite_metadatas)
+            migrated_entries += len(rewrite_ids)
+
+        offset += batch_size
+        print(f"  processed {min(offset, total)}/{total} entries, rewrote {migrated_entries}")
+
+    reembedded = reembed_text(collection, all_ids, batch_size) if reembed else None
+
+    # Rows written before the blob store existed keep the large fields inline;
+    # put() moves them to the blob store
+    moved_to_blobs = 0
+    for document_id in document_store.document_ids():
+        inline_fields = document_store.get(document_id, load_blobs=False) or {}
+        if any(inline_fields.get(key) for key in BLOB_FIELDS):
+            document_store.put(document_id, document_store.get(document_id))
+            moved_to_blobs += 1
+
+    document_store.close()
+    del collection, client
+
+    if vacuum:
+        # SQLite keeps freed pages until the database is vacuumed
+        print("Vacuuming chroma.sqlite3...")
+        conn = sqlite3.connect(os.path.join(CHROMA_PERSIST_DIR, "chroma.sqlite3"))
+        conn.execute("VACUUM")
+        conn.close()
+
+    size_after = directory_size(CHROMA_PERSIST_DIR)
+
+    print("\n" + "=" * 80)
+    print(f"Entries rewritten: {migrated_entries}")
+    if reembedded is not None:
+        print(f"Text entries re-embedded: {reembedded}")
+    print(f"Documents moved to document store: {len(migrated_documents)}")
+    print(f"Documents moved to blob store: {moved_to_blobs} ({blob_store.codec}, "
+          f"{format_size(blob_store.disk_usage())} on disk)")
+    print(f"ChromaDB directory before: {format_size(size_before)}")
+    print(f"ChromaDB directory after:  {format_size(size_after)}")
+    if not vacuum:
+        print("(run with --vacuum to return freed SQLite pages to the filesystem)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move page-level fields into the document store")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM chroma.sqlite3 afterwards")
+    parser.add_argument("--reembed-text", action="store_true",
+                        help="Re-embed text entries with the current text input format")
+    args = parser.parse_args()
+
+    migrate(args.batch_size, args.vacuum, args.reembed_text)
@@ -0,0 +1,101 @@
+"""
+Vectorized ranking utilities for hybrid search
+Reciprocal Rank Fusion and temporal decay computed with NumPy over
+candidate arrays, so large candidate pools stay cheap to score
+"""
+
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_RRF_K = 60
+# Equivalent to the original exp(-age_hours / 24) decay
+DEFAULT_DECAY_HALF_LIFE_HOURS = 24 * math.log(2)
+DEFAULT_DECAY_WEIGHT = 0.3
+
+
+def fuse_rankings(
+    rankings: Sequence[Sequence[str]],
+    weights: Sequence[float] = None,
+    k: int = DEFAULT_RRF_K
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine ranked id lists with weighted Reciprocal Rank Fusion (RRF).
+
+    score(id) = sum over rankings of weight / (k + rank + 1)
+
+    Args:
+        rankings: Ranked lists of ids, best first (e.g. semantic and BM25 results)
+        weights: Weight per ranking (defaults to 1.0 each)
+        k: RRF constant
+
+    Returns:
+        (ids, scores) arrays over the union of all ids, in first-seen order
+    """
+    if weights is None:
+        weights = [1.0] * len(rankings)
+
+    positions = {}
+    for ranking in rankings:
+        for doc_id in ranking:
+            positions.setdefault(doc_id, len(positions))
+
+    ids = np.empty(len(positions), dtype=object)
+    ids[:] = list(positions)
+    scores = np.zeros(len(positions), dtype=np.float64)
+
+    for ranking, weight in zip(rankings, weights):
+        if not len(ranking) or weight == 0:
+            continue
+        index = np.fromiter((positions[doc_id] for doc_id in ranking), dtype=np.int64, count=len(ranking))
+        ranks = np.arange(len(ranking), dtype=np.float64)
+        # ids are unique within a ranking, so fancy-index accumulation is safe
+        scores[index] += weight / (k + ranks + 1)
+
+    return ids, scores
+
+
+def apply_temporal_decay(
+    scores: np.ndarray,
+    timestamps: np.ndarray,
+    now: float,
+    half_life_hours: float = DEFAULT_DECAY_HALF_LIFE_HOURS,
+    decay_weight: float = DEFAULT_DECAY_WEIGHT
+) -> np.ndarray:
+    """
+    Blend relevance scores with an exponential recency factor.
+
+    final = (1 - decay_weight) * score + decay_weight * 0.5 ** (age_hours / half_life_hours)
+
+    Args:
+        scores: Relevance scores (e.g. from fuse_rankings)
+        timestamps: Unix timestamps of the candidates, parallel to scores
+        now: Current unix time
+        half_life_hours: Age at which the recency factor halves
+        decay_weight: Share of the final score coming from recency
+
+    Returns:
+        Decayed scores
+    """
+    age_hours = np.maximum(now - np.asarray(timestamps, dtype=np.float64), 0.0) / 3600
+    decay = np.exp2(-age_hours / max(half_life_hours, 1e-9))
+    return (1 - decay_weight) * scores + decay_weight * decay
+
+
+def top_n(ids: np.ndarray, scores: np.ndarray, n: int) -> List[Tuple[str, float]]:
+    """
+    Select the n best scoring ids without sorting the whole array.
+
+    Returns:
+        List of (id, score) tuples sorted by score, highest first
+    """
+    if n <= 0 or len(scores) == 0:
+        return []
+    if n < len(scores):
+        candidates = np.argpartition(-scores, n - 1)[:n]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(ids[i], float(scores[i])) for i in order]
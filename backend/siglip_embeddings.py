@@ -3,13 +3,44 @@ SigLIP Embeddings Wrapper for Manual Embedding Handling
 Uses google/siglip-so400m-patch14-384 for both text and image embeddings
 """
 
+import asyncio
+import queue
+import re
+import threading
+import time
 import torch
+from collections import OrderedDict
+from concurrent.futures import Future
 from transformers import AutoModel, AutoProcessor
 from PIL import Image
-from typing import List, Union
+from typing import Callable, List, Optional, Union
 import numpy as np
 
 
+# Default number of texts per forward pass in embed_texts
+DEFAULT_TEXT_BATCH_SIZE = 32
+
+# How texts are tokenized for the text tower (see _text_inputs). Text embeddings
+# made with another format are not comparable: collections built before texts
+# were padded to the max length must be re-embedded
+TEXT_INPUT_FORMAT = "pad-to-max-length"
+
+
+def read_text_input_format(path: str) -> Optional[str]:
+    """Text input format recorded for a collection, or None if none was recorded"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_text_input_format(path: str):
+    """Record that a collection's text embeddings use TEXT_INPUT_FORMAT"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(TEXT_INPUT_FORMAT)
+
+
 class SigLIPEmbeddings:
     """
     Wrapper for Google SigLIP model to generate embeddings for text and images.
@@ -36,8 +67,31 @@ class SigLIPEmbeddings:
         # Set model to evaluation mode
         self.model.eval()
 
+        # Text longer than this is truncated by the processor, so chunks are sized to fit
+        self.tokenizer = self.processor.tokenizer
+        self.text_max_length = self.model.config.text_config.max_position_embeddings
+        self.max_text_tokens = self.text_max_length - self.tokenizer.num_special_tokens_to_add()
+
         print(f"SigLIP model loaded successfully!")
 
+    def _text_inputs(self, texts: List[str]) -> dict:
+        """
+        Tokenize texts for the text tower, on the model's device.
+
+        Every text is padded to the full max length, as in SigLIP training: the
+        text tower has no attention mask and pools the last position, so padding
+        to the longest text in a batch would make an embedding depend on the
+        other texts it happens to be batched with.
+        """
+        inputs = self.processor(
+            text=texts,
+            return_tensors="pt",
+            padding="max_length",
+            max_length=self.text_max_length,
+            truncation=True
+        )
+        return {k: v.to(self.device) for k, v in inputs.items()}
+
     def embed_text(self, text: str) -> List[float]:
         """
         Generate embedding for a single text string.
@@ -48,16 +102,7 @@ class SigLIPEmbeddings:
         Returns:
             List of floats representing the embedding
         """
-        # Process text
-        inputs = self.processor(
-            text=[text],
-            return_tensors="pt",
-            padding=True,
-            truncation=True
-        )
-
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        inputs = self._text_inputs([text])
 
         # Generate embedding
         with torch.no_grad():
@@ -70,37 +115,93 @@ class SigLIPEmbeddings:
         embedding = text_features.cpu().numpy()[0].tolist()
         return embedding
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], batch_size: int = DEFAULT_TEXT_BATCH_SIZE) -> List[List[float]]:
         """
         Generate embeddings for multiple text strings (batch processing).
 
+        Texts are run through the model in slices of at most batch_size so a
+        long document does not pad everything into one oversized tensor.
+
         Args:
             texts: List of text strings
+            batch_size: Maximum number of texts per forward pass
 
         Returns:
             List of embeddings (each embedding is a list of floats)
         """
-        # Process texts in batch
-        inputs = self.processor(
-            text=texts,
-            return_tensors="pt",
-            padding=True,
-            truncation=True
-        )
+        if not texts:
+            return []
 
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        batch_size = max(1, batch_size)
+        embeddings = []
+
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+
+            inputs = self._text_inputs(batch)
+
+            # Generate embeddings
+            with torch.no_grad():
+                text_features = self.model.get_text_features(**inputs)
+
+                # Normalize embeddings
+                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+
+            # Convert to list
+            embeddings.extend(text_features.cpu().numpy().tolist())
+
+        return embeddings
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Number of text tokens (without special tokens) of each text.
+
+        Args:
+            texts: List of text strings
+
+        Returns:
+            Token count per text, before truncation
+        """
+        if not texts:
+            return []
+        encoded = self.tokenizer(texts, add_special_tokens=False, truncation=False)
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def preprocess_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """
+        Resize and normalize decoded images into SigLIP pixel values.
+
+        Args:
+            images: RGB PIL images
+
+        Returns:
+            Pixel value tensor of shape (len(images), 3, H, W) on the CPU
+        """
+        return self.processor(images=images, return_tensors="pt")["pixel_values"]
+
+    def embed_pixel_values(self, pixel_values) -> List[List[float]]:
+        """
+        Generate embeddings from preprocessed pixel values.
+
+        Args:
+            pixel_values: Tensor from preprocess_images (rows may be concatenated
+                from several calls), or a list of its single-image rows
+
+        Returns:
+            List of embeddings (each embedding is a list of floats)
+        """
+        if isinstance(pixel_values, (list, tuple)):
+            pixel_values = torch.stack(pixel_values)
 
         # Generate embeddings
         with torch.no_grad():
-            text_features = self.model.get_text_features(**inputs)
+            image_features = self.model.get_image_features(pixel_values=pixel_values.to(self.device))
 
             # Normalize embeddings
-            text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
 
         # Convert to list and return
-        embeddings = text_features.cpu().numpy().tolist()
-        return embeddings
+        return image_features.cpu().numpy().tolist()
 
     def embed_image(self, image_path: str) -> List[float]:
         """
@@ -115,25 +216,7 @@ class SigLIPEmbeddings:
         # Load image
         image = Image.open(image_path).convert("RGB")
 
-        # Process image
-        inputs = self.processor(
-            images=image,
-            return_tensors="pt"
-        )
-
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-        # Generate embedding
-        with torch.no_grad():
-            image_features = self.model.get_image_features(**inputs)
-
-            # Normalize embeddings
-            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-
-        # Convert to list and return
-        embedding = image_features.cpu().numpy()[0].tolist()
-        return embedding
+        return self.embed_pixel_values(self.preprocess_images([image]))[0]
 
     def embed_images(self, image_paths: List[str]) -> List[List[float]]:
         """
@@ -148,25 +231,7 @@ class SigLIPEmbeddings:
         # Load images
         images = [Image.open(path).convert("RGB") for path in image_paths]
 
-        # Process images in batch
-        inputs = self.processor(
-            images=images,
-            return_tensors="pt"
-        )
-
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-        # Generate embeddings
-        with torch.no_grad():
-            image_features = self.model.get_image_features(**inputs)
-
-            # Normalize embeddings
-            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-
-        # Convert to list and return
-        embeddings = image_features.cpu().numpy().tolist()
-        return embeddings
+        return self.embed_pixel_values(self.preprocess_images(images))
 
     def get_embedding_dimension(self) -> int:
         """
@@ -187,6 +252,172 @@ class SigLIPEmbeddings:
             return len(dummy_embedding)
 
 
+class TextEmbeddingBatcher:
+    """
+    Dynamic micro-batcher for text embeddings.
+
+    Texts submitted by concurrent callers are collected on a background
+    thread until either max_batch_size texts are waiting or max_wait_ms has
+    passed since the first one arrived, then embedded in a single
+    get_text_features pass. Each caller gets a Future for its own text.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "siglip-batcher"
+    ):
+        """
+        Start the batching thread.
+
+        Args:
+            embed_fn: Batch embedding function (e.g. SigLIPEmbeddings.embed_texts)
+            max_batch_size: Maximum number of texts per forward pass
+            max_wait_ms: Maximum time the first text in a batch waits for company
+            name: Thread name, useful when several batchers run side by side
+        """
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a single text for embedding.
+
+        Returns:
+            Future resolving to the text's embedding
+        """
+        if self._closed:
+            raise RuntimeError("TextEmbeddingBatcher is closed")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def submit_many(self, texts: List[str]) -> List[Future]:
+        """Queue several texts; they may be split across or merged into batches"""
+        return [self.submit(text) for text in texts]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Blocking helper: embed texts and wait for all results"""
+        return [future.result() for future in self.submit_many(texts)]
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        """Async helper: embed texts without blocking the event loop"""
+        futures = [asyncio.wrap_future(future) for future in self.submit_many(texts)]
+        return list(await asyncio.gather(*futures))
+
+    def close(self):
+        """Stop the batching thread after draining already queued texts"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _collect_batch(self, first: tuple) -> tuple:
+        """Gather texts behind first until the batch is full or the window closes"""
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+
+        return batch, stop
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch, stop = self._collect_batch(item)
+
+            # Drop callers that gave up, and embed duplicate texts only once
+            live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            unique_texts = list(dict.fromkeys(text for text, _ in live))
+
+            try:
+                embeddings = self.embed_fn(unique_texts)
+            except Exception as e:
+                for _, future in live:
+                    future.set_exception(e)
+                continue
+
+            by_text = dict(zip(unique_texts, embeddings))
+            for text, future in live:
+                future.set_result(by_text[text])
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    Normalize a query for embedding cache lookups.
+
+    The SigLIP tokenizer lowercases and collapses whitespace itself, so
+    queries that differ only in case or spacing produce the same embedding.
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU cache of query embeddings keyed by normalized query text"""
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Args:
+            max_size: Maximum number of embeddings kept (0 disables caching)
+        """
+        self.max_size = max(0, max_size)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: str, embedding: List[float]):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
 # Singleton instance for global use
 _siglip_instance = None
 
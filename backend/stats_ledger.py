@@ -0,0 +1,279 @@
+"""
+Maintained counters behind /stats
+Totals, per-document and per-domain counts are updated whenever entries are
+written or removed, so reading stats never scans the ChromaDB collection
+"""
+
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+
+# Counters kept both per document and as global totals
+COUNTERS = (
+    "total_entries",
+    "total_text_entries",
+    "total_images",
+    "total_chunks",
+    "chunked_documents",
+    "text_bytes",
+    "image_bytes",
+)
+
+
+def image_file_size(metadata: Dict) -> int:
+    """Size of an image entry's stored file (0 when it is missing)"""
+    file_path = metadata.get("file_path")
+    return os.path.getsize(file_path) if file_path and os.path.exists(file_path) else 0
+
+
+def entry_counters(document: Optional[str], metadata: Dict) -> Dict[str, int]:
+    """
+    Counter increments contributed by one ChromaDB entry.
+
+    Args:
+        document: Stored document text
+        metadata: Entry metadata as written to ChromaDB
+
+    Returns:
+        Dict of counter name -> increment (image_bytes only for images without a
+        content_hash; shared image files are counted once by StatsLedger)
+    """
+    counters = {"total_entries": 1}
+    if metadata.get("type", "text") == "image":
+        counters["total_images"] = 1
+        if not metadata.get("content_hash"):
+            counters["image_bytes"] = image_file_size(metadata)
+    else:
+        counters["total_text_entries"] = 1
+        counters["text_bytes"] = len((document or "").encode("utf-8"))
+        if metadata.get("is_chunked", False):
+            counters["total_chunks"] = 1
+            if metadata.get("chunk_index", 0) == 0:
+                counters["chunked_documents"] = 1
+    return counters
+
+
+class StatsLedger:
+    """SQLite-backed stats counters, updated in the same step as the writes they count"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the ledger.
+
+        Args:
+            path: SQLite database file (may be shared with the document store)
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        counter_columns = ", ".join(f"{name} INTEGER NOT NULL DEFAULT 0" for name in COUNTERS)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS ledger_documents (
+                    document_id TEXT PRIMARY KEY,
+                    domain TEXT,
+                    {counter_columns}
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ledger_totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ledger_domains (domain TEXT PRIMARY KEY, documents INTEGER NOT NULL)"
+            )
+            has_image_refs = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ledger_images'"
+            ).fetchone()
+            # Image files are shared by every entry with the same content_hash: their
+            # bytes are counted once per file, while any entry still references it
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ledger_images (
+                    content_hash TEXT PRIMARY KEY,
+                    refs INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ledger_image_refs (
+                    document_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    refs INTEGER NOT NULL,
+                    PRIMARY KEY (document_id, content_hash)
+                )
+                """
+            )
+            if not has_image_refs:
+                # Ledgers that counted a shared file once per entry: start over, so the
+                # next backfill recounts them
+                self._conn.execute("DELETE FROM ledger_documents")
+                self._conn.execute("DELETE FROM ledger_totals")
+                self._conn.execute("DELETE FROM ledger_domains")
+
+    def _add_total(self, name: str, delta: int):
+        self._conn.execute(
+            """
+            INSERT INTO ledger_totals (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+            """,
+            (name, delta)
+        )
+
+    def _add_domain(self, domain: str, delta: int):
+        self._conn.execute(
+            """
+            INSERT INTO ledger_domains (domain, documents) VALUES (?, ?)
+            ON CONFLICT(domain) DO UPDATE SET documents = documents + excluded.documents
+            """,
+            (domain, delta)
+        )
+        self._conn.execute("DELETE FROM ledger_domains WHERE documents <= 0")
+
+    def record_entries(self, documents: List[Optional[str]], metadatas: List[Dict]):
+        """
+        Count newly written entries.
+
+        Args:
+            documents: Stored document texts, parallel to metadatas
+            metadatas: Entry metadata as written to ChromaDB
+        """
+        per_document = defaultdict(lambda: defaultdict(int))
+        domains = {}
+        image_refs = defaultdict(int)  # (document_id, content_hash) -> entries
+        image_bytes = {}  # content_hash -> file size
+        for document, metadata in zip(documents, metadatas):
+            document_id = metadata.get("document_id", "")
+            for name, delta in entry_counters(document, metadata).items():
+                per_document[document_id][name] += delta
+            domains.setdefault(document_id, metadata.get("domain") or "unknown")
+            if metadata.get("type") == "image" and metadata.get("content_hash"):
+                image_refs[(document_id, metadata["content_hash"])] += 1
+                if metadata["content_hash"] not in image_bytes:
+                    image_bytes[metadata["content_hash"]] = image_file_size(metadata)
+
+        assignments = ", ".join(f"{name} = {name} + ?" for name in COUNTERS)
+        with self._lock, self._conn:
+            for document_id, counters in per_document.items():
+                values = [counters.get(name, 0) for name in COUNTERS]
+                exists = self._conn.execute(
+                    "SELECT 1 FROM ledger_documents WHERE document_id = ?", (document_id,)
+                ).fetchone()
+
+                if exists:
+                    self._conn.execute(
+                        f"UPDATE ledger_documents SET {assignments} WHERE document_id = ?",
+                        (*values, document_id)
+                    )
+                else:
+                    self._conn.execute(
+                        f"""
+                        INSERT INTO ledger_documents (document_id, domain, {", ".join(COUNTERS)})
+                        VALUES (?, ?, {", ".join("?" * len(COUNTERS))})
+                        """,
+                        (document_id, domains[document_id], *values)
+                    )
+                    # Entries without a document_id are counted, but not as a document
+                    if document_id:
+                        self._add_total("unique_documents", 1)
+                        self._add_domain(domains[document_id], 1)
+
+                for name, value in zip(COUNTERS, values):
+                    if value:
+                        self._add_total(name, value)
+
+            for (document_id, digest), refs in image_refs.items():
+                self._conn.execute(
+                    """
+                    INSERT INTO ledger_image_refs (document_id, content_hash, refs) VALUES (?, ?, ?)
+                    ON CONFLICT(document_id, content_hash) DO UPDATE SET refs = refs + excluded.refs
+                    """,
+                    (document_id, digest, refs)
+                )
+                if self._conn.execute("SELECT 1 FROM ledger_images WHERE content_hash = ?", (digest,)).fetchone():
+                    self._conn.execute(
+                        "UPDATE ledger_images SET refs = refs + ? WHERE content_hash = ?", (refs, digest)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT INTO ledger_images (content_hash, refs, bytes) VALUES (?, ?, ?)",
+                        (digest, refs, image_bytes[digest])
+                    )
+                    self._add_total("image_bytes", image_bytes[digest])
+
+    def remove_document(self, document_id: str):
+        """Subtract everything counted for a document"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT domain, {', '.join(COUNTERS)} FROM ledger_documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+            if row is None:
+                return
+
+            for name, value in zip(COUNTERS, row[1:]):
+                if value:
+                    self._add_total(name, -value)
+            if document_id:
+                self._add_total("unique_documents", -1)
+                self._add_domain(row[0], -1)
+            self._conn.execute("DELETE FROM ledger_documents WHERE document_id = ?", (document_id,))
+
+            image_refs = self._conn.execute(
+                "SELECT content_hash, refs FROM ledger_image_refs WHERE document_id = ?", (document_id,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM ledger_image_refs WHERE document_id = ?", (document_id,))
+            for digest, refs in image_refs:
+                self._conn.execute("UPDATE ledger_images SET refs = refs - ? WHERE content_hash = ?", (refs, digest))
+                unreferenced = self._conn.execute(
+                    "SELECT bytes FROM ledger_images WHERE content_hash = ? AND refs <= 0", (digest,)
+                ).fetchone()
+                if unreferenced:
+                    self._add_total("image_bytes", -unreferenced[0])
+                    self._conn.execute("DELETE FROM ledger_images WHERE content_hash = ?", (digest,))
+
+    def rebuild(self, entries: Iterable[tuple]):
+        """
+        Recount from scratch (backfill for collections written before the ledger).
+
+        Args:
+            entries: Iterable of (documents, metadatas) batches
+        """
+        self.clear()
+        for documents, metadatas in entries:
+            self.record_entries(documents, metadatas)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM ledger_documents")
+            self._conn.execute("DELETE FROM ledger_totals")
+            self._conn.execute("DELETE FROM ledger_domains")
+            self._conn.execute("DELETE FROM ledger_images")
+            self._conn.execute("DELETE FROM ledger_image_refs")
+
+    def totals(self) -> Dict[str, int]:
+        """All global counters, including unique_documents"""
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT name, value FROM ledger_totals").fetchall())
+        return {name: rows.get(name, 0) for name in ("unique_documents",) + COUNTERS}
+
+    def documents_by_domain(self, limit: int = 20) -> Dict[str, int]:
+        """Document counts of the most captured domains"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT domain, documents FROM ledger_domains ORDER BY documents DESC, domain LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
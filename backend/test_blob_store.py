@@ -0,0 +1,59 @@
+"""
+Tests for the content-addressed blob store
+"""
+
+import os
+import zlib
+
+import pytest
+
+import blob_store
+from blob_store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def test_put_get_round_trip(store):
+    data = "<p>héllo</p>".encode("utf-8") * 100
+    digest = store.put(data)
+    assert store.get(digest) == data
+    assert digest in store
+    assert store.get("0" * 64) is None
+
+
+def test_identical_content_is_stored_once(store):
+    first = store.put(b"same bytes")
+    second = store.put(b"same bytes")
+    assert first == second
+    assert list(store.digests()) == [first]
+    assert store.put(b"other bytes") != first
+
+
+def test_blobs_are_compressed(store):
+    data = b"repetitive " * 1000
+    store.put(data)
+    assert 0 < store.disk_usage() < len(data) // 10
+
+
+def test_zlib_blobs_stay_readable(store, monkeypatch):
+    monkeypatch.setattr(blob_store, "zstandard", None)
+    digest = store.put(b"written without zstandard")
+    assert store._find(digest).endswith(blob_store.ZLIB_EXTENSION)
+    assert zlib.decompress(open(store._find(digest), "rb").read()) == b"written without zstandard"
+    assert store.get(digest) == b"written without zstandard"
+
+
+def test_delete_and_clear(store):
+    a = store.put(b"a")
+    b = store.put(b"b")
+    store.delete(a)
+    store.delete(a)  # deleting a missing blob is a no-op
+    assert a not in store and b in store
+    assert set(store.digests()) == {b}
+
+    store.clear()
+    assert list(store.digests()) == []
+    assert os.path.isdir(store.root)
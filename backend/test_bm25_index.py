@@ -0,0 +1,177 @@
+"""
+Tests for the incremental BM25 index
+Scores are checked against an exhaustive BM25 computed from the raw documents
+"""
+
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from bm25_index import BM25Index, WriteGeneration, tokenize
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+def exhaustive_scores(docs: dict, query_tokens: list, k1: float = 1.5, b: float = 0.75) -> dict:
+    """BM25 of every document, straight from the definition"""
+    tokenized = {doc_id: tokenize(text) for doc_id, text in docs.items()}
+    n_docs = len(tokenized)
+    avg_length = sum(len(tokens) for tokens in tokenized.values()) / n_docs
+    scores = {}
+    for doc_id, tokens in tokenized.items():
+        counts = Counter(tokens)
+        score = 0.0
+        for term in query_tokens:
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            df = sum(1 for other in tokenized.values() if term in other)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg_length))
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+def random_docs(rng: random.Random, count: int, prefix: str = "doc") -> dict:
+    return {
+        f"{prefix}_{i}": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30)))
+        for i in range(count)
+    }
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "bm25.idx")
+
+
+def build_index(docs: dict) -> BM25Index:
+    index = BM25Index()
+    index.add_many(docs.keys(), docs.values())
+    return index
+
+
+def assert_matches_exhaustive(index: BM25Index, docs: dict, query: list):
+    expected = exhaustive_scores(docs, query)
+    assert index.get_scores(query) == pytest.approx(expected)
+
+    k = 5
+    ranked = index.search(query, k)
+    expected_top = sorted(expected.values(), reverse=True)[:k]
+    assert [score for _, score in ranked] == pytest.approx(expected_top)
+    for doc_id, score in ranked:
+        assert expected[doc_id] == pytest.approx(score)
+
+
+def test_search_matches_exhaustive_scoring():
+    rng = random.Random(0)
+    docs = random_docs(rng, 200)
+    index = build_index(docs)
+    for _ in range(20):
+        query = rng.sample(WORDS, rng.randint(1, 4))
+        assert_matches_exhaustive(index, docs, query)
+
+
+def test_remove_and_replace_update_scores():
+    rng = random.Random(1)
+    docs = random_docs(rng, 100)
+    index = build_index(docs)
+
+    for doc_id in list(docs)[:30]:
+        assert index.remove(doc_id)
+        del docs[doc_id]
+    assert not index.remove("doc_0")
+    docs["doc_50"] = "alpha alpha alpha"
+    index.add("doc_50", docs["doc_50"])
+
+    assert len(index) == len(docs)
+    assert_matches_exhaustive(index, docs, ["alpha", "beta"])
+
+
+def test_base_segment_with_tombstones_and_delta_matches_exhaustive(index_path):
+    rng = random.Random(2)
+    docs = random_docs(rng, 150)
+    index = build_index(docs)
+    index.save(index_path, "v1")
+
+    for doc_id in rng.sample(sorted(docs), 60):
+        index.remove(doc_id)
+        del docs[doc_id]
+    added = random_docs(rng, 40, prefix="new")
+    index.add_many(added.keys(), added.values())
+    docs.update(added)
+
+    for _ in range(20):
+        assert_matches_exhaustive(index, docs, rng.sample(WORDS, rng.randint(1, 3)))
+
+
+def test_idf_stays_positive_after_tombstones(index_path):
+    docs = {f"doc_{i}": "common term" if i < 8 else "rare" for i in range(10)}
+    index = build_index(docs)
+    index.save(index_path, "v1")
+
+    for i in range(7):
+        index.remove(f"doc_{i}")
+
+    assert len(index) == 3
+    assert index.document_frequency("common") == 1
+    assert index.idf("common") > 0
+    # The remaining match must outrank documents without the term
+    assert [doc_id for doc_id, _ in index.search(["common"], 3)] == ["doc_7"]
+
+
+def test_search_edge_cases():
+    index = build_index({"a": "alpha beta", "b": "beta"})
+    assert index.search(["alpha"], 0) == []
+    assert index.search(["missing"], 5) == []
+    assert BM25Index().search(["alpha"], 5) == []
+    assert "a" in index and "c" not in index
+
+
+def test_save_and_load_round_trip(index_path):
+    rng = random.Random(3)
+    docs = random_docs(rng, 80)
+    build_index(docs).save(index_path, "collection:7")
+
+    loaded = BM25Index()
+    assert loaded.load(index_path, "collection:7")
+    assert len(loaded) == len(docs)
+    assert_matches_exhaustive(loaded, docs, ["alpha", "gamma"])
+
+
+def test_load_rejects_stale_missing_and_corrupt_files(index_path, tmp_path):
+    build_index({"a": "alpha"}).save(index_path, "collection:7")
+
+    index = BM25Index()
+    assert not index.load(index_path, "collection:8")
+    assert not index.load(str(tmp_path / "missing.idx"), "collection:7")
+
+    with open(index_path, "r+b") as f:
+        f.truncate(40)
+    assert not index.load(index_path, "collection:7")
+    assert len(index) == 0
+
+
+def test_write_generation_survives_restart(tmp_path):
+    path = str(tmp_path / "generation")
+    generation = WriteGeneration(path)
+    assert generation.value == 0
+    assert generation.bump() == 1
+    assert generation.bump() == 2
+    assert WriteGeneration(path).value == 2
+
+
+def test_same_size_rewrite_changes_fingerprint(index_path, tmp_path):
+    """Deleting and adding the same number of chunks must still invalidate a saved index"""
+    generation = WriteGeneration(str(tmp_path / "generation"))
+    index = build_index({"a": "alpha", "b": "beta"})
+    index.save(index_path, f"collection:{generation.value}")
+
+    generation.bump()
+    index.remove("a")
+    index.add("c", "gamma")
+
+    assert len(index) == 2
+    assert not BM25Index().load(index_path, f"collection:{generation.value}")
@@ -0,0 +1,105 @@
+"""
+Tests for the document store: page fields and blob reference counting
+"""
+
+import json
+
+import pytest
+
+from blob_store import BlobStore
+from document_store import DocumentStore, canonicalize_url
+
+
+def page(html: str) -> dict:
+    return {
+        "clean_html": html,
+        "structured_content": {"headings": [html[:10]]},
+        "youtube_videos": json.dumps([]),
+    }
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+@pytest.fixture
+def store(tmp_path, blobs):
+    document_store = DocumentStore(str(tmp_path / "documents.sqlite3"), blob_store=blobs)
+    yield document_store
+    document_store.close()
+
+
+def test_put_get_round_trip(store, blobs):
+    store.put("doc", page("<p>hello</p>"))
+    assert store.get("doc") == page("<p>hello</p>")
+    assert store.get("doc", load_blobs=False) == {"youtube_videos": "[]"}
+    assert len(list(blobs.digests())) == 2
+    assert store.get("missing") is None
+
+
+def test_replacing_content_releases_old_blobs(store, blobs):
+    store.put("doc", page("<p>first</p>"))
+    store.put("doc", page("<p>second</p>"))
+    assert store.get("doc") == page("<p>second</p>")
+    assert len(list(blobs.digests())) == 2
+
+
+def test_shared_blobs_survive_until_last_reference(store, blobs):
+    store.put("a", page("<p>shared</p>"))
+    store.put("b", page("<p>shared</p>"))
+    assert len(list(blobs.digests())) == 2
+
+    store.put("a", {})
+    assert store.get("b") == page("<p>shared</p>")
+
+    store.put("b", {})
+    assert list(blobs.digests()) == []
+
+
+def test_rewriting_same_content_keeps_blobs(store, blobs):
+    store.put("doc", page("<p>same</p>"))
+    store.put("doc", page("<p>same</p>"))
+    assert store.get("doc") == page("<p>same</p>")
+    store.put("doc", {})
+    assert list(blobs.digests()) == []
+
+
+def test_clear_removes_blobs_and_counts(store, blobs):
+    store.put("doc", page("<p>x</p>"))
+    store.clear()
+    assert list(blobs.digests()) == []
+    store.put("doc", page("<p>x</p>"))
+    store.put("doc", {})
+    assert list(blobs.digests()) == []
+
+
+def test_existing_store_is_counted_and_swept(tmp_path, blobs):
+    """Stores created before refcounting: references are counted, leaked blobs removed"""
+    path = str(tmp_path / "documents.sqlite3")
+    store = DocumentStore(path, blob_store=blobs)
+    store.put("doc", page("<p>kept</p>"))
+    leaked = blobs.put(b"left behind by a replaced document")
+    store._conn.execute("DROP TABLE blob_refcounts")
+    store._conn.commit()
+    store.close()
+
+    reopened = DocumentStore(path, blob_store=blobs)
+    assert leaked not in blobs
+    assert reopened.get("doc") == page("<p>kept</p>")
+    reopened.put("doc", {})
+    assert list(blobs.digests()) == []
+    reopened.close()
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM:443/Docs/?b=2&a=1&utm_source=x#section", "https://example.com/Docs?a=1&b=2"),
+    ("http://example.com:8080/", "http://example.com:8080/"),
+    ("https://example.com/page?fbclid=abc", "https://example.com/page"),
+    ("https://mail.example.com/#/inbox/42", "https://mail.example.com/#/inbox/42"),
+    ("https://app.example.com/#!/item/3", "https://app.example.com/#!/item/3"),
+    ("https://example.com/guide#install", "https://example.com/guide"),
+    ("", ""),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
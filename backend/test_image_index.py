@@ -0,0 +1,124 @@
+"""
+Tests for the image index: references, file deletion and URL validators
+"""
+
+import os
+import time
+
+import pytest
+
+from image_index import ImageIndex
+
+EMBEDDING = [0.5, 0.25, 0.125]
+
+
+@pytest.fixture
+def index(tmp_path):
+    image_index = ImageIndex(str(tmp_path / "images.sqlite3"))
+    yield image_index
+    image_index.close()
+
+
+@pytest.fixture
+def shared_file(tmp_path):
+    path = tmp_path / "abc.png"
+    path.write_bytes(b"png")
+    return str(path)
+
+
+def refcount(index, content_hash):
+    row = index._conn.execute("SELECT refcount FROM images WHERE content_hash = ?", (content_hash,)).fetchone()
+    return row[0] if row else None
+
+
+def claim(index, path, content_hash="abc", phash="p1", **kwargs):
+    return index.claim(content_hash, phash, path, os.path.basename(path), 10, 20, **kwargs)
+
+
+def test_first_claim_registers_image_without_embedding(index, shared_file):
+    image = claim(index, shared_file)
+    assert image["embedding"] is None and image["refcount"] == 1
+
+    index.set_embedding("abc", EMBEDDING)
+    index.set_embedding("abc", [9.0, 9.0, 9.0])  # the first embedding is kept
+    again = claim(index, shared_file)
+    assert again["embedding"] == pytest.approx(EMBEDDING)
+    assert again["refcount"] == 2
+    assert refcount(index, "abc") == 2
+
+
+def test_file_is_deleted_with_last_reference(index, shared_file):
+    claim(index, shared_file)
+    claim(index, shared_file)
+
+    assert not index.release("abc")
+    assert os.path.exists(shared_file)
+    assert index.release("abc")
+    assert not os.path.exists(shared_file)
+    assert refcount(index, "abc") is None
+    assert not index.release("abc")
+
+
+def test_claim_before_release_keeps_file(index, shared_file):
+    """A capture reusing an image while its previous user releases it"""
+    claim(index, shared_file, source_url="https://example.com/a.png")
+    index.set_embedding("abc", EMBEDDING)
+
+    reused = index.claim_url("https://example.com/a.png")
+    assert reused["content_hash"] == "abc"
+    assert not index.release("abc")
+    assert os.path.exists(shared_file)
+
+
+def test_release_before_claim_forgets_url(index, shared_file):
+    claim(index, shared_file, source_url="https://example.com/a.png")
+    index.set_embedding("abc", EMBEDDING)
+    assert index.release("abc")
+
+    assert index.claim_url("https://example.com/a.png") is None
+    assert index.url_validators("https://example.com/a.png") is None
+
+
+def test_claim_url_skips_missing_files_and_unembedded_images(index, shared_file):
+    claim(index, shared_file, source_url="https://example.com/a.png")
+    assert index.claim_url("https://example.com/a.png") is None  # not embedded yet
+
+    index.set_embedding("abc", EMBEDDING)
+    os.remove(shared_file)
+    assert index.claim_url("https://example.com/a.png") is None
+    assert refcount(index, "abc") == 1
+
+
+def test_url_validators_are_stored_and_revalidated(index, shared_file):
+    before = time.time()
+    claim(index, shared_file, source_url="https://example.com/a.png",
+          validators={"etag": '"v1"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+    index.set_embedding("abc", EMBEDDING)
+
+    validators = index.url_validators("https://example.com/a.png")
+    assert validators["etag"] == '"v1"'
+    assert validators["last_modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert validators["checked_at"] >= before
+
+    index._conn.execute("UPDATE image_urls SET checked_at = 0")
+    assert index.claim_url("https://example.com/a.png", revalidated=True)
+    assert index.url_validators("https://example.com/a.png")["checked_at"] >= before
+
+
+def test_phash_match_reuses_embedded_image(index, shared_file, tmp_path):
+    claim(index, shared_file)
+    index.set_embedding("abc", EMBEDDING)
+
+    other_path = str(tmp_path / "def.png")
+    assert claim(index, other_path, content_hash="def")["content_hash"] == "def"
+    matched = claim(index, other_path, content_hash="ghi", match_phash=True)
+    assert matched["content_hash"] == "abc"
+    assert refcount(index, "abc") == 2
+    assert refcount(index, "ghi") is None
+
+
+def test_clear(index, shared_file):
+    claim(index, shared_file, source_url="https://example.com/a.png")
+    index.clear()
+    assert index.count() == 0
+    assert index.url_validators("https://example.com/a.png") is None
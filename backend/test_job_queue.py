@@ -0,0 +1,148 @@
+"""
+Tests for the durable ingest job queue
+"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+@pytest.fixture
+def queue(db_path):
+    job_queue = JobQueue(db_path)
+    yield job_queue
+    job_queue.close()
+
+
+def spool(tmp_path, name: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"upload")
+    return str(path)
+
+
+def stored_payload(db_path: str, job_id: int) -> str:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+
+def test_jobs_are_claimed_in_order_once(queue):
+    first = queue.enqueue("doc-a", {"text": "a"})
+    second = queue.enqueue("doc-b", {"text": "b"})
+
+    job = queue.claim()
+    assert job["job_id"] == first
+    assert job["status"] == RUNNING and job["attempts"] == 1
+    assert job["payload"] == {"text": "a"}
+    assert queue.claim()["job_id"] == second
+    assert queue.claim() is None
+    assert queue.depth() == 2
+
+
+def test_complete_releases_files_and_drops_payload(queue, db_path, tmp_path):
+    path = spool(tmp_path, "upload.png")
+    job_id = queue.enqueue("doc", {"text": "x" * 1000}, files=[path])
+    assert queue.file_paths() == {path}
+
+    queue.claim()
+    queue.complete(job_id)
+    assert not os.path.exists(path)
+    assert queue.file_paths() == set()
+    assert stored_payload(db_path, job_id) == "{}"
+    assert queue.jobs_for_document("doc")[0]["status"] == DONE
+    assert queue.depth() == 0
+
+
+def test_failed_attempt_is_retried_after_backoff(queue, tmp_path):
+    path = spool(tmp_path, "upload.png")
+    job_id = queue.enqueue("doc", {}, files=[path])
+    queue.claim()
+
+    queue.fail(job_id, "boom", retry_in=60)
+    status = queue.jobs_for_document("doc")[0]
+    assert status["status"] == QUEUED and status["error"] == "boom"
+    assert queue.claim() is None  # not due yet
+    assert 59 < queue.next_due_in() <= 60
+    assert os.path.exists(path)  # kept for the retry
+
+    queue._conn.execute("UPDATE jobs SET available_at = ?", (time.time() - 1,))
+    retried = queue.claim()
+    assert retried["job_id"] == job_id and retried["attempts"] == 2
+
+
+def test_final_failure_releases_files(queue, tmp_path):
+    path = spool(tmp_path, "upload.png")
+    job_id = queue.enqueue("doc", {}, files=[path])
+    queue.claim()
+    queue.fail(job_id, "gave up")
+
+    status = queue.jobs_for_document("doc")[0]
+    assert status["status"] == FAILED and status["error"] == "gave up"
+    assert not os.path.exists(path)
+    assert queue.next_due_in() is None
+
+
+def test_running_jobs_are_requeued_after_restart(db_path):
+    queue = JobQueue(db_path)
+    job_id = queue.enqueue("doc", {"text": "a"})
+    queue.claim()
+    queue.close()
+
+    reopened = JobQueue(db_path)
+    assert reopened.claim() is None
+    assert reopened.requeue_running() == 1
+    job = reopened.claim()
+    assert job["job_id"] == job_id and job["attempts"] == 2
+    reopened.close()
+
+
+def test_purge_queued_keeps_running_jobs(queue, tmp_path):
+    running_path = spool(tmp_path, "running.png")
+    queued_path = spool(tmp_path, "queued.png")
+    running = queue.enqueue("doc-a", {}, files=[running_path])
+    queue.enqueue("doc-b", {}, files=[queued_path])
+    queue.claim()
+
+    assert queue.purge_queued() == 1
+    assert queue.file_paths() == {running_path}
+    assert os.path.exists(running_path) and not os.path.exists(queued_path)
+    assert queue.jobs_for_document("doc-b") == []
+    assert queue.jobs_for_document("doc-a")[0]["job_id"] == running
+
+
+def test_prune_and_metrics(queue):
+    done = queue.enqueue("doc-a", {})
+    queue.claim()
+    queue.complete(done)
+    queue.enqueue("doc-b", {})
+
+    metrics = queue.metrics()
+    assert metrics[DONE] == 1 and metrics[QUEUED] == 1 and metrics["depth"] == 1
+
+    assert queue.prune(older_than=3600) == 0
+    assert queue.prune(older_than=-1) == 1
+    assert queue.jobs_for_document("doc-a") == []
+    assert queue.depth() == 1
+
+
+def test_captures_of_a_queued_page_share_its_document(queue):
+    first_job, first_doc = queue.enqueue_capture("https://example.com/a", "doc-1", {"text": "a"})
+    second_job, second_doc = queue.enqueue_capture("https://example.com/a", "doc-2", {"text": "a2"})
+    _, other_doc = queue.enqueue_capture("https://example.com/b", "doc-3", {"text": "b"})
+
+    assert first_doc == second_doc == "doc-1"
+    assert other_doc == "doc-3"
+    assert [job["job_id"] for job in queue.jobs_for_document("doc-1")] == [second_job, first_job]
+    assert queue.reserve_document("https://example.com/a", "doc-4") == "doc-1"
+    assert queue.reserve_document("https://example.com/c", "doc-5") == "doc-5"
+
+    queue.clear_documents()
+    assert queue.reserve_document("https://example.com/a", "doc-6") == "doc-6"
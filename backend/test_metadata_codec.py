@@ -0,0 +1,87 @@
+"""
+Tests for the ChromaDB metadata codec
+"""
+
+import datetime
+import json
+
+import pytest
+
+from metadata_codec import JSON_FIELDS_KEY, LazyMetadata, decode_metadata, encode_metadata
+
+METADATA = {
+    "title": "Guide",
+    "url": "https://example.com/a?b=c",
+    "chunk_index": 3,
+    "score": 0.5,
+    "is_image": False,
+    "missing": None,
+    "headings": ["Intro", "Install"],
+    "structured_content": {"tables": [{"rows": 2}], "lists": []},
+    "empty_list": [],
+}
+
+
+def test_round_trip():
+    encoded = encode_metadata(METADATA)
+    assert all(isinstance(value, (str, int, float, bool)) or value is None for value in encoded.values())
+    assert decode_metadata(encoded) == METADATA
+    assert dict(LazyMetadata(encoded)) == METADATA
+
+
+def test_json_looking_strings_stay_strings():
+    """Only fields the codec encoded are decoded, whatever their content looks like"""
+    metadata = {"text": '{"a": 1}', "list_like": "[1, 2]", "broken": "[not json"}
+    assert decode_metadata(encode_metadata(metadata)) == metadata
+
+
+def test_other_values_are_stored_as_str():
+    when = datetime.date(2024, 1, 2)
+    assert decode_metadata(encode_metadata({"when": when})) == {"when": "2024-01-02"}
+
+
+def test_marker_is_hidden_and_not_nested():
+    encoded = encode_metadata({"tags": ["a"], JSON_FIELDS_KEY: "stale"})
+    assert encoded[JSON_FIELDS_KEY] == "tags"
+    assert encode_metadata({"title": "x"})[JSON_FIELDS_KEY] == ""
+
+    view = LazyMetadata(encoded)
+    assert JSON_FIELDS_KEY not in view
+    assert list(view) == ["tags"] and len(view) == 1
+    with pytest.raises(KeyError):
+        view[JSON_FIELDS_KEY]
+    # Re-encoding a decoded view yields the same stored form
+    assert encode_metadata(view) == encoded
+
+
+def test_fields_are_decoded_lazily_and_once():
+    encoded = encode_metadata({"a": {"x": 1}, "b": [1, 2]})
+    encoded["b"] = "not json"  # would fail if decoded
+    view = LazyMetadata(encoded)
+    assert view["a"] == {"x": 1}
+    assert view["a"] is view["a"]
+    assert decode_metadata(encoded, fields=["a", "absent"]) == {"a": {"x": 1}}
+    with pytest.raises(json.JSONDecodeError):
+        view["b"]
+
+
+def test_legacy_rows_without_marker():
+    raw = {
+        "headings": '["Intro"]',
+        "structured_content": '{"lists": []}',
+        "title": "[Draft] notes",
+        "url": "https://example.com",
+        "chunk_index": 1,
+    }
+    assert decode_metadata(raw) == {
+        "headings": ["Intro"],
+        "structured_content": {"lists": []},
+        "title": "[Draft] notes",
+        "url": "https://example.com",
+        "chunk_index": 1,
+    }
+
+
+def test_empty_metadata():
+    assert decode_metadata(None) == {}
+    assert len(LazyMetadata({})) == 0
@@ -0,0 +1,73 @@
+"""
+Tests for the vectorized RRF fusion and temporal decay in scoring.py
+Results are compared against straightforward per-item implementations
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from scoring import DEFAULT_DECAY_HALF_LIFE_HOURS, apply_temporal_decay, fuse_rankings, top_n
+
+
+def reference_rrf(rankings, weights, k):
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank + 1)
+    return scores
+
+
+def test_fuse_rankings_matches_reference():
+    rng = random.Random(0)
+    pool = [f"doc_{i}" for i in range(100)]
+    semantic = rng.sample(pool, 40)
+    bm25 = rng.sample(pool, 30)
+
+    for weights, k in (([1.0, 1.0], 60), ([0.7, 1.3], 10), ([1.0, 0.0], 60)):
+        ids, scores = fuse_rankings([semantic, bm25], weights, k)
+        expected = reference_rrf([semantic, bm25], weights, k)
+        assert dict(zip(ids, scores)) == pytest.approx(expected)
+
+
+def test_fuse_rankings_keeps_first_seen_order_and_handles_empty():
+    ids, scores = fuse_rankings([["a", "b"], ["c", "a"]])
+    assert list(ids) == ["a", "b", "c"]
+    # Ranked first and second: 1/61 + 1/62 beats a single first place
+    assert scores[0] == pytest.approx(1 / 61 + 1 / 62)
+
+    ids, scores = fuse_rankings([[], []])
+    assert len(ids) == 0 and len(scores) == 0
+
+
+def test_default_decay_matches_original_exponential():
+    now = 1_000_000.0
+    ages_hours = np.array([0.0, 1.0, 24.0, 24 * 7])
+    scores = np.array([0.5, 0.5, 0.5, 0.5])
+    decayed = apply_temporal_decay(scores, now - ages_hours * 3600, now, DEFAULT_DECAY_HALF_LIFE_HOURS, 0.3)
+    expected = [0.7 * 0.5 + 0.3 * math.exp(-age / 24) for age in ages_hours]
+    assert decayed == pytest.approx(expected)
+
+
+def test_decay_half_life_and_future_timestamps():
+    now = 1_000_000.0
+    decayed = apply_temporal_decay(np.zeros(3), np.array([now, now - 10 * 3600, now + 3600]), now, 10.0, 1.0)
+    # Weight 1.0 leaves only the recency factor; future timestamps count as age 0
+    assert decayed == pytest.approx([1.0, 0.5, 1.0])
+
+    unchanged = apply_temporal_decay(np.array([0.2, 0.4]), np.array([0.0, now]), now, 10.0, 0.0)
+    assert unchanged == pytest.approx([0.2, 0.4])
+
+
+def test_top_n_matches_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.random(500)
+    ids = np.array([f"doc_{i}" for i in range(500)], dtype=object)
+    expected = sorted(zip(ids, scores), key=lambda pair: -pair[1])[:10]
+
+    assert top_n(ids, scores, 10) == [(doc_id, pytest.approx(score)) for doc_id, score in expected]
+    assert len(top_n(ids, scores, 1000)) == 500
+    assert top_n(ids, scores, 0) == []
+    assert top_n(ids[:0], scores[:0], 5) == []
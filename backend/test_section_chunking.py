@@ -0,0 +1,122 @@
+"""
+Tests for structure-aware chunking (chunking.iter_sections / iter_section_chunks)
+"""
+
+from chunking import common_heading_path, iter_section_chunks, iter_sections
+
+
+def word_count(texts):
+    return [len(text.split()) for text in texts]
+
+
+PAGE = """
+<h1>Guide</h1>
+<p>Welcome to the guide.</p>
+<h2>Install</h2>
+<h3>Linux</h3>
+<p>Use the package manager.</p>
+<h3>Windows</h3>
+<p>Run the installer.</p>
+<h2>Usage</h2>
+<p>Start the server.</p>
+"""
+
+
+def test_sections_carry_heading_paths():
+    assert list(iter_sections(PAGE)) == [
+        ("Guide", ["Guide", "Welcome to the guide."]),
+        # The Install heading has no content of its own and joins its first subsection
+        ("Guide > Install > Linux", ["Install", "Linux", "Use the package manager."]),
+        ("Guide > Install > Windows", ["Windows", "Run the installer."]),
+        ("Guide > Usage", ["Usage", "Start the server."]),
+    ]
+
+
+def test_content_before_first_heading():
+    assert list(iter_sections("<p>Intro.</p><h2>Next</h2><p>Body.</p>")) == [
+        ("", ["Intro."]),
+        ("Next", ["Next", "Body."]),
+    ]
+
+
+def test_nested_blocks_repeated_by_the_extension_are_dropped():
+    html = (
+        "<h2>Notes</h2>"
+        "<blockquote><p>Quoted text.</p></blockquote><p>Quoted text.</p>"
+        "<ul><li>One</li><li>Two</li></ul><p>After the list.</p>"
+    )
+    assert list(iter_sections(html)) == [
+        ("Notes", ["Notes", "Quoted text.", "- One\n- Two", "After the list."]),
+    ]
+
+
+def test_tables_lists_and_skipped_tags():
+    html = (
+        "<h2>Data</h2>"
+        "<table><tr><th>Name</th><th>Size</th></tr><tr><td>a</td><td>1</td></tr></table>"
+        "<ol><li>first <script>ignored()</script>step</li></ol>"
+        "<style>p { color: red }</style>"
+    )
+    assert list(iter_sections(html)) == [
+        ("Data", ["Data", "Name | Size\na | 1", "- first step"]),
+    ]
+
+
+def test_html_without_text_has_no_sections():
+    """chunk_page falls back to flat text chunking in this case"""
+    assert list(iter_sections("<div><img src='a.png'></div><script>x()</script>")) == []
+    assert list(iter_section_chunks("<p>   </p>", word_count, max_tokens=10)) == []
+
+
+def test_each_section_gets_its_own_chunk_when_none_fit_together():
+    chunks = list(iter_section_chunks(PAGE, word_count, max_tokens=6, overlap_tokens=0))
+    assert chunks == [
+        ("Guide\n\nWelcome to the guide.", "Guide"),
+        ("Install\n\nLinux\n\nUse the package manager.", "Guide > Install > Linux"),
+        ("Windows\n\nRun the installer.", "Guide > Install > Windows"),
+        ("Usage\n\nStart the server.", "Guide > Usage"),
+    ]
+
+
+def test_short_sections_share_a_chunk_under_common_headings():
+    chunks = list(iter_section_chunks(PAGE, word_count, max_tokens=12, overlap_tokens=0))
+    assert chunks == [
+        ("Guide\n\nWelcome to the guide.\n\nInstall\n\nLinux\n\nUse the package manager.", "Guide"),
+        ("Windows\n\nRun the installer.\n\nUsage\n\nStart the server.", "Guide"),
+    ]
+
+
+def test_long_sections_are_split_within_the_section():
+    sentences = " ".join(f"Sentence number {i} here." for i in range(10))
+    html = f"<h2>Long</h2><p>{sentences}</p><h2>Short</h2><p>{sentences}</p>"
+    chunks = list(iter_section_chunks(html, word_count, max_tokens=10, overlap_tokens=0))
+
+    assert max(word_count([chunk for chunk, _ in chunks])) <= 10
+    paths = [path for _, path in chunks]
+    assert paths == ["Long"] * 5 + ["Short"] * 5
+    assert chunks[5][0].startswith("Short\n\nSentence number 0")
+
+
+def test_short_section_joins_the_last_chunk_of_a_long_one():
+    sentences = " ".join(f"Sentence number {i} here." for i in range(10))
+    html = f"<h2>Long</h2><p>{sentences}</p><h2>Short</h2><p>Tail.</p>"
+    chunks = list(iter_section_chunks(html, word_count, max_tokens=10, overlap_tokens=0))
+    assert chunks[-1] == ("Sentence number 8 here. Sentence number 9 here.\n\nShort\n\nTail.", "")
+
+
+def test_common_heading_path():
+    assert common_heading_path("Guide > Install > Linux", "Guide > Install > Windows") == "Guide > Install"
+    assert common_heading_path("Guide > Install", "Guide > Usage") == "Guide"
+    assert common_heading_path("Guide", "Other") == ""
+
+
+def test_each_sentence_is_tokenized_once():
+    counted = []
+
+    def recording_count(texts):
+        counted.extend(texts)
+        return word_count(texts)
+
+    chunks = list(iter_section_chunks(PAGE, recording_count, max_tokens=6, overlap_tokens=0))
+    assert chunks
+    assert len(counted) == len(set(counted)) == 9
@@ -0,0 +1,77 @@
+"""
+Tests for SigLIPEmbeddings text batching
+Uses a tiny randomly initialized SigLIP model, so no weights are downloaded
+"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from siglip_embeddings import SigLIPEmbeddings
+
+MAX_LENGTH = 16
+PAD_ID = 1
+
+
+class CharProcessor:
+    """Character-level stand-in for the SigLIP processor (input_ids only, like SigLIP's tokenizer)"""
+
+    def __call__(self, text, return_tensors="pt", padding=False, max_length=None, truncation=False):
+        ids = [[2 + ord(c) % 90 for c in t] for t in text]
+        if truncation and max_length:
+            ids = [row[:max_length] for row in ids]
+        length = max_length if padding == "max_length" else max(len(row) for row in ids)
+        return {"input_ids": torch.tensor([row + [PAD_ID] * (length - len(row)) for row in ids])}
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    torch.manual_seed(0)
+    config = transformers.SiglipConfig(
+        text_config={
+            "vocab_size": 100,
+            "hidden_size": 32,
+            "intermediate_size": 64,
+            "num_hidden_layers": 2,
+            "num_attention_heads": 4,
+            "max_position_embeddings": MAX_LENGTH,
+        },
+        vision_config={
+            "hidden_size": 32,
+            "intermediate_size": 64,
+            "num_hidden_layers": 1,
+            "num_attention_heads": 4,
+            "image_size": 32,
+            "patch_size": 16,
+        },
+    )
+    instance = SigLIPEmbeddings.__new__(SigLIPEmbeddings)
+    instance.device = "cpu"
+    instance.model = transformers.SiglipModel(config).eval()
+    instance.processor = CharProcessor()
+    instance.text_max_length = MAX_LENGTH
+    return instance
+
+
+def test_model_output_depends_on_padding(embeddings):
+    """Sanity check: without a mask, the pooled output changes with the padded length"""
+    ids = CharProcessor()(["short"])["input_ids"]
+    padded = torch.cat([ids, torch.full((1, 4), PAD_ID)], dim=1)
+    with torch.no_grad():
+        a = embeddings.model.get_text_features(input_ids=ids)
+        b = embeddings.model.get_text_features(input_ids=padded)
+    assert not torch.allclose(a, b, atol=1e-4)
+
+
+def test_text_embedding_does_not_depend_on_batch(embeddings):
+    alone = embeddings.embed_text("short")
+    batched = embeddings.embed_texts(["a much longer neighbouring text", "short", "x"])
+    assert batched[1] == pytest.approx(alone, abs=1e-5)
+
+
+def test_embed_texts_slices_match_single_pass(embeddings):
+    texts = ["alpha", "beta gamma", "delta epsilon zeta", "eta"]
+    assert [
+        pytest.approx(row, abs=1e-5) for row in embeddings.embed_texts(texts, batch_size=4)
+    ] == embeddings.embed_texts(texts, batch_size=1)
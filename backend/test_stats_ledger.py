@@ -0,0 +1,55 @@
+"""
+Tests for the stats ledger counters
+"""
+
+import pytest
+
+from stats_ledger import StatsLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    stats_ledger = StatsLedger(str(tmp_path / "stats.sqlite3"))
+    yield stats_ledger
+    stats_ledger.close()
+
+
+def image_entry(document_id: str, file_path: str, digest: str) -> dict:
+    return {"type": "image", "document_id": document_id, "domain": "example.com",
+            "file_path": file_path, "content_hash": digest}
+
+
+def test_shared_image_file_is_counted_once(ledger, tmp_path):
+    shared = tmp_path / "shared.png"
+    shared.write_bytes(b"x" * 100)
+    other = tmp_path / "other.png"
+    other.write_bytes(b"y" * 30)
+
+    ledger.record_entries(
+        [None, None], [image_entry("doc-a", str(shared), "h1"), image_entry("doc-a", str(shared), "h1")]
+    )
+    ledger.record_entries(
+        [None, None], [image_entry("doc-b", str(shared), "h1"), image_entry("doc-b", str(other), "h2")]
+    )
+    totals = ledger.totals()
+    assert totals["total_images"] == 4
+    assert totals["image_bytes"] == 130
+
+    ledger.remove_document("doc-a")
+    assert ledger.totals()["image_bytes"] == 130
+    ledger.remove_document("doc-b")
+    assert ledger.totals()["image_bytes"] == 0
+    assert ledger.totals()["total_images"] == 0
+
+
+def test_text_entries_are_counted_per_document(ledger):
+    ledger.record_entries(
+        ["first", "second"],
+        [{"type": "text", "document_id": "doc", "domain": "example.com", "is_chunked": True, "chunk_index": 0},
+         {"type": "text", "document_id": "doc", "domain": "example.com", "is_chunked": True, "chunk_index": 1}]
+    )
+    totals = ledger.totals()
+    assert totals["unique_documents"] == 1
+    assert totals["total_chunks"] == 2 and totals["chunked_documents"] == 1
+    assert totals["text_bytes"] == len("firstsecond")
+    assert ledger.documents_by_domain() == {"example.com": 1}
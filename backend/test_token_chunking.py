@@ -0,0 +1,91 @@
+"""
+Tests for token-aware chunking (chunking.iter_chunks)
+test_chunking.py exercises the running server; these only need the module
+"""
+
+import random
+
+from chunking import approximate_token_count, iter_chunks
+
+WORDS = "the quick brown fox jumps over a lazy dog while seven wizards quietly hex".split()
+
+
+def word_count(texts):
+    """One token per whitespace-separated word"""
+    return [len(text.split()) for text in texts]
+
+
+def random_text(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def test_empty_text_has_no_chunks():
+    assert list(iter_chunks("", word_count)) == []
+    assert list(iter_chunks("   \n\n ", word_count)) == []
+
+
+def test_short_text_is_one_chunk():
+    assert list(iter_chunks("One sentence. Another one.", word_count, max_tokens=10)) == [
+        "One sentence. Another one."
+    ]
+
+
+def test_chunks_respect_token_limit_and_cover_text():
+    rng = random.Random(0)
+    text = random_text(rng, 200)
+    chunks = list(iter_chunks(text, word_count, max_tokens=20, overlap_tokens=5))
+
+    assert len(chunks) > 1
+    assert max(word_count(chunks)) <= 20
+    # Every chunk is a slice of the text; together they cover it in order,
+    # overlapping or separated by whitespace only
+    position = 0
+    for chunk in chunks:
+        start = text.index(chunk, max(0, position - len(chunk)))
+        assert not text[position:start].strip()
+        position = start + len(chunk)
+    assert position == len(text)
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = "A b c. D e f. G h i. J k l. M n o."
+    chunks = list(iter_chunks(text, word_count, max_tokens=6, overlap_tokens=3))
+    assert chunks == ["A b c. D e f.", "D e f. G h i.", "G h i. J k l.", "J k l. M n o."]
+
+    no_overlap = list(iter_chunks(text, word_count, max_tokens=6, overlap_tokens=0))
+    assert no_overlap == ["A b c. D e f.", "G h i. J k l.", "M n o."]
+
+
+def test_long_sentence_is_split_at_words():
+    text = " ".join(f"w{i}" for i in range(25)) + "."
+    chunks = list(iter_chunks(text, word_count, max_tokens=10, overlap_tokens=0))
+    assert word_count(chunks) == [10, 10, 5]
+    assert " ".join(chunks) == text
+
+
+def test_long_word_is_split_into_pieces():
+    word = "x" * 600  # ~100 approximate tokens
+    text = f"Short intro. {word} tail."
+    chunks = list(iter_chunks(text, approximate_token_count, max_tokens=16, overlap_tokens=0))
+    assert len(chunks) > 6
+    assert max(approximate_token_count(chunks)) <= 16
+    assert "".join("".join(chunk.split()) for chunk in chunks) == "".join(text.split())
+
+
+def test_tokenizer_work_is_linear_in_text_length():
+    rng = random.Random(1)
+    counted = []
+
+    def counting(texts):
+        counted.append(sum(len(text) for text in texts))
+        return word_count(texts)
+
+    for sentences in (100, 1000):
+        counted.clear()
+        text = random_text(rng, sentences)
+        list(iter_chunks(text, counting, max_tokens=20, overlap_tokens=5))
+        # Each sentence is tokenized once; nothing is re-tokenized per chunk
+        assert sum(counted) <= len(text)